@@ -0,0 +1,302 @@
+from enum import Enum
+
+import numpy as np
+from scipy import stats
+
+import InputData as D
+from MarkovModelClasses import Cohort, Engine
+from MultiCohortClasses import MultiCohort, MultiCohortOutcomes
+from ProbParameterClasses import Sampling
+from StreamingStatClasses import StreamingStat
+
+
+class Target(Enum):
+    """ outcomes whose confidence intervals adaptive runs can target """
+    COST = 0                # mean discounted cost under the strategy
+    QALY = 1                # mean discounted QALY under the strategy
+    INCREMENTAL_NMB = 2     # mean incremental net monetary benefit with respect to the reference strategy
+
+
+class _AdaptiveRun:
+    """ running statistics of the targets and the stopping rule shared by adaptive runs """
+
+    def __init__(self, wtp, if_has_ref):
+        """
+        :param wtp: willingness-to-pay per QALY (for the incremental net monetary benefit)
+        :param if_has_ref: if a reference strategy is simulated
+        """
+        self.wtp = wtp
+        self.ifHasRef = if_has_ref
+
+        self.nBatches = 0           # number of batches simulated
+        self.ifConverged = False    # if all targets reached the requested precision
+        self.halfWidths = {}        # half-width of the confidence interval of each target
+
+        self.statCost = StreamingStat(name='Discounted Cost')
+        self.statQALY = StreamingStat(name='Discounted QALY')
+        self.statRefCost = StreamingStat(name='Discounted Cost of the Reference')
+        self.statRefQALY = StreamingStat(name='Discounted QALY of the Reference')
+        # net monetary benefit under each strategy (for independent observations)
+        self.statNMB = StreamingStat(name='NMB')
+        self.statRefNMB = StreamingStat(name='NMB of the Reference')
+        # incremental net monetary benefit of paired observations
+        self.statIncrementalNMB = StreamingStat(name='Incremental NMB')
+
+    def _check_targets(self, half_widths):
+        if Target.INCREMENTAL_NMB in half_widths and (not self.ifHasRef or self.wtp is None):
+            raise ValueError('The incremental net monetary benefit needs a reference strategy and a wtp.')
+
+    def _update_stats(self, costs, qalys, ref_costs=None, ref_qalys=None, if_paired=False):
+        """ adds the observations of a batch and updates the statistics of targets """
+
+        self.statCost.add(costs)
+        self.statQALY.add(qalys)
+        if self.ifHasRef:
+            self.statRefCost.add(ref_costs)
+            self.statRefQALY.add(ref_qalys)
+            if self.wtp is not None:
+                nmb = self.wtp * np.asarray(qalys) - np.asarray(costs)
+                ref_nmb = self.wtp * np.asarray(ref_qalys) - np.asarray(ref_costs)
+                if if_paired:
+                    self.statIncrementalNMB.add(nmb - ref_nmb)
+                else:
+                    self.statNMB.add(nmb)
+                    self.statRefNMB.add(ref_nmb)
+        self.nBatches += 1
+
+    def _update_half_widths(self, half_widths, alpha, if_paired):
+        """ updates the half-widths of confidence intervals of targets
+        :return: True if all targets reached the requested precision """
+
+        for target in half_widths:
+            if target == Target.COST:
+                self.halfWidths[target] = self.statCost.get_t_half_length(alpha)
+            elif target == Target.QALY:
+                self.halfWidths[target] = self.statQALY.get_t_half_length(alpha)
+            elif if_paired:
+                self.halfWidths[target] = self.statIncrementalNMB.get_t_half_length(alpha)
+            else:
+                self.halfWidths[target] = self._get_indp_nmb_half_length(alpha)
+
+        self.ifConverged = all(self.halfWidths[target] <= half_width
+                               for target, half_width in half_widths.items())
+        return self.ifConverged
+
+    def get_incremental_nmb(self):
+        """
+        :return: estimate of the mean incremental net monetary benefit
+        """
+        return self.wtp * (self.statQALY.get_mean() - self.statRefQALY.get_mean()) \
+            - (self.statCost.get_mean() - self.statRefCost.get_mean())
+
+    def _get_indp_nmb_half_length(self, alpha):
+        # half-length of the Welch confidence interval of the incremental net monetary benefit
+        # from independent samples (the variance of the NMB under each strategy includes
+        # the covariance of its cost and QALY)
+        var = self.statNMB.get_stdev() ** 2 / self.statNMB.n
+        var_ref = self.statRefNMB.get_stdev() ** 2 / self.statRefNMB.n
+        df = (var + var_ref) ** 2 / (var ** 2 / (self.statNMB.n - 1) + var_ref ** 2 / (self.statRefNMB.n - 1))
+
+        return stats.t.ppf(1 - alpha / 2, df) * np.sqrt(var + var_ref)
+
+    def _print_report(self, n_observations, observation_name):
+        """ prints the number of observations used and the achieved precision of targets
+        :param n_observations: number of observations simulated under each strategy
+        :param observation_name: name of the observations (e.g. 'patients' or 'cohorts')
+        """
+        print('Converged:' if self.ifConverged else 'Budget used up before convergence:',
+              self.nBatches, 'batches of', self.batchSize, observation_name,
+              '(' + str(n_observations), observation_name, 'under each strategy)')
+        for target, half_width in self.halfWidths.items():
+            print('  CI half-width of', target.name, '=', half_width)
+
+
+class AdaptiveCohort(_AdaptiveRun):
+    """ simulates a cohort in batches of patients until the confidence intervals of the targets
+    are narrow enough or the maximum population size is reached """
+
+    def __init__(self, id, parameters, batch_size, max_pop_size, ref_parameters=None, wtp=None,
+                 engine=Engine.PATIENT, eliminate_screening=False, crn_seed=None):
+        """
+        :param id: cohort ID
+        :param parameters: parameters of the strategy
+        :param batch_size: number of patients simulated between checks of the targets
+        :param max_pop_size: maximum number of patients to simulate under each strategy
+            (rounded up to whole batches)
+        :param ref_parameters: parameters of the reference strategy (for Target.INCREMENTAL_NMB)
+        :param wtp: willingness-to-pay per QALY (for Target.INCREMENTAL_NMB)
+        :param engine: (Engine) engine to simulate patients with
+        :param eliminate_screening: set to True to fold the screening states into branching probabilities
+        :param crn_seed: seed of common random numbers; if provided, patients under the two strategies
+            are paired (only for Engine.PATIENT)
+        """
+        _AdaptiveRun.__init__(self, wtp=wtp, if_has_ref=ref_parameters is not None)
+
+        self.id = id
+        self.params = parameters
+        self.refParams = ref_parameters
+        self.batchSize = batch_size
+        self.maxBatches = int(np.ceil(max_pop_size / batch_size))
+        self.engine = engine
+        self.eliminateScreening = eliminate_screening
+        self.crnSeed = crn_seed
+
+        self.nPatients = 0  # number of patients simulated under each strategy
+
+    def simulate(self, sim_length, half_widths, alpha=D.ALPHA):
+        """ simulates batches of patients until the targets are met or the budget is used up
+        :param sim_length: simulation length
+        :param half_widths: (dictionary) of the largest acceptable half-width of the confidence interval
+            of each Target
+        :param alpha: significance level
+        """
+
+        self._check_targets(half_widths=half_widths)
+        if_paired = self.crnSeed is not None
+
+        while self.nBatches < self.maxBatches and not self.ifConverged:
+            outcomes = self._simulate_batch(parameters=self.params, cohort_index=0, sim_length=sim_length)
+            if self.ifHasRef:
+                ref_outcomes = self._simulate_batch(parameters=self.refParams, cohort_index=1,
+                                                    sim_length=sim_length)
+                self._update_stats(costs=outcomes.costs, qalys=outcomes.utilities,
+                                   ref_costs=ref_outcomes.costs, ref_qalys=ref_outcomes.utilities,
+                                   if_paired=if_paired)
+            else:
+                self._update_stats(costs=outcomes.costs, qalys=outcomes.utilities)
+
+            self.nPatients += self.batchSize
+            self._update_half_widths(half_widths=half_widths, alpha=alpha, if_paired=if_paired)
+
+    def _simulate_batch(self, parameters, cohort_index, sim_length):
+        """
+        :param parameters: parameters
+        :param cohort_index: 0 for the strategy and 1 for the reference strategy
+        :param sim_length: simulation length
+        :return: outcomes of the batch
+        """
+
+        # patients of every batch and strategy get their own seeds
+        # (the same streams under both strategies when using common random numbers)
+        cohort = Cohort(id=(2 * self.id + cohort_index) * self.maxBatches + self.nBatches,
+                        pop_size=self.batchSize,
+                        parameters=parameters,
+                        engine=self.engine,
+                        eliminate_screening=self.eliminateScreening,
+                        crn_seed=None if self.crnSeed is None else [self.crnSeed, self.nBatches])
+        cohort.simulate(sim_length=sim_length)
+
+        return cohort.cohortOutcomes
+
+    def print_report(self):
+        """ prints the number of patients simulated and the achieved precision of targets """
+        self._print_report(n_observations=self.nPatients, observation_name='patients')
+
+
+class AdaptiveMultiCohort(_AdaptiveRun):
+    """ simulates batches of cohorts with different parameters until the confidence intervals of
+    the targets (means over cohorts) are narrow enough or the maximum number of cohorts is reached """
+
+    def __init__(self, treatment, pop_size, batch_size, max_n_cohorts, ref_treatment=None, wtp=None,
+                 engine=Engine.PATIENT, eliminate_screening=False, crn_seed=None,
+                 sampling=Sampling.RANDOM, sampling_seed=0, sample_rates=False):
+        """
+        :param treatment: selected treatment
+        :param pop_size: population size of cohorts
+        :param batch_size: number of cohorts simulated between checks of the targets
+        :param max_n_cohorts: maximum number of cohorts to simulate under each treatment
+            (rounded up to whole batches)
+        :param ref_treatment: reference treatment (for Target.INCREMENTAL_NMB); the k-th cohorts
+            under both treatments use the same parameter seeds
+        :param wtp: willingness-to-pay per QALY (for Target.INCREMENTAL_NMB)
+        :param engine: (Engine) engine to simulate cohorts with
+        :param eliminate_screening: set to True to fold the screening states into branching probabilities
+        :param crn_seed: seed of common random numbers of the cohorts (only for Engine.PATIENT)
+        :param sampling: (Sampling) method to sample the parameter sets of cohorts
+            (a Sobol design is continued over batches)
+        :param sampling_seed: seed of the Latin hypercube or Sobol design of parameter sets
+        :param sample_rates: set to True to also sample the inputs of transition rates
+        """
+        _AdaptiveRun.__init__(self, wtp=wtp, if_has_ref=ref_treatment is not None)
+
+        self.treatment = treatment
+        self.refTreatment = ref_treatment
+        self.popSize = pop_size
+        self.batchSize = batch_size
+        self.maxBatches = int(np.ceil(max_n_cohorts / batch_size))
+        self.engine = engine
+        self.eliminateScreening = eliminate_screening
+        self.crnSeed = crn_seed
+        self.sampling = sampling
+        self.samplingSeed = sampling_seed
+        self.sampleRates = sample_rates
+
+        self.nCohorts = 0   # number of cohorts simulated under each treatment
+        self.multiCohortOutcomes = MultiCohortOutcomes()
+        self.refMultiCohortOutcomes = MultiCohortOutcomes()
+
+    def simulate(self, sim_length, half_widths, alpha=D.ALPHA, workers=1):
+        """ simulates batches of cohorts until the targets are met or the budget is used up
+        :param sim_length: simulation length
+        :param half_widths: (dictionary) of the largest acceptable half-width of the confidence interval
+            of each Target
+        :param alpha: significance level
+        :param workers: number of processes to simulate the cohorts of a batch in parallel
+        """
+
+        self._check_targets(half_widths=half_widths)
+
+        while self.nBatches < self.maxBatches and not self.ifConverged:
+            outcomes = self._simulate_batch(treatment=self.treatment, treatment_index=0,
+                                            sim_length=sim_length, workers=workers)
+            self.multiCohortOutcomes.extend(outcomes)
+
+            if self.ifHasRef:
+                ref_outcomes = self._simulate_batch(treatment=self.refTreatment, treatment_index=1,
+                                                    sim_length=sim_length, workers=workers)
+                self.refMultiCohortOutcomes.extend(ref_outcomes)
+                # cohorts under both treatments are paired by their parameter seeds
+                self._update_stats(costs=outcomes.meanCosts, qalys=outcomes.meanQALYs,
+                                   ref_costs=ref_outcomes.meanCosts, ref_qalys=ref_outcomes.meanQALYs,
+                                   if_paired=True)
+            else:
+                self._update_stats(costs=outcomes.meanCosts, qalys=outcomes.meanQALYs)
+
+            self.nCohorts += self.batchSize
+            self._update_half_widths(half_widths=half_widths, alpha=alpha, if_paired=True)
+
+        # calculate the summary statistics of outcomes from all cohorts
+        self.multiCohortOutcomes.calculate_summary_stats()
+        if self.ifHasRef:
+            self.refMultiCohortOutcomes.calculate_summary_stats()
+
+    def _simulate_batch(self, treatment, treatment_index, sim_length, workers):
+        """
+        :param treatment: treatment
+        :param treatment_index: 0 for the treatment and 1 for the reference treatment
+        :param sim_length: simulation length
+        :param workers: number of processes
+        :return: outcomes of the batch of cohorts
+        """
+
+        first = self.nBatches * self.batchSize
+        # cohort ids under the reference treatment follow those under the treatment
+        first_id = treatment_index * self.maxBatches * self.batchSize + first
+
+        multi_cohort = MultiCohort(ids=range(first_id, first_id + self.batchSize),
+                                   pop_size=self.popSize,
+                                   treatment=treatment,
+                                   engine=self.engine,
+                                   eliminate_screening=self.eliminateScreening,
+                                   crn_seed=self.crnSeed,
+                                   first_cohort_index=first,
+                                   sampling=self.sampling,
+                                   sampling_seed=self.samplingSeed,
+                                   sample_rates=self.sampleRates)
+        multi_cohort.simulate(sim_length=sim_length, workers=workers)
+
+        return multi_cohort.multiCohortOutcomes
+
+    def print_report(self):
+        """ prints the number of cohorts simulated and the achieved precision of targets """
+        self._print_report(n_observations=self.nCohorts, observation_name='cohorts')
@@ -0,0 +1,111 @@
+import numpy as np
+from scipy.linalg import expm
+
+from InputData import HealthStates
+from MarkovModelClasses import get_state_cost_utility_rates
+
+
+class AnalyticCohort:
+    """ calculates the expected outcomes of a cohort exactly from the transition rate matrix
+    (the deterministic counterpart of Cohort) """
+
+    def __init__(self, parameters):
+        """
+        :param parameters: parameters
+        """
+        self.params = parameters
+
+        # generator of the continuous-time Markov chain (rows sum to 0)
+        self.rateMatrix = np.array(parameters.transRateMatrix, dtype=float)
+        np.fill_diagonal(self.rateMatrix, 0)
+        self.generator = self.rateMatrix - np.diag(self.rateMatrix.sum(axis=1))
+
+        # initial state distribution
+        self.initialDist = np.zeros(len(HealthStates))
+        self.initialDist[parameters.initialHealthState.value] = 1
+
+    def evaluate(self, sim_length, n_time_points=501):
+        """ calculates the expected outcomes over the simulation length
+        :param sim_length: simulation length
+        :param n_time_points: number of equally-spaced time points (including 0 and sim_length)
+            to calculate the state occupancy and survival curve at
+        :return: (AnalyticCohortOutcomes) expected outcomes
+        """
+
+        n_states = len(HealthStates)
+        if_alive = np.ones(n_states)
+        if_alive[[HealthStates.CANCER_DEATH.value, HealthStates.OTHER_DEATH.value]] = 0
+
+        # discounted cost and utility
+        cost_rates, utility_rates = get_state_cost_utility_rates(parameters=self.params)
+        discounted = self._integrate(
+            a=self.generator - self.params.discountRate * np.eye(n_states),
+            b=np.column_stack((cost_rates, utility_rates)),
+            sim_length=sim_length)
+
+        # life-years and number of cancers (the rate of moving into cancer from each state)
+        undiscounted = self._integrate(
+            a=self.generator,
+            b=np.column_stack((if_alive, self.rateMatrix[:, HealthStates.CANCER.value])),
+            sim_length=sim_length)
+
+        # state occupancy over time
+        times = np.linspace(0, sim_length, n_time_points)
+        step = expm(self.generator * (times[1] - times[0])) if n_time_points > 1 else np.eye(n_states)
+        state_occupancy = np.empty((n_time_points, n_states))
+        state_occupancy[0] = self.initialDist
+        for k in range(1, n_time_points):
+            state_occupancy[k] = state_occupancy[k - 1] @ step
+
+        return AnalyticCohortOutcomes(times=times,
+                                      state_occupancy=state_occupancy,
+                                      survival_curve=state_occupancy @ if_alive,
+                                      expected_life_years=undiscounted[0],
+                                      expected_num_cancer=undiscounted[1],
+                                      expected_cost=discounted[0],
+                                      expected_utility=discounted[1],
+                                      sim_length=sim_length)
+
+    def _integrate(self, a, b, sim_length):
+        """
+        :param a: (n x n matrix) exponent of the integrand
+        :param b: (n x k matrix) columns of per-state rates to integrate
+        :return: (k array) initialDist * integral of expm(a*t) from 0 to sim_length * b,
+            found from the exponential of the block matrix [[a, b], [0, 0]] (Van Loan, 1978)
+        """
+
+        n, k = b.shape
+        block = np.zeros((n + k, n + k))
+        block[:n, :n] = a
+        block[:n, n:] = b
+
+        return self.initialDist @ expm(block * sim_length)[:n, n:]
+
+
+class AnalyticCohortOutcomes:
+    def __init__(self, times, state_occupancy, survival_curve,
+                 expected_life_years, expected_num_cancer, expected_cost, expected_utility, sim_length):
+
+        self.times = times                      # time points
+        self.stateOccupancy = state_occupancy   # probability of being in each state at each time point
+        self.survivalCurve = survival_curve     # probability of being alive at each time point
+
+        self.expectedLifeYears = expected_life_years    # expected life-years lived during the simulation
+        self.expectedNumCancer = expected_num_cancer    # expected number of cancers
+        self.expectedCost = expected_cost               # expected discounted cost
+        self.expectedUtility = expected_utility         # expected discounted utility
+
+        # probability of dying during the simulation and the expected survival time of those who die
+        # (the analytic counterpart of Cohort's statSurvivalTime, which only includes patients who died)
+        self.probDeath = 1 - survival_curve[-1]
+        if self.probDeath > 0:
+            self.meanSurvivalTime = sim_length - (sim_length - expected_life_years) / self.probDeath
+        else:
+            self.meanSurvivalTime = np.nan
+
+    def get_n_living_patients(self, pop_size):
+        """
+        :param pop_size: initial population size
+        :return: expected number of living patients at each time point
+        """
+        return pop_size * self.survivalCurve
@@ -0,0 +1,189 @@
+import gc
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+
+class Benchmark:
+    """ a piece of code whose wall time and peak memory are measured """
+
+    def __init__(self, name, run, setup=None, group=None, size=None, n_repeats=3):
+        """
+        :param name: name of the benchmark (unique in a suite)
+        :param run: function that takes what setup returns (or nothing if there is no setup) and
+            returns None or a dictionary with the number of events ('nEvents') and of patients
+            ('nPatients') it simulated
+        :param setup: function that prepares what run needs (not timed, called before each repeat)
+        :param group: name of the group of benchmarks that form a scaling curve
+        :param size: size of the problem (e.g. population size) on the scaling curve of the group
+        :param n_repeats: number of timed repeats
+        """
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.group = group
+        self.size = size
+        self.nRepeats = n_repeats
+
+    def measure(self):
+        """
+        :return: (dictionary) of the results of this benchmark
+        """
+
+        wall_times = []
+        counts = None
+        for repeat in range(self.nRepeats):
+            wall_time, counts = self._run_once()
+            wall_times.append(wall_time)
+
+        # peak memory is measured in an extra run since tracing slows down the code
+        gc.collect()
+        tracemalloc.start()
+        try:
+            self._run_once()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        counts = counts or {}
+        wall_time = min(wall_times)
+        result = {'name': self.name,
+                  'group': self.group,
+                  'size': self.size,
+                  'wallTime': wall_time,
+                  'meanWallTime': float(np.mean(wall_times)),
+                  'nRepeats': self.nRepeats,
+                  'peakMemory': peak_memory,
+                  'nEvents': _get_int(counts.get('nEvents')),
+                  'nPatients': _get_int(counts.get('nPatients')),
+                  'eventsPerSec': None,
+                  'patientsPerSec': None}
+        if wall_time > 0:
+            if result['nEvents'] is not None:
+                result['eventsPerSec'] = result['nEvents'] / wall_time
+            if result['nPatients'] is not None:
+                result['patientsPerSec'] = result['nPatients'] / wall_time
+
+        return result
+
+    def _run_once(self):
+        """
+        :return: wall time of one run and the counts it returned
+        """
+        state = self.setup() if self.setup is not None else None
+        start = time.perf_counter()
+        counts = self.run(state) if self.setup is not None else self.run()
+        return time.perf_counter() - start, counts
+
+
+class BenchmarkSuite:
+    """ benchmarks that are run together and whose results are written to a JSON file """
+
+    def __init__(self, benchmarks):
+        """
+        :param benchmarks: (list) of benchmarks
+        """
+        self.benchmarks = benchmarks
+        self.results = []
+
+    def run(self, names=None, if_print=True):
+        """
+        :param names: (list) of names or groups of the benchmarks to run (None to run all)
+        :param if_print: set to True to print the result of each benchmark when it is done
+        """
+
+        self.results = []
+        for benchmark in self.benchmarks:
+            if names is not None and benchmark.name not in names and benchmark.group not in names:
+                continue
+            result = benchmark.measure()
+            self.results.append(result)
+            if if_print:
+                print(format_result(result))
+
+    def write_results(self, file_name):
+        """ writes the results (with a description of the machine) to a JSON file
+        :param file_name: name of the results file
+        """
+        with open(file_name, 'w') as file:
+            json.dump({'metadata': get_metadata(), 'results': self.results}, file, indent=2)
+
+
+def get_metadata():
+    """
+    :return: (dictionary) description of the machine and the versions of packages
+    """
+    return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor()}
+
+
+def read_results(file_name):
+    """
+    :param file_name: name of a results file
+    :return: (list) of the results in the file
+    """
+    with open(file_name) as file:
+        return json.load(file)['results']
+
+
+def compare_results(old_results, new_results, threshold=0.1):
+    """
+    :param old_results: (list) of results of the baseline run
+    :param new_results: (list) of results of the new run
+    :param threshold: relative increase of wall time or peak memory above which a benchmark
+        is flagged as a regression
+    :return: (list) of (name, old wall time, new wall time, old peak memory, new peak memory,
+        if regression) for the benchmarks in both runs
+    """
+
+    old_by_name = {result['name']: result for result in old_results}
+    rows = []
+    for new in new_results:
+        old = old_by_name.get(new['name'])
+        if old is None:
+            continue
+        if_regression = new['wallTime'] > old['wallTime'] * (1 + threshold) \
+            or new['peakMemory'] > old['peakMemory'] * (1 + threshold)
+        rows.append((new['name'], old['wallTime'], new['wallTime'],
+                     old['peakMemory'], new['peakMemory'], if_regression))
+
+    return rows
+
+
+def lazy_fixture(build):
+    """
+    :param build: function that builds the input of benchmarks (e.g. simulated cohorts)
+    :return: function that builds the input when first called and returns the same input afterwards
+        (so that only the benchmarks that are run pay for their inputs)
+    """
+    fixture = []
+
+    def get():
+        if len(fixture) == 0:
+            fixture.append(build())
+        return fixture[0]
+    return get
+
+
+def _get_int(count):
+    # numpy integers are not written to JSON files
+    return None if count is None else int(count)
+
+
+def format_result(result):
+    """
+    :return: (string) one line summary of the result of a benchmark
+    """
+    text = '{:<45} {:>10.4f} s {:>10.1f} MB'.format(result['name'], result['wallTime'],
+                                                    result['peakMemory'] / 1e6)
+    if result['eventsPerSec'] is not None:
+        text += ' {:>12,.0f} events/s'.format(result['eventsPerSec'])
+    if result['patientsPerSec'] is not None:
+        text += ' {:>12,.0f} patients/s'.format(result['patientsPerSec'])
+    return text
@@ -0,0 +1,174 @@
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+
+import numpy as np
+import scipy.stats as stats
+
+# maximum number of resampled observations drawn at once by a thread
+MAX_CHUNK_SIZE = 2 ** 22
+
+
+class Interval(Enum):
+    """ bootstrap intervals """
+    PERCENTILE = 0  # percentiles of the bootstrap replicates
+    BCA = 1         # bias-corrected and accelerated percentiles
+
+
+def _get_resample_sums(values, n_resamples, seed_sequence):
+    """ (run by worker threads)
+    :param values: (array) observations
+    :param n_resamples: number of resamples
+    :param seed_sequence: (SeedSequence) seed of the resamples
+    :return: (array) sum of each resample of the observations
+    """
+    rng = np.random.Generator(np.random.PCG64(seed_sequence))
+    indices = rng.integers(0, len(values), size=(n_resamples, len(values)))
+    return np.take(values, indices).sum(axis=1)
+
+
+class IncrementalBootstrap:
+    """ bootstrap of the incremental cost, incremental effect, ICER and net monetary benefit of a
+    strategy with respect to a reference strategy from the costs and effects of individual patients """
+
+    def __init__(self, costs, effects, ref_costs, ref_effects, if_paired=False):
+        """
+        :param costs: (array) costs of patients under the strategy
+        :param effects: (array) effects (e.g. QALY) of patients under the strategy
+        :param ref_costs: (array) costs of patients under the reference strategy
+        :param ref_effects: (array) effects of patients under the reference strategy
+        :param if_paired: set to True if both strategies were simulated with the same common random numbers
+            (the i-th patients of both strategies are then resampled together)
+        """
+
+        self.groups = []    # (n_patients x 2) costs and effects of each group of patients resampled together
+        if if_paired:
+            if len(costs) != len(ref_costs):
+                raise ValueError('Paired strategies need the same number of patients.')
+            self.groups.append(np.column_stack((costs, effects)) - np.column_stack((ref_costs, ref_effects)))
+        else:
+            self.groups.append(np.column_stack((costs, effects)).astype(float))
+            self.groups.append(-np.column_stack((ref_costs, ref_effects)).astype(float))
+        self.ifPaired = if_paired
+
+        # incremental cost and effect
+        self.incCost, self.incEffect = sum(group.mean(axis=0) for group in self.groups)
+
+        # bootstrap replicates of the incremental cost and effect
+        self.incCostReplicates = None
+        self.incEffectReplicates = None
+
+    def resample(self, n_resamples=10000, seed=0, workers=None):
+        """ draws the bootstrap replicates of the incremental cost and effect
+        (the replicates depend on the seed but not on the number of workers)
+        :param n_resamples: number of resamples
+        :param seed: seed of the resamples
+        :param workers: number of threads to draw resamples in parallel (None for the number of CPUs)
+        """
+
+        workers = os.cpu_count() if workers is None else workers
+
+        replicates = np.zeros(n_resamples, dtype=complex)
+        for group, group_seed in zip(self.groups, np.random.SeedSequence(seed).spawn(len(self.groups))):
+            n = len(group)
+            # costs and effects (centered for accuracy) are resampled together as complex numbers
+            mean = group.mean(axis=0)
+            values = (group[:, 0] - mean[0]) + 1j * (group[:, 1] - mean[1])
+
+            chunk_size = max(MAX_CHUNK_SIZE // n, 1)
+            sizes = [min(chunk_size, n_resamples - start) for start in range(0, n_resamples, chunk_size)]
+            seeds = group_seed.spawn(len(sizes))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                sums = list(executor.map(_get_resample_sums, [values] * len(sizes), sizes, seeds))
+
+            replicates += np.concatenate(sums) / n + complex(mean[0], mean[1])
+
+        self.incCostReplicates = replicates.real
+        self.incEffectReplicates = replicates.imag
+
+    def get_incremental_cost_interval(self, interval=Interval.PERCENTILE, alpha=0.05):
+        """
+        :return: (estimate, lower bound, upper bound) of the incremental cost
+        """
+        return self._get_interval(statistic=lambda cost, effect: cost, interval=interval, alpha=alpha)
+
+    def get_incremental_effect_interval(self, interval=Interval.PERCENTILE, alpha=0.05):
+        """
+        :return: (estimate, lower bound, upper bound) of the incremental effect
+        """
+        return self._get_interval(statistic=lambda cost, effect: effect, interval=interval, alpha=alpha)
+
+    def get_icer_interval(self, interval=Interval.PERCENTILE, alpha=0.05):
+        """
+        :return: (estimate, lower bound, upper bound) of the ICER
+            (only meaningful if the incremental effect is unlikely to be near zero)
+        """
+        return self._get_interval(statistic=lambda cost, effect: cost / effect, interval=interval, alpha=alpha)
+
+    def get_nmb_interval(self, wtp, interval=Interval.PERCENTILE, alpha=0.05):
+        """
+        :param wtp: willingness-to-pay per unit of effect
+        :return: (estimate, lower bound, upper bound) of the incremental net monetary benefit
+        """
+        return self._get_interval(statistic=lambda cost, effect: wtp * effect - cost, interval=interval, alpha=alpha)
+
+    def _get_interval(self, statistic, interval, alpha):
+        """
+        :param statistic: function of the incremental cost and effect (arrays)
+        :param interval: (Interval) type of interval
+        :param alpha: significance level
+        :return: (estimate, lower bound, upper bound) of the statistic
+        """
+
+        if self.incCostReplicates is None:
+            raise ValueError('Call resample() before calculating bootstrap intervals.')
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            estimate = statistic(self.incCost, self.incEffect)
+            replicates = statistic(self.incCostReplicates, self.incEffectReplicates)
+
+        if interval == Interval.PERCENTILE:
+            percentiles = [100 * alpha / 2, 100 * (1 - alpha / 2)]
+        elif interval == Interval.BCA:
+            percentiles = 100 * self._get_bca_levels(statistic, estimate, replicates, alpha)
+        else:
+            raise ValueError('Invalid interval.')
+
+        lower, upper = np.percentile(replicates, percentiles)
+        return estimate, lower, upper
+
+    def _get_bca_levels(self, statistic, estimate, replicates, alpha):
+        """
+        :return: (array) levels of the bias-corrected and accelerated percentiles (Efron, 1987)
+        """
+
+        # bias correction (the proportion is kept within half a replicate of 0 and 1 so that the
+        # correction stays finite when all replicates fall on one side of the estimate)
+        n_replicates = len(replicates)
+        proportion = (np.sum(replicates < estimate) + 0.5 * np.sum(replicates == estimate)) / n_replicates
+        z0 = stats.norm.ppf(np.clip(proportion, 1 / (2 * n_replicates), 1 - 1 / (2 * n_replicates)))
+
+        # acceleration from the jackknife, where leaving out a patient changes the mean of its group
+        jackknife = []
+        for group in self.groups:
+            n = len(group)
+            others = sum(other.mean(axis=0) for other in self.groups if other is not group)
+            leave_one_out = (group.sum(axis=0) - group) / (n - 1) + others
+            with np.errstate(divide='ignore', invalid='ignore'):
+                jackknife.append(statistic(leave_one_out[:, 0], leave_one_out[:, 1]))
+        jackknife = np.concatenate(jackknife)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviations = jackknife.mean() - jackknife
+            acceleration = np.sum(deviations ** 3) / (6 * np.sum(deviations ** 2) ** 1.5)
+
+            z = stats.norm.ppf([alpha / 2, 1 - alpha / 2])
+            levels = stats.norm.cdf(z0 + (z0 + z) / (1 - acceleration * (z0 + z)))
+
+        # the acceleration is undefined if the jackknife values are all equal or not finite
+        # (e.g. for degenerate samples or ICERs with incremental effects near zero)
+        if not np.all(np.isfinite(levels)):
+            warnings.warn('The BCa interval is undefined for this statistic; '
+                          'the percentile interval is returned instead.')
+            return np.array([alpha / 2, 1 - alpha / 2])
+        return levels
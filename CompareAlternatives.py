@@ -2,74 +2,99 @@ import InputData as D
 import MarkovModelClasses as Cls
 import ParameterClasses as P
 import Support as Support
-
-
-# create a cohort
-cohort_cryt = Cls.Cohort(id=1,
-                         pop_size=D.POP_SIZE,
-                         parameters=P.Parameters(treatment=D.Treatment.CRYT_SCREEN))
-# simulate the cohort
-cohort_cryt.simulate(sim_length=D.SIMULATION_LENGTH)
-
-# simulating
-# create a cohort
-cohort_hpv = Cls.Cohort(id=2,
-                        pop_size=D.POP_SIZE,
-                        parameters=P.Parameters(treatment=D.Treatment.HPV_SCREEN))
-# simulate the cohort
-cohort_hpv.simulate(sim_length=D.SIMULATION_LENGTH)
-
-
-cohort_dual = Cls.Cohort(id=3,
-                         pop_size=D.POP_SIZE,
-                         parameters=P.Parameters(treatment=D.Treatment.DUAL_SCREEN))
-
-cohort_dual.simulate(sim_length=D.SIMULATION_LENGTH)
-
-# print the estimates for the mean survival time and mean time to AIDS
-
-Support.print_outcomes(sim_outcomes=cohort_hpv.cohortOutcomes,
-                       treatment_name=D.Treatment.HPV_SCREEN)
-Support.print_outcomes(sim_outcomes=cohort_cryt.cohortOutcomes,
-                       treatment_name=D.Treatment.CRYT_SCREEN)
-Support.print_outcomes(sim_outcomes=cohort_dual.cohortOutcomes,
-                       treatment_name=D.Treatment.DUAL_SCREEN)
-
-# plot survival curves and histograms
-Support.plot_survival_curves_and_histograms(sim_outcomes_1=cohort_hpv.cohortOutcomes,
-                                            treatment1=D.Treatment.HPV_SCREEN,
-                                            sim_outcomes_2=cohort_cryt.cohortOutcomes,
-                                            treatment2=D.Treatment.CRYT_SCREEN)
-
-Support.plot_survival_curves_and_histograms(sim_outcomes_1=cohort_hpv.cohortOutcomes,
-                                            treatment1=D.Treatment.HPV_SCREEN,
-                                            sim_outcomes_2=cohort_dual.cohortOutcomes,
-                                            treatment2=D.Treatment.DUAL_SCREEN)
-
-Support.plot_survival_curves_and_histograms(sim_outcomes_1=cohort_dual.cohortOutcomes,
-                                            treatment1=D.Treatment.DUAL_SCREEN,
-                                            sim_outcomes_2=cohort_cryt.cohortOutcomes,
-                                            treatment2=D.Treatment.CRYT_SCREEN)
-
-
-# print comparative outcomes
-Support.print_comparative_outcomes(sim_outcomes_1=cohort_hpv.cohortOutcomes,
-                                   treatment1=D.Treatment.HPV_SCREEN,
-                                   sim_outcomes_2=cohort_cryt.cohortOutcomes,
-                                   treatment2=D.Treatment.CRYT_SCREEN)
-
-Support.print_comparative_outcomes(sim_outcomes_1=cohort_hpv.cohortOutcomes,
-                                   treatment1=D.Treatment.HPV_SCREEN,
-                                   sim_outcomes_2=cohort_dual.cohortOutcomes,
-                                   treatment2=D.Treatment.DUAL_SCREEN)
-
-Support.print_comparative_outcomes(sim_outcomes_1=cohort_dual.cohortOutcomes,
-                                   treatment1=D.Treatment.DUAL_SCREEN,
-                                   sim_outcomes_2=cohort_cryt.cohortOutcomes,
-                                   treatment2=D.Treatment.CRYT_SCREEN)
-
-
-# report the CEA results
-Support.report_CEA_CBA(sim_outcomes_hpv=cohort_hpv.cohortOutcomes,
-                       sim_outcomes_cryt=cohort_cryt.cohortOutcomes)
-
+from FigureRendererClasses import set_headless
+from OutcomeCacheClasses import OutcomeCache
+
+# seed of common random numbers (the same woman gets the same random number streams under each strategy)
+CRN_SEED = 1
+
+# set to True to save figures to files in the background instead of showing them (e.g. on a server)
+HEADLESS = False
+
+# (the script only runs when executed, not when imported by a worker process)
+if __name__ == '__main__':
+
+    # cache of simulated cohorts (cohorts are re-simulated only when their inputs or the model code change)
+    CACHE = OutcomeCache() if D.USE_OUTCOME_CACHE else None
+
+    if HEADLESS:
+        set_headless(directory='figures')
+
+    # create a cohort
+    cohort_cryt = Cls.Cohort(id=1,
+                             pop_size=D.POP_SIZE,
+                             parameters=P.Parameters(treatment=D.Treatment.CRYT_SCREEN),
+                             crn_seed=CRN_SEED,
+                             cache=CACHE)
+    # simulate the cohort
+    cohort_cryt.simulate(sim_length=D.SIMULATION_LENGTH)
+
+    # simulating
+    # create a cohort
+    cohort_hpv = Cls.Cohort(id=2,
+                            pop_size=D.POP_SIZE,
+                            parameters=P.Parameters(treatment=D.Treatment.HPV_SCREEN),
+                            crn_seed=CRN_SEED,
+                            cache=CACHE)
+    # simulate the cohort
+    cohort_hpv.simulate(sim_length=D.SIMULATION_LENGTH)
+
+    cohort_dual = Cls.Cohort(id=3,
+                             pop_size=D.POP_SIZE,
+                             parameters=P.Parameters(treatment=D.Treatment.DUAL_SCREEN),
+                             crn_seed=CRN_SEED,
+                             cache=CACHE)
+
+    cohort_dual.simulate(sim_length=D.SIMULATION_LENGTH)
+
+    # print the estimates for the mean survival time and mean time to AIDS
+
+    Support.print_outcomes(sim_outcomes=cohort_hpv.cohortOutcomes,
+                           treatment_name=D.Treatment.HPV_SCREEN)
+    Support.print_outcomes(sim_outcomes=cohort_cryt.cohortOutcomes,
+                           treatment_name=D.Treatment.CRYT_SCREEN)
+    Support.print_outcomes(sim_outcomes=cohort_dual.cohortOutcomes,
+                           treatment_name=D.Treatment.DUAL_SCREEN)
+
+    # plot survival curves and histograms
+    Support.plot_survival_curves_and_histograms(sim_outcomes_1=cohort_hpv.cohortOutcomes,
+                                                treatment1=D.Treatment.HPV_SCREEN,
+                                                sim_outcomes_2=cohort_cryt.cohortOutcomes,
+                                                treatment2=D.Treatment.CRYT_SCREEN)
+
+    Support.plot_survival_curves_and_histograms(sim_outcomes_1=cohort_hpv.cohortOutcomes,
+                                                treatment1=D.Treatment.HPV_SCREEN,
+                                                sim_outcomes_2=cohort_dual.cohortOutcomes,
+                                                treatment2=D.Treatment.DUAL_SCREEN)
+
+    Support.plot_survival_curves_and_histograms(sim_outcomes_1=cohort_dual.cohortOutcomes,
+                                                treatment1=D.Treatment.DUAL_SCREEN,
+                                                sim_outcomes_2=cohort_cryt.cohortOutcomes,
+                                                treatment2=D.Treatment.CRYT_SCREEN)
+
+    # print comparative outcomes
+    Support.print_comparative_outcomes(sim_outcomes_1=cohort_hpv.cohortOutcomes,
+                                       treatment1=D.Treatment.HPV_SCREEN,
+                                       sim_outcomes_2=cohort_cryt.cohortOutcomes,
+                                       treatment2=D.Treatment.CRYT_SCREEN,
+                                       if_paired=True)
+
+    Support.print_comparative_outcomes(sim_outcomes_1=cohort_hpv.cohortOutcomes,
+                                       treatment1=D.Treatment.HPV_SCREEN,
+                                       sim_outcomes_2=cohort_dual.cohortOutcomes,
+                                       treatment2=D.Treatment.DUAL_SCREEN,
+                                       if_paired=True)
+
+    Support.print_comparative_outcomes(sim_outcomes_1=cohort_dual.cohortOutcomes,
+                                       treatment1=D.Treatment.DUAL_SCREEN,
+                                       sim_outcomes_2=cohort_cryt.cohortOutcomes,
+                                       treatment2=D.Treatment.CRYT_SCREEN,
+                                       if_paired=True)
+
+    # report the CEA results
+    Support.report_CEA_CBA(sim_outcomes_list=[cohort_hpv.cohortOutcomes,
+                                              cohort_cryt.cohortOutcomes,
+                                              cohort_dual.cohortOutcomes],
+                           treatments=[D.Treatment.HPV_SCREEN, D.Treatment.CRYT_SCREEN, D.Treatment.DUAL_SCREEN],
+                           colors=['green', 'blue', 'red'],
+                           if_paired=True)
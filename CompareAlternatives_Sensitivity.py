@@ -2,39 +2,60 @@ import InputData as D
 import MultiCohortClasses as Cls
 import MultiCohortSupport as Support
 import ProbParameterClasses as P
+from FigureRendererClasses import set_headless
+from OutcomeCacheClasses import OutcomeCache
 
 N_COHORTS = 200  # number of cohorts
 POP_SIZE = 100 # population size of each cohort
 
-# create a multi-cohort to simulate under mono therapy
-multiCohortHPV = Cls.MultiCohort(
-    ids=range(N_COHORTS),
-    pop_size=POP_SIZE,
-    treatment=D.Treatment.HPV_SCREEN
-)
-
-multiCohortHPV.simulate(sim_length=D.SIMULATION_LENGTH)
-
-# create a multi-cohort to simulate under combo therapy
-multiCohortCRYT = Cls.MultiCohort(
-    ids=range(N_COHORTS, 2*N_COHORTS),
-    pop_size=POP_SIZE,
-    treatment=D.Treatment.CRYT_SCREEN
-)
-
-multiCohortCRYT.simulate(sim_length=D.SIMULATION_LENGTH)
-
-# print the estimates for the mean survival time and mean time to AIDS
-Support.print_outcomes(multi_cohort_outcomes=multiCohortHPV.multiCohortOutcomes,
-                       therapy_name=D.Treatment.HPV_SCREEN)
-Support.print_outcomes(multi_cohort_outcomes=multiCohortCRYT.multiCohortOutcomes,
-                       therapy_name=D.Treatment.CRYT_SCREEN)
-
-
-# print comparative outcomes
-Support.print_comparative_outcomes(multi_cohort_outcomes_1=multiCohortHPV.multiCohortOutcomes,
-                                   multi_cohort_outcomes_2=multiCohortCRYT.multiCohortOutcomes)
-
-# report the CEA results
-Support.report_CEA_CBA(multi_cohort_outcomes_HPV=multiCohortHPV.multiCohortOutcomes,
-                       multi_cohort_outcomes_CRYT=multiCohortCRYT.multiCohortOutcomes)
\ No newline at end of file
+# set to True to save figures to files in the background instead of showing them (e.g. on a server)
+HEADLESS = False
+
+# (the script only runs when executed, not when imported by a worker process)
+if __name__ == '__main__':
+
+    # cache of simulated cohorts (cohorts are re-simulated only when their inputs or the model code change)
+    CACHE = OutcomeCache() if D.USE_OUTCOME_CACHE else None
+
+    if HEADLESS:
+        set_headless(directory='figures')
+
+    # create a multi-cohort to simulate under mono therapy
+    multiCohortHPV = Cls.MultiCohort(
+        ids=range(N_COHORTS),
+        pop_size=POP_SIZE,
+        treatment=D.Treatment.HPV_SCREEN,
+        cache=CACHE
+    )
+
+    multiCohortHPV.simulate(sim_length=D.SIMULATION_LENGTH)
+
+    # create a multi-cohort to simulate under combo therapy
+    multiCohortCRYT = Cls.MultiCohort(
+        ids=range(N_COHORTS, 2*N_COHORTS),
+        pop_size=POP_SIZE,
+        treatment=D.Treatment.CRYT_SCREEN,
+        cache=CACHE
+    )
+
+    multiCohortCRYT.simulate(sim_length=D.SIMULATION_LENGTH)
+
+    # print the estimates for the mean survival time and mean time to AIDS
+    Support.print_outcomes(multi_cohort_outcomes=multiCohortHPV.multiCohortOutcomes,
+                           therapy_name=D.Treatment.HPV_SCREEN)
+    Support.print_outcomes(multi_cohort_outcomes=multiCohortCRYT.multiCohortOutcomes,
+                           therapy_name=D.Treatment.CRYT_SCREEN)
+
+    # print comparative outcomes
+    Support.print_comparative_outcomes(multi_cohort_outcomes_1=multiCohortHPV.multiCohortOutcomes,
+                                       multi_cohort_outcomes_2=multiCohortCRYT.multiCohortOutcomes)
+
+    # report the CEA results
+    Support.report_CEA_CBA(multi_cohort_outcomes_list=[multiCohortHPV.multiCohortOutcomes,
+                                                      multiCohortCRYT.multiCohortOutcomes],
+                           strategy_names=['HPV Screening', 'Crytology Screening'],
+                           colors=['green', 'blue'])
+
+    # report the value of information
+    Support.report_VOI(multi_cohort_HPV=multiCohortHPV,
+                       multi_cohort_CRYT=multiCohortCRYT)
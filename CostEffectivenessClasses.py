@@ -0,0 +1,366 @@
+import csv
+
+import numpy as np
+import scipy.stats as stats
+
+from BootstrapClasses import IncrementalBootstrap, Interval
+from FigureRendererClasses import get_pyplot, show_figure
+
+# maximum number of elements of the (samples x strategies x wtp) blocks computed at once
+MAX_BLOCK_SIZE = 2 ** 22
+
+
+class CostEffectivenessAnalysis:
+    """ cost-effectiveness analysis of any number of strategies: the efficient frontier, ICERs,
+    net monetary benefits and cost-effectiveness acceptability curves, vectorized over
+    observations (patients, cohorts or parameter samples), strategies and willingness-to-pay values """
+
+    def __init__(self, strategy_names, cost_obs, effect_obs, colors=None, if_paired=False):
+        """
+        :param strategy_names: (list) of strategy names
+        :param cost_obs: (list) of the observed costs under each strategy
+        :param effect_obs: (list) of the observed effects (e.g. QALY) under each strategy
+        :param colors: (list) of colors of strategies in figures
+        :param if_paired: set to True if the i-th observations of all strategies are paired
+            (simulated with the same common random numbers or the same sample of parameters)
+        """
+
+        if len({len(obs) for obs in cost_obs} | {len(obs) for obs in effect_obs}) != 1:
+            raise ValueError('All strategies need the same number of observations.')
+
+        self.strategyNames = list(strategy_names)
+        self.costs = np.column_stack([np.asarray(obs, dtype=float) for obs in cost_obs])
+        self.effects = np.column_stack([np.asarray(obs, dtype=float) for obs in effect_obs])
+        self.nObs, self.nStrategies = self.costs.shape
+        self.colors = colors
+        self.ifPaired = if_paired
+
+        self.meanCosts = self.costs.mean(axis=0)
+        self.meanEffects = self.effects.mean(axis=0)
+
+        self.frontier = []  # indices of strategies on the efficient frontier (in the order of cost)
+        self.status = []    # 'On frontier', 'Dominated' or 'Extendedly dominated' for each strategy
+        self._find_frontier()
+
+    def _find_frontier(self):
+        """ finds the strategies on the efficient frontier after removing the strategies that are
+        strictly dominated (more costly and not more effective than another strategy) and
+        extendedly dominated (less effective and more costly than a combination of two other strategies) """
+
+        self.status = ['Dominated'] * self.nStrategies
+        frontier = []
+        # in the order of cost (and of effect from the highest for equal costs)
+        for i in np.lexsort((-self.meanEffects, self.meanCosts)):
+            if len(frontier) > 0 and self.meanEffects[i] <= self.meanEffects[frontier[-1]]:
+                continue
+            # the last strategy on the frontier is extendedly dominated if its ICER is higher than
+            # the ICER of this strategy with respect to the strategy before it
+            while len(frontier) >= 2 and self._get_icer(frontier[-2], frontier[-1]) >= self._get_icer(frontier[-2], i):
+                self.status[frontier.pop()] = 'Extendedly dominated'
+            frontier.append(i)
+
+        for i in frontier:
+            self.status[i] = 'On frontier'
+        self.frontier = [int(i) for i in frontier]
+
+    def _get_icer(self, ref, i):
+        return (self.meanCosts[i] - self.meanCosts[ref]) / (self.meanEffects[i] - self.meanEffects[ref])
+
+    def get_icers(self):
+        """
+        :return: (dictionary) of strategy name: ICER with respect to the previous strategy on the
+            efficient frontier (for the strategies on the frontier except the least costly one)
+        """
+        return {self.strategyNames[i]: self._get_icer(ref, i) for ref, i in zip(self.frontier[:-1], self.frontier[1:])}
+
+    def get_mean_interval(self, obs, interval_type='c', alpha=0.05):
+        """
+        :param obs: (n_obs x ... array) observations
+        :param interval_type: 'c' for the confidence interval of the mean, 'p' for the percentile
+            (projection) interval of the observations
+        :param alpha: significance level
+        :return: (mean, lower bound, upper bound) along the first axis
+        """
+
+        mean = obs.mean(axis=0)
+        if interval_type == 'c':
+            half_length = stats.t.ppf(1 - alpha / 2, self.nObs - 1) * obs.std(axis=0, ddof=1) / np.sqrt(self.nObs)
+            return mean, mean - half_length, mean + half_length
+        elif interval_type == 'p':
+            lower, upper = np.percentile(obs, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+            return mean, lower, upper
+        else:
+            raise ValueError('Invalid interval type.')
+
+    def get_incremental_interval(self, obs, ref, interval_type='c', alpha=0.05):
+        """
+        :param obs: (n_obs x n_strategies array) observations (e.g. self.costs or self.effects)
+        :param ref: index of the reference strategy
+        :param interval_type: 'c' for the confidence interval of the mean difference, 'p' for the
+            percentile (projection) interval of the differences of paired observations
+        :param alpha: significance level
+        :return: (mean, lower bound, upper bound) of the difference of each strategy from the reference strategy
+        """
+
+        if self.ifPaired:
+            return self.get_mean_interval(obs - obs[:, [ref]], interval_type=interval_type, alpha=alpha)
+        if interval_type != 'c':
+            raise ValueError('Percentile intervals of differences need paired observations.')
+
+        # difference of the means of independent observations with the Welch variance
+        variances = obs.var(axis=0, ddof=1)
+        mean = obs.mean(axis=0) - obs[:, ref].mean()
+        half_length = self._get_welch_half_length(variances=variances, ref_variances=variances[ref], alpha=alpha)
+        half_length[ref] = 0
+        return mean, mean - half_length, mean + half_length
+
+    def _get_welch_half_length(self, variances, ref_variances, alpha):
+        """
+        :param variances: (array) variances of the observations of strategies
+        :param ref_variances: (array) variances of the observations of the reference strategy
+        :param alpha: significance level
+        :return: (array) half-length of the Welch confidence interval of the difference of means
+            of independent observations
+        """
+        variance = (variances + ref_variances) / self.nObs
+        denominator = (variances ** 2 + ref_variances ** 2) / self.nObs ** 2
+        # Welch-Satterthwaite degrees of freedom
+        df = np.divide((self.nObs - 1) * variance ** 2, denominator,
+                       out=np.full(np.shape(variance), self.nObs - 1.0), where=denominator > 0)
+        return stats.t.ppf(1 - alpha / 2, df) * np.sqrt(variance)
+
+    def get_incremental_nmbs(self, wtps, ref=0, interval_type='c', alpha=0.05):
+        """
+        :param wtps: (array) willingness-to-pay values
+        :param ref: index of the reference strategy
+        :param interval_type: 'c' for confidence intervals, 'p' for percentile (projection) intervals
+            (only for paired observations)
+        :param alpha: significance level
+        :return: (mean, lower bound, upper bound) of the incremental net monetary benefit of each
+            strategy with respect to the reference strategy, each a (n_strategies x n_wtps array)
+        """
+
+        wtps = np.asarray(wtps, dtype=float)
+        mean = wtps * (self.meanEffects - self.meanEffects[ref])[:, np.newaxis] \
+            - (self.meanCosts - self.meanCosts[ref])[:, np.newaxis]
+
+        if interval_type == 'c':
+            if self.ifPaired:
+                effects = self.effects - self.effects[:, [ref]]
+                costs = self.costs - self.costs[:, [ref]]
+            else:
+                effects, costs = self.effects, self.costs
+            # the variance of w * effect - cost is quadratic in w
+            variances = np.outer(effects.var(axis=0, ddof=1), wtps ** 2) \
+                - 2 * np.outer(_get_covariances(effects, costs), wtps) + costs.var(axis=0, ddof=1)[:, np.newaxis]
+            variances = np.maximum(variances, 0)
+            if self.ifPaired:
+                half_length = stats.t.ppf(1 - alpha / 2, self.nObs - 1) * np.sqrt(variances / self.nObs)
+            else:
+                half_length = self._get_welch_half_length(variances=variances, ref_variances=variances[ref],
+                                                          alpha=alpha)
+            # no uncertainty about the reference strategy with respect to itself
+            half_length[ref] = 0
+            return mean, mean - half_length, mean + half_length
+
+        elif interval_type == 'p':
+            if not self.ifPaired:
+                raise ValueError('Percentile intervals of differences need paired observations.')
+            d_effects = self.effects - self.effects[:, [ref]]
+            d_costs = self.costs - self.costs[:, [ref]]
+            lower = np.empty_like(mean)
+            upper = np.empty_like(mean)
+            for block in self._get_wtp_blocks(len(wtps)):
+                nmb = wtps[block] * d_effects[:, :, np.newaxis] - d_costs[:, :, np.newaxis]
+                lower[:, block], upper[:, block] = np.percentile(
+                    nmb, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+            return mean, lower, upper
+
+        else:
+            raise ValueError('Invalid interval type.')
+
+    def get_acceptability_curves(self, wtps, n_bootstraps=None, seed=0):
+        """
+        :param wtps: (array) willingness-to-pay values
+        :param n_bootstraps: number of bootstrap samples of the mean cost and effect
+            (None to use the observations themselves, e.g. when they come from parameter samples)
+        :param seed: seed of the bootstrap
+        :return: (n_strategies x n_wtps array) probability that each strategy has the highest
+            net monetary benefit at each willingness-to-pay value
+        """
+
+        wtps = np.asarray(wtps, dtype=float)
+        if n_bootstraps is None:
+            costs, effects = self.costs, self.effects
+        else:
+            costs, effects = self.get_bootstrap_means(n_bootstraps=n_bootstraps, seed=seed)
+
+        counts = np.zeros((self.nStrategies, len(wtps)))
+        for block in self._get_wtp_blocks(len(wtps), n_obs=len(costs)):
+            # (samples x strategies x wtp) net monetary benefits
+            nmb = wtps[block] * effects[:, :, np.newaxis] - costs[:, :, np.newaxis]
+            best = nmb.argmax(axis=1)
+            for i in range(self.nStrategies):
+                counts[i, block] = np.count_nonzero(best == i, axis=0)
+
+        return counts / len(costs)
+
+    def get_bootstrap_means(self, n_bootstraps, seed=0):
+        """
+        :param n_bootstraps: number of bootstrap samples
+        :param seed: seed of the bootstrap
+        :return: (n_bootstraps x n_strategies arrays) bootstrap means of costs and of effects
+            (paired observations are resampled together)
+        """
+
+        rng = np.random.RandomState(seed=seed)
+        # costs and effects are resampled together as complex numbers
+        values = self.costs + 1j * self.effects
+        strategies = np.arange(self.nStrategies)
+        means = np.empty((n_bootstraps, self.nStrategies), dtype=complex)
+
+        # resamples are drawn in blocks that keep the resampled observations within MAX_BLOCK_SIZE
+        block_size = max(MAX_BLOCK_SIZE // (self.nObs * self.nStrategies), 1)
+        for start in range(0, n_bootstraps, block_size):
+            n = min(block_size, n_bootstraps - start)
+            if self.ifPaired:
+                indices = rng.randint(0, self.nObs, size=(n, self.nObs))
+                means[start:start + n] = values[indices].mean(axis=1)
+            else:
+                indices = rng.randint(0, self.nObs, size=(n, self.nObs, self.nStrategies))
+                means[start:start + n] = values[indices, strategies].mean(axis=1)
+
+        return means.real, means.imag
+
+    def _get_wtp_blocks(self, n_wtps, n_obs=None):
+        """
+        :return: (list) of slices of willingness-to-pay values that keep the
+            (samples x strategies x wtp) blocks within MAX_BLOCK_SIZE
+        """
+        n_obs = self.nObs if n_obs is None else n_obs
+        block_size = max(MAX_BLOCK_SIZE // (n_obs * self.nStrategies), 1)
+        return [slice(start, start + block_size) for start in range(0, n_wtps, block_size)]
+
+    def build_CE_table(self, interval_type='c', alpha=0.05, cost_digits=0, effect_digits=2, icer_digits=2,
+                       file_name='CETable.csv', n_bootstraps=1000):
+        """ writes the cost-effectiveness table (strategies in the order of cost) to a csv file
+        :param interval_type: 'c' for confidence intervals (BCa bootstrap intervals for ICERs),
+            'p' for percentile (projection) intervals (no intervals for ICERs)
+        :param alpha: significance level
+        :param cost_digits: digits to round costs to
+        :param effect_digits: digits to round effects to
+        :param icer_digits: digits to round ICERs to
+        :param file_name: name of the csv file
+        :param n_bootstraps: number of bootstrap resamples for the confidence intervals of ICERs
+        """
+
+        costs = self.get_mean_interval(self.costs, interval_type=interval_type, alpha=alpha)
+        effects = self.get_mean_interval(self.effects, interval_type=interval_type, alpha=alpha)
+
+        with open(file_name, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['Strategy', 'Status', 'Expected cost', 'Expected effect',
+                             'Incremental cost', 'Incremental effect', 'ICER'])
+            for i in np.lexsort((-self.meanEffects, self.meanCosts)):
+                row = [self.strategyNames[i], self.status[i],
+                       _format_interval(costs, i, cost_digits), _format_interval(effects, i, effect_digits)]
+                position = self.frontier.index(i) if i in self.frontier else 0
+                if position > 0:
+                    ref = self.frontier[position - 1]
+                    incremental_costs = self.get_incremental_interval(
+                        self.costs, ref=ref, interval_type=interval_type, alpha=alpha)
+                    incremental_effects = self.get_incremental_interval(
+                        self.effects, ref=ref, interval_type=interval_type, alpha=alpha)
+                    if interval_type == 'c':
+                        bootstrap = IncrementalBootstrap(costs=self.costs[:, i], effects=self.effects[:, i],
+                                                         ref_costs=self.costs[:, ref], ref_effects=self.effects[:, ref],
+                                                         if_paired=self.ifPaired)
+                        bootstrap.resample(n_resamples=n_bootstraps)
+                        icer = '{:,.{prec}f} ({:,.{prec}f}, {:,.{prec}f})'.format(
+                            *bootstrap.get_icer_interval(interval=Interval.BCA, alpha=alpha), prec=icer_digits)
+                    else:
+                        icer = '{:,.{prec}f}'.format(self._get_icer(ref, i), prec=icer_digits)
+                    row += [_format_interval(incremental_costs, i, cost_digits),
+                            _format_interval(incremental_effects, i, effect_digits),
+                            icer]
+                else:
+                    row += ['', '', '']
+                writer.writerow(row)
+
+    def plot_CE_plane(self, title='Cost-Effectiveness Plane', x_label='Expected effect', y_label='Expected cost',
+                      fig_size=(6, 5), add_clouds=True, transparency=0.2):
+        """ plots the expected cost and effect of strategies, the efficient frontier and
+        (optionally) the clouds of observations """
+
+        plt = get_pyplot()
+        fig, ax = plt.subplots(figsize=fig_size)
+        for i, name in enumerate(self.strategyNames):
+            color = None if self.colors is None else self.colors[i]
+            if add_clouds:
+                ax.scatter(self.effects[:, i], self.costs[:, i], color=color, alpha=transparency, s=10)
+            ax.scatter(self.meanEffects[i], self.meanCosts[i], color=color, edgecolors='black', s=60, label=name)
+        ax.plot(self.meanEffects[self.frontier], self.meanCosts[self.frontier], color='black', linestyle='--')
+
+        ax.set_title(title)
+        ax.set_xlabel(x_label)
+        ax.set_ylabel(y_label)
+        ax.legend()
+        show_figure(figure=fig, name=title)
+
+    def plot_incremental_nmbs(self, wtps, ref=0, title='Incremental Net Monetary Benefit',
+                              x_label='Willingness-to-pay per QALY ($)', y_label='Incremental Net Monetary Benefit ($)',
+                              interval_type='c', alpha=0.05, fig_size=(6, 5)):
+        """ plots the incremental net monetary benefit of strategies with respect to the reference strategy """
+
+        mean, lower, upper = self.get_incremental_nmbs(wtps=wtps, ref=ref, interval_type=interval_type, alpha=alpha)
+
+        plt = get_pyplot()
+        fig, ax = plt.subplots(figsize=fig_size)
+        for i, name in enumerate(self.strategyNames):
+            if i == ref:
+                continue
+            color = None if self.colors is None else self.colors[i]
+            ax.plot(wtps, mean[i], color=color, label=name)
+            ax.fill_between(wtps, lower[i], upper[i], color=color, alpha=0.2)
+        ax.axhline(y=0, color='black', linewidth=0.5)
+
+        ax.set_title(title)
+        ax.set_xlabel(x_label)
+        ax.set_ylabel(y_label)
+        ax.legend()
+        show_figure(figure=fig, name=title)
+
+    def plot_acceptability_curves(self, wtps, n_bootstraps=None, title='Cost-Effectiveness Acceptability Curves',
+                                  x_label='Willingness-to-pay per QALY ($)', y_label='Probability of being optimal',
+                                  fig_size=(6, 5)):
+        """ plots the cost-effectiveness acceptability curves of strategies """
+
+        probabilities = self.get_acceptability_curves(wtps=wtps, n_bootstraps=n_bootstraps)
+
+        plt = get_pyplot()
+        fig, ax = plt.subplots(figsize=fig_size)
+        for i, name in enumerate(self.strategyNames):
+            color = None if self.colors is None else self.colors[i]
+            ax.plot(wtps, probabilities[i], color=color, label=name)
+
+        ax.set_title(title)
+        ax.set_xlabel(x_label)
+        ax.set_ylabel(y_label)
+        ax.set_ylim(0, 1)
+        ax.legend()
+        show_figure(figure=fig, name=title)
+
+
+def _get_covariances(x, y):
+    """
+    :return: (array) sample covariance of each column of x with the same column of y
+    """
+    return ((x - x.mean(axis=0)) * (y - y.mean(axis=0))).sum(axis=0) / (len(x) - 1)
+
+
+def _format_interval(mean_interval, i, digits):
+    """
+    :return: (string) 'mean (lower, upper)' of the i-th strategy
+    """
+    mean, lower, upper = (values[i] for values in mean_interval)
+    return '{:,.{prec}f} ({:,.{prec}f}, {:,.{prec}f})'.format(mean, lower, upper, prec=digits)
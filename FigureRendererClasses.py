@@ -0,0 +1,152 @@
+import atexit
+import multiprocessing
+import os
+import pickle
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# renderer of figures in headless mode (None to show figures interactively)
+_renderer = None
+
+
+def _save_figure(figure_data, path, dpi):
+    """ renders a pickled figure to a file (run by the rendering process)
+    :param figure_data: (bytes) pickled figure
+    :param path: path of the figure file
+    :param dpi: resolution of the figure
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    pickle.loads(figure_data).savefig(path, dpi=dpi)
+
+
+class FigureRenderer:
+    """ saves figures to files in a background process, so that the simulation can continue
+    while figures are rendered (figures are rendered one at a time in the order they are saved);
+    pyplot and the Agg backend are not thread-safe, so figures are rendered by a separate process
+    that shares no matplotlib state with the figures being drawn; the process is forked, since a spawned
+    process would re-run the script that started it, so where fork is not available (e.g. Windows)
+    figures are rendered in the calling thread instead """
+
+    def __init__(self, directory='figures', file_format='png', dpi=100):
+        """
+        :param directory: directory to save figures in (created if it does not exist)
+        :param file_format: format of figure files (e.g. 'png', 'pdf' or 'svg')
+        :param dpi: resolution of figures (dots per inch)
+        """
+        self.directory = directory
+        self.fileFormat = file_format
+        self.dpi = dpi
+        self.fileNames = []     # names of the files of figures saved so far
+        # (None to render figures in the calling thread)
+        if 'fork' in multiprocessing.get_all_start_methods():
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('fork'))
+        else:
+            self._executor = None
+        self._futures = []
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, figure, name):
+        """ closes the figure in pyplot and renders it to a file in the background
+        :param figure: (matplotlib Figure) figure to save
+        :param name: name of the figure (e.g. its title) that the file is named after
+        :return: path of the figure file
+        """
+
+        # file names are unique within a run
+        stem = re.sub(r'[^\w\-]+', '_', name).strip('_') or 'figure'
+        file_name = '{}.{}'.format(stem, self.fileFormat)
+        n = 1
+        while file_name in self.fileNames:
+            n += 1
+            file_name = '{}_{}.{}'.format(stem, n, self.fileFormat)
+        self.fileNames.append(file_name)
+        path = os.path.join(self.directory, file_name)
+
+        get_pyplot().close(figure)
+        if self._executor is None:
+            figure.savefig(path, dpi=self.dpi)
+            return path
+        try:
+            figure_data = pickle.dumps(figure)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # figures with artists that cannot be pickled are rendered here
+            figure.savefig(path, dpi=self.dpi)
+        else:
+            self._futures.append(self._executor.submit(_save_figure, figure_data, path, self.dpi))
+        return path
+
+    def wait(self):
+        """ waits until all figures are saved (raises the error of a figure that failed to render) """
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        """ saves the remaining figures and stops the background process """
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+
+def set_headless(directory='figures', file_format='png', dpi=100):
+    """ switches to headless mode: figures are saved to files in the background instead of shown
+    (call before any figure is drawn)
+    :param directory: directory to save figures in
+    :param file_format: format of figure files
+    :param dpi: resolution of figures
+    :return: (FigureRenderer) renderer of figures
+    """
+    global _renderer
+
+    # a non-interactive backend (effective if pyplot is not used yet)
+    import matplotlib
+    matplotlib.use('Agg')
+
+    if _renderer is not None:
+        _renderer.close()
+    _renderer = FigureRenderer(directory=directory, file_format=file_format, dpi=dpi)
+    # figures drawn by the end of the run are saved before the interpreter exits
+    atexit.register(_renderer.close)
+    return _renderer
+
+
+def is_headless():
+    """
+    :return: True if figures are saved to files instead of shown
+    """
+    return _renderer is not None
+
+
+def get_pyplot():
+    """
+    :return: matplotlib.pyplot (imported when a figure is first requested)
+    """
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def show_figure(figure, name):
+    """ shows the figure, or saves it to a file in the background in headless mode
+    :param figure: (matplotlib Figure) figure
+    :param name: name of the figure (e.g. its title)
+    """
+    if _renderer is None:
+        get_pyplot().show()
+    else:
+        _renderer.save(figure=figure, name=name)
+
+
+def save_current_figure(name):
+    """ saves the current figure of pyplot in headless mode (for figures drawn and shown by
+    SimPy.Plots, which are shown by SimPy in the interactive mode)
+    :param name: name of the figure (e.g. its title)
+    """
+    if _renderer is not None:
+        _renderer.save(figure=get_pyplot().gcf(), name=name)
+
+
+def wait_for_figures():
+    """ waits until the figures saved in headless mode are rendered """
+    if _renderer is not None:
+        _renderer.wait()
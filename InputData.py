@@ -6,6 +6,7 @@ POP_SIZE = 1000         # cohort population size
 SIMULATION_LENGTH = 50    # length of simulation (years)
 ALPHA = 0.05        # significance level for calculating confidence intervals
 DISCOUNT = 0.03     # annual discount rate
+USE_OUTCOME_CACHE = False   # set to True to reuse the outcomes of cohorts cached in .outcome_cache
 class Treatment(Enum):
     HPV_SCREEN = 0
     CRYT_SCREEN = 1
@@ -65,81 +66,121 @@ DUAL_SCRREN_FREQUENCE = 5
 
 
 
-def get_trans_rate_matrix(with_treatment):
+def get_screen_frequency(treatment):
     """
-    :param with_treatment:  to calculate the transition rate matrix when the anticoagulation is used
-
-    :return: transition rate matrix
+    :param treatment: selected treatment
+    :return: number of years between screenings
     """
-    #  WELL->WELLSCREENING  PRECANCER->PRECANCERSCREEN
-    if with_treatment == Treatment.HPV_SCREEN:
-        lambda13 = 1 / HPV_SCREEN_FREQUENCY
-        rr = 1-HPV_SCREEN_RR
-
-    if with_treatment == Treatment.CRYT_SCREEN:
-        lambda13 = 1 / CRYT_SCREEN_FREQUENCY
-        rr = 1-CRYT_SCREEN_RR
-
-    if with_treatment == Treatment.DUAL_SCREEN:
-        lambda13 = 1 / DUAL_SCRREN_FREQUENCE
-        rr = 1-DUAL_SCREEN_RR
+    if treatment == Treatment.HPV_SCREEN:
+        return HPV_SCREEN_FREQUENCY
+    if treatment == Treatment.CRYT_SCREEN:
+        return CRYT_SCREEN_FREQUENCY
+    if treatment == Treatment.DUAL_SCREEN:
+        return DUAL_SCRREN_FREQUENCE
 
 
+def get_screen_rr(treatment):
+    """
+    :param treatment: selected treatment
+    :return: sensitivity of the screening
+    """
+    if treatment == Treatment.HPV_SCREEN:
+        return HPV_SCREEN_RR
+    if treatment == Treatment.CRYT_SCREEN:
+        return CRYT_SCREEN_RR
+    if treatment == Treatment.DUAL_SCREEN:
+        return DUAL_SCREEN_RR
 
-    # Part 1: find the annual probability of non-cervical-cancer death
-    annual_prob_non_cervicalcancer_mort = (ANNUAL_PROB_ALL_CAUSE_MORT - ANNUAL_PROB_CERVICALCANCER_MORT)
-    lambda0 = -np.log(1 - annual_prob_non_cervicalcancer_mort)
 
-    # Part 2: lambda 1  WELL->PRECANCER
-    lambda1 = -np.log(1 - PROB_WELL_PRECANCER)
+def get_trans_rate_matrix(with_treatment):
+    """
+    :param with_treatment:  to calculate the transition rate matrix when the anticoagulation is used
 
-    # Part 3 WELL->CANCER
-    lambda2 = -np.log(1 - PROB_WELL_CANCER)
+    :return: transition rate matrix
+    """
 
-    # Part 4 PRECANCERTREATMENT->WELL
-    lambda3 = 1 / PRECANCERTREATMENT_DURATION
+    rate_matrices = get_trans_rate_matrices(screen_frequency=get_screen_frequency(with_treatment),
+                                            screen_rr=get_screen_rr(with_treatment))
+    return rate_matrices[0].tolist()
+
+
+def get_trans_rate_matrices(screen_frequency, screen_rr,
+                            prob_well_precancer=PROB_WELL_PRECANCER,
+                            prob_well_cancer=PROB_WELL_CANCER,
+                            prob_precancer_cancer=PROB_PRECANCER_CANCER,
+                            prob_cancer_death=PROB_CANCEL_DEATH,
+                            annual_prob_all_cause_mort=ANNUAL_PROB_ALL_CAUSE_MORT,
+                            annual_prob_cervicalcancer_mort=ANNUAL_PROB_CERVICALCANCER_MORT,
+                            screen_duration=SCREEN_DURATION,
+                            precancer_treatment_duration=PRECANCERTREATMENT_DURATION,
+                            cancer_treatment_duration=CANCERTREATMENT_DURATION):
+    """ builds the transition rate matrices of N parameter samples at once
+    (each input is a number or an array of length N)
+
+    :param screen_frequency: number of years between screenings
+    :param screen_rr: sensitivity of the screening
+    :param prob_well_precancer: annual probability of WELL->PRE_CANCER
+    :param prob_well_cancer: annual probability of WELL->CANCER
+    :param prob_precancer_cancer: annual probability of PRE_CANCER->CANCER
+    :param prob_cancer_death: annual probability of CANCER->CANCER_DEATH
+    :param annual_prob_all_cause_mort: annual probability of death from all causes
+    :param annual_prob_cervicalcancer_mort: annual probability of death from cervical cancer
+    :param screen_duration: duration of a screening (years)
+    :param precancer_treatment_duration: duration of the treatment of pre-cancer (years)
+    :param cancer_treatment_duration: duration of the treatment of cancer (years)
+    :return: (N x 9 x 9 array) transition rate matrices
+    """
 
-    # Part 5 PRECANCER->CANCER
-    lambda4 = -np.log(1 - PROB_PRECANCER_CANCER)
+    freq, rr, p_well_precancer, p_well_cancer, p_precancer_cancer, p_cancer_death = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(x, dtype=float)) for x in (
+            screen_frequency, screen_rr, prob_well_precancer, prob_well_cancer,
+            prob_precancer_cancer, prob_cancer_death)])
+    rr = 1 - rr
 
-    # part 6 CANCER->DEATH
-    lambda5 = -np.log(1 - PROB_CANCEL_DEATH)
+    # annual rate of non-cervical-cancer death
+    annual_prob_non_cervicalcancer_mort = (annual_prob_all_cause_mort - annual_prob_cervicalcancer_mort)
+    lambda0 = -np.log(1 - annual_prob_non_cervicalcancer_mort)
+    # rate of leaving the screening states
+    screen_rate = 1 / screen_duration
 
-    # Part 7 WELLSCREENING->PRECANCERTREATMENT
-    lambda6 = (1 / SCREEN_DURATION)*PROB_WELL_PRECANCER
+    well, well_screening, pre_cancer, pre_cancer_screening, pre_cancer_treatment, \
+        cancer, cancer_treatment, cancer_death, other_death = [s.value for s in HealthStates]
 
-    # part 8 WELLSCREENING->CANCERTREATMENT
-    lambda7 = (1 / SCREEN_DURATION)*PROB_WELL_CANCER
+    rate_matrices = np.zeros((freq.shape[0], len(HealthStates), len(HealthStates)))
 
-    # WELL->WELL
+    # WELL
+    rate_matrices[:, well, well_screening] = 1 / freq
+    rate_matrices[:, well, pre_cancer] = -np.log(1 - p_well_precancer)
+    rate_matrices[:, well, cancer] = -np.log(1 - p_well_cancer)
+    rate_matrices[:, well, other_death] = lambda0
 
-    lambda8 = -np.log(1 - PROB_WELL_WELL)
+    # WELL_SCREENING
+    rate_matrices[:, well_screening, well] = screen_rate * (1 - p_well_cancer - p_well_precancer)
+    rate_matrices[:, well_screening, pre_cancer_treatment] = screen_rate * p_well_precancer * rr
+    rate_matrices[:, well_screening, cancer_treatment] = screen_rate * p_well_cancer * rr
+    rate_matrices[:, well_screening, other_death] = lambda0 * screen_rate * rr
 
-    # WELLSCREENING->WElL
-    lambda9 = (1/SCREEN_DURATION)*PROB_WELL_WELL
+    # PRE_CANCER
+    rate_matrices[:, pre_cancer, pre_cancer_screening] = 1 / freq
+    rate_matrices[:, pre_cancer, cancer] = -np.log(1 - p_precancer_cancer) * rr
+    rate_matrices[:, pre_cancer, other_death] = lambda0
 
-    # PRECANCERSCREENING->CANCERTREATMENT
-    lambda10 = (1/SCREEN_DURATION)*PROB_PRECANCER_CANCER
+    # PRE_CANCER_SCREENING
+    rate_matrices[:, pre_cancer_screening, pre_cancer_treatment] = screen_rate * (1 - p_precancer_cancer) * rr
+    rate_matrices[:, pre_cancer_screening, cancer_treatment] = screen_rate * p_precancer_cancer * rr
+    rate_matrices[:, pre_cancer_screening, other_death] = lambda0 * screen_rate * rr
 
-    #  PRECANCERSCREENING->PRECANTREATMENT
-    lambda11 = (1/SCREEN_DURATION)*(1-PROB_PRECANCER_CANCER)
+    # PRE_CANCER_TREATMENT
+    rate_matrices[:, pre_cancer_treatment, well] = 1 / precancer_treatment_duration
+    rate_matrices[:, pre_cancer_treatment, other_death] = lambda0 * (1 / precancer_treatment_duration)
 
-    #  CANCERTREATMENT->CANCER
-    lambda12 = 1/CANCERTREATMENT_DURATION
+    # CANCER
+    rate_matrices[:, cancer, cancer_death] = -np.log(1 - p_cancer_death)
 
+    # CANCER_TREATMENT
+    rate_matrices[:, cancer_treatment, cancer] = 1 / cancer_treatment_duration
 
-    rate_matrix = [
-    [0, lambda13, lambda1, 0, 0, lambda2, 0, 0, lambda0],  # WELL
-    [lambda9, 0, 0, 0, lambda6*rr, 0, lambda7*rr, 0, lambda0*(1/SCREEN_DURATION)*rr],  # WELL_SCREENING
-    [0, 0, 0, lambda13, 0, lambda4*rr, 0, 0, lambda0],  # PRE_CANCER
-    [0, 0, 0, 0, lambda11*rr, 0, lambda10*rr, 0, lambda0*(1/SCREEN_DURATION)*rr],  # PRE_CANCER_SCREENING
-    [lambda3, 0, 0, 0, 0, 0, 0, 0, lambda0*(1/PRECANCERTREATMENT_DURATION)],  # PRE_CANCER_TREATMENT
-    [0, 0, 0, 0, 0, 0, 0, lambda5, 0],  # CANCER
-    [0, 0, 0, 0, 0, lambda12, 0, 0, 0],  # CANCER_TREATMENT
-    [0, 0, 0, 0, 0, 0, 0, 0, 0],  # CANCER_DEATH
-    [0, 0, 0, 0, 0, 0, 0, 0, 0]  # OTHER_DEATH
-    ]
-    return rate_matrix
+    return rate_matrices
 
 
 
@@ -1,25 +1,72 @@
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+
 import numpy as np
 
-import SimPy.EconEval as Econ
-import SimPy.Markov as Markov
 import SimPy.SamplePath as Path
 import SimPy.Statistics as Stat
 from InputData import HealthStates
+from ProfilerClasses import SimulationProfiler, time_stage
+from StreamingStatClasses import StreamingStat
+
+
+class Engine(Enum):
+    """ engines to simulate a cohort """
+    PATIENT = 0     # one Gillespie process per patient
+    VECTORIZED = 1  # all patients of the cohort advanced together as NumPy arrays
+
+
+class RandomStreams(Enum):
+    """ random number streams of a patient under common random numbers """
+    BACKGROUND_MORTALITY = 0
+    DISEASE_PROGRESSION = 1
+    SCREENING = 2
+
+
+# number of patients the vectorized engine simulates together (bounds the memory it needs)
+VECTORIZED_BLOCK_SIZE = 100000
+
+# version of the simulation engines (part of the keys of cached outcomes;
+# increase it when a change to the engines changes the simulated outcomes)
+ENGINE_VERSION = 1
+
+# short-lived states that can be folded into the exits of the states leading to them
+SCREENING_STATES = (HealthStates.WELL_SCREENING, HealthStates.PRE_CANCER_SCREENING)
 
 
 class Patient:
-    def __init__(self, id, parameters):
+    def __init__(self, id, parameters, model=None, crn_seed=None, profiler=None):
 
         self.id = id
         self.params = parameters
-        self.stateMonitor = PatientStateMonitor(parameters=parameters)
+        # compiled model (shared by the patients of a cohort)
+        self.model = CompiledModel(parameters=parameters) if model is None else model
+        # seed of this patient's random number streams under common random numbers
+        self.crnSeed = crn_seed
+        self.stateMonitor = PatientStateMonitor(parameters=parameters, model=self.model, profiler=profiler)
+        self.nEvents = 0    # number of jumps simulated
+        # (SimulationProfiler) profiler to count events and time the stages of the simulation (or None)
+        self.profiler = profiler
 
     def simulate(self, sim_length):
 
-        # random number generator for this patient
-        rng = np.random.RandomState(seed=self.id)
-        # gillespie algorithm
-        gillespie = Markov.Gillespie(transition_rate_matrix=self.params.transRateMatrix)
+        if self.crnSeed is None:
+            # random number generator for this patient
+            rng = np.random.RandomState(seed=self.id)
+            # gillespie algorithm over the precompiled transition tables
+            gillespie = self.model
+        else:
+            # one generator per random number stream (held by the algorithm)
+            rng = None
+            gillespie = CommonRandomNumbersGillespie(model=self.model, seed=self.crnSeed)
+        n_states = self.model.nStates
+
+        get_next_state = gillespie.get_next_state
+        update = self.stateMonitor.update
+        profiler = self.profiler
+        if profiler is not None:
+            get_next_state = profiler.get_timed(get_next_state, 'Gillespie sampling')
+            update = profiler.get_timed(update, 'State updates')
 
         t = 0  # simulation time
         if_stop = False
@@ -28,7 +75,7 @@ class Patient:
             # find time until next event (dt), and next state
             # (note that the gillespie algorithm returns None for dt if the process
             # is in an absorbing state)
-            dt, new_state_index = gillespie.get_next_state(
+            dt, new_state_index = get_next_state(
                 current_state_index=self.stateMonitor.currentState.value,
                 rng=rng)
 
@@ -37,27 +84,41 @@ class Patient:
                 if_stop = True
 
             else:
+                current_state_index = self.stateMonitor.currentState.value
+                if_screened = False
                 # else if next event occurs beyond simulation length
                 if dt + t > sim_length:
                     # advance time to the end of the simulation and stop
                     t = sim_length
                     # the individual stays in the current state until the end of the simulation
-                    new_state_index = self.stateMonitor.currentState.value
+                    new_state_index = current_state_index
                     if_stop = True
                 else:
                     # advance time to the time of next event
                     t += dt
+                    self.nEvents += 1
+                    # jumps through an eliminated screening state are numbered after the health states
+                    if new_state_index >= n_states:
+                        new_state_index -= n_states
+                        if_screened = True
+                    if profiler is not None:
+                        profiler.count_transition(current_state_index, new_state_index)
                 # update health state
-                self.stateMonitor.update(time=t, new_state=HealthStates(new_state_index))
+                update(time=t, new_state=HealthStates(new_state_index))
+                # charge the screening that took place at this time
+                if if_screened:
+                    self.stateMonitor.costUtilityMonitor.add_lump_sum(
+                        cost=self.model.lumpCosts[current_state_index],
+                        utility=self.model.lumpUtilities[current_state_index])
 
 
 class PatientStateMonitor:
-    def __init__(self, parameters):
+    def __init__(self, parameters, model, profiler=None):
 
         self.currentState = parameters.initialHealthState    # assuming everyone starts in "Well"
         self.survivalTime = None
         self.nCancer = 0
-        self.costUtilityMonitor = PatientCostUtilityMonitor(parameters=parameters)
+        self.costUtilityMonitor = PatientCostUtilityMonitor(parameters=parameters, model=model, profiler=profiler)
 
     def update(self, time, new_state):
 
@@ -81,114 +142,1110 @@ class PatientStateMonitor:
 
 
 class PatientCostUtilityMonitor:
-    def __init__(self, parameters):
+    def __init__(self, parameters, model, profiler=None):
 
         self.tLastRecorded = 0  # time when the last cost and outcomes got recorded
 
         self.params = parameters
-        self.totalDiscountedCost = 0
-        self.totalDiscountedUtility = 0
+        self.model = model
+        # (SimulationProfiler) profiler to time the discounting (or None)
+        self.profiler = profiler
 
-    def update(self, time, current_state, next_state):
-
-        # cost (per unit of time) during the period since the last recording until now
-        cost = self.params.annualStateCosts[current_state.value]
-        if current_state == HealthStates.CANCER_TREATMENT:
-            cost += self.params.cancerTreatmentCost
-        if current_state == HealthStates.PRE_CANCER_TREATMENT:
-            cost += self.params.precancerTreatmentCost
+        # boundaries of the periods spent in each state and the state during each period
+        self._times = [0]
+        self._states = []
+        # screenings charged as lump sums (index of the period boundary when they occurred)
+        self._lumpBoundaries = []
+        self._lumpCosts = []
+        self._lumpUtilities = []
 
-        # discounted cost and utility (continuously compounded)
-        discounted_cost = Econ.pv_continuous_payment(payment=cost,
-                                                     discount_rate=self.params.discountRate,
-                                                     discount_period=(self.tLastRecorded, time))
+        self._totals = None     # (total discounted cost, total discounted utility)
 
+    @property
+    def totalDiscountedCost(self):
+        return self._get_totals()[0]
 
+    @property
+    def totalDiscountedUtility(self):
+        return self._get_totals()[1]
 
-        # utility (per unit of time) during the period since the last recording until now
-        utility = self.params.annualStateUtilities[current_state.value]
-        discounted_utility = Econ.pv_continuous_payment(payment=utility,
-                                                        discount_rate=self.params.discountRate,
-                                                        discount_period=(self.tLastRecorded, time))
+    def update(self, time, current_state, next_state):
 
-        # update total discounted cost and utility
-        self.totalDiscountedCost += discounted_cost
-        self.totalDiscountedUtility += discounted_utility
+        # record the period since the last recording until now
+        # (discounted cost and utility of all periods are calculated together when needed)
+        self._times.append(time)
+        self._states.append(current_state.value)
+        self._totals = None
 
         # update the time since last recording to the current time
         self.tLastRecorded = time
 
+    def add_lump_sum(self, cost, utility):
+        """ records a cost and a utility accrued at once at the time of the last recording
+        :param cost: cost
+        :param utility: utility
+        """
+
+        self._lumpBoundaries.append(len(self._times) - 1)
+        self._lumpCosts.append(cost)
+        self._lumpUtilities.append(utility)
+        self._totals = None
+
+    def get_trajectory(self):
+        """
+        :return: (numpy arrays) boundaries of the periods spent in each state, the state (value) during
+            each period and the index of the period boundary of each screening charged as a lump sum
+        """
+        return (np.array(self._times),
+                np.array(self._states, dtype=int),
+                np.array(self._lumpBoundaries, dtype=int))
+
+    def _get_totals(self):
+        """
+        :return: (total discounted cost, total discounted utility) calculated in one vectorized pass
+            over the recorded periods, where the discount factor at each period boundary is
+            evaluated once and shared by cost and utility
+        """
+
+        if self._totals is None:
+            with time_stage(self.profiler, 'Discounting'):
+                self._totals = self._calculate_totals()
+
+        return self._totals
+
+    def _calculate_totals(self):
+        # discounted cost and utility of the recorded periods and lump sums
+
+        times = np.array(self._times)
+        discounts = np.exp(-self.params.discountRate * times)
+        pv_factors = get_pv_factors(discount_rate=self.params.discountRate,
+                                    t0=times[:-1], t1=times[1:],
+                                    discounts0=discounts[:-1], discounts1=discounts[1:])
+
+        states = np.array(self._states, dtype=int)
+        cost = pv_factors @ self.model.costRates[states]
+        utility = pv_factors @ self.model.utilityRates[states]
+
+        if len(self._lumpBoundaries) > 0:
+            lump_discounts = discounts[self._lumpBoundaries]
+            cost += lump_discounts @ np.array(self._lumpCosts)
+            utility += lump_discounts @ np.array(self._lumpUtilities)
+
+        return float(cost), float(utility)
+
+
+def get_state_cost_utility_rates(parameters):
+    """
+    :param parameters: parameters
+    :return: (numpy arrays) annual cost and annual utility of each health state
+        (the cost of each treatment state includes the cost of that treatment)
+    """
+
+    cost_rates = np.array(parameters.annualStateCosts, dtype=float)
+    cost_rates[HealthStates.CANCER_TREATMENT.value] += parameters.cancerTreatmentCost
+    cost_rates[HealthStates.PRE_CANCER_TREATMENT.value] += parameters.precancerTreatmentCost
+
+    utility_rates = np.array(parameters.annualStateUtilities, dtype=float)
+
+    return cost_rates, utility_rates
+
+
+def get_pv_factors(discount_rate, t0, t1, discounts0, discounts1):
+    """
+    :param discount_rate: discount rate
+    :param t0: (numpy array) start of the payment periods
+    :param t1: (numpy array) end of the payment periods
+    :param discounts0: (numpy array) discount factors exp(-discount_rate * t0)
+    :param discounts1: (numpy array) discount factors exp(-discount_rate * t1)
+    :return: (numpy array) present value of a continuous payment of 1 per unit of time over [t0, t1]
+        (the vectorized equivalent of Econ.pv_continuous_payment with payment=1)
+    """
+
+    if discount_rate == 0:
+        return t1 - t0
+    else:
+        return (discounts0 - discounts1) / discount_rate
+
+
+def get_jump_rates(parameters, eliminate_screening=False):
+    """
+    :param parameters: parameters
+    :param eliminate_screening: set to True to fold the short-lived screening states into
+        branching probabilities on the exits of the states leading to them
+    :return: (jump_rates, lump_costs, lump_utilities) where
+        jump_rates[i, j] is the rate of jumping from state i to state j,
+        jump_rates[i, n + j] is the rate of jumping from state i to state j through a screening state
+        (n is the number of health states), and
+        lump_costs[i] and lump_utilities[i] are the cost and utility of a screening started from state i
+    """
+
+    n_states = len(HealthStates)
+    rate_matrix = np.array(parameters.transRateMatrix, dtype=float)
+    np.fill_diagonal(rate_matrix, 0)
+
+    jump_rates = np.zeros((n_states, 2 * n_states))
+    jump_rates[:, :n_states] = rate_matrix
+    lump_costs = np.zeros(n_states)
+    lump_utilities = np.zeros(n_states)
+
+    if eliminate_screening:
+        exit_rates = rate_matrix.sum(axis=1)
+        cost_rates, utility_rates = get_state_cost_utility_rates(parameters=parameters)
+
+        for state in SCREENING_STATES:
+            s = state.value
+            rates_in = rate_matrix[:, s]
+            # a patient leaves the screening state for state j with probability
+            # rate[s, j] / (rate out of s), so the jump to s branches into jumps to these states
+            jump_rates[:, n_states:] += np.outer(rates_in, rate_matrix[s] / exit_rates[s])
+            # expected cost and utility accrued during the (about a day long) stay in the screening state
+            # (each state leads to at most one screening state)
+            lump_costs[rates_in > 0] += cost_rates[s] / exit_rates[s]
+            lump_utilities[rates_in > 0] += utility_rates[s] / exit_rates[s]
+
+        for state in SCREENING_STATES:
+            jump_rates[:, state.value] = 0
+            jump_rates[state.value, :] = 0
+
+    return jump_rates, lump_costs, lump_utilities
+
+
+class CompiledModel:
+    """ transition tables and cost and utility rates of a parameter set, built once and
+    shared by all patients simulated with this parameter set """
+
+    def __init__(self, parameters, eliminate_screening=False):
+        """
+        :param parameters: parameters
+        :param eliminate_screening: set to True to fold the short-lived screening states into
+            branching probabilities on the exits of the states leading to them
+        """
+
+        self.nStates = len(HealthStates)
+        self.eliminateScreening = eliminate_screening
+
+        # rates of jumps out of each state (jumps through an eliminated screening state are
+        # numbered after the health states) and the cost and utility of each screening
+        jump_rates, self.lumpCosts, self.lumpUtilities = get_jump_rates(parameters=parameters,
+                                                                        eliminate_screening=eliminate_screening)
+
+        # total rate out of each state and the absorbing states
+        self.exitRates = jump_rates.sum(axis=1)
+        self.ifAbsorbing = self.exitRates == 0
+        # mean time until the next jump out of each non-absorbing state
+        self.meanSojournTimes = np.divide(1, self.exitRates,
+                                          out=np.full(self.nStates, np.inf), where=~self.ifAbsorbing)
+        # cumulative probabilities of the next jump given the current state
+        self.jumpCDFs = np.cumsum(jump_rates, axis=1) \
+            / np.where(self.ifAbsorbing, 1, self.exitRates)[:, np.newaxis]
+        # the last jump with a positive rate out of each state (guards against round-off in the cdfs)
+        self.lastJumps = jump_rates.shape[1] - 1 - np.argmax(jump_rates[:, ::-1] > 0, axis=1)
+
+        # rates and cumulative probabilities of the jumps driven by each random number stream
+        # (for common random numbers)
+        jump_streams = get_jump_streams()
+        n_streams = len(RandomStreams)
+        self.streamRates = np.zeros((self.nStates, n_streams))
+        self.streamCDFs = np.zeros((self.nStates, n_streams, jump_rates.shape[1]))
+        self.lastStreamJumps = np.zeros((self.nStates, n_streams), dtype=int)
+        for k in range(n_streams):
+            stream_rates = np.where(jump_streams == k, jump_rates, 0)
+            self.streamRates[:, k] = stream_rates.sum(axis=1)
+            self.streamCDFs[:, k] = np.cumsum(stream_rates, axis=1) \
+                / np.where(self.streamRates[:, k] > 0, self.streamRates[:, k], 1)[:, np.newaxis]
+            self.lastStreamJumps[:, k] = stream_rates.shape[1] - 1 - np.argmax(stream_rates[:, ::-1] > 0, axis=1)
+
+        # annual cost (including the cost of treatments) and annual utility of each state
+        self.costRates, self.utilityRates = get_state_cost_utility_rates(parameters=parameters)
+
+    def get_next_state(self, current_state_index, rng):
+        """
+        :param current_state_index: index of the current state
+        :param rng: random number generator
+        :return: (time until the next jump, index of the next jump)
+            or (None, None) if the current state is absorbing
+        """
+
+        if self.ifAbsorbing[current_state_index]:
+            return None, None
+
+        dt = rng.exponential(scale=self.meanSojournTimes[current_state_index])
+        jump = np.searchsorted(self.jumpCDFs[current_state_index], rng.random_sample(), side='right')
+
+        return dt, min(jump, self.lastJumps[current_state_index])
+
+
+def get_jump_streams():
+    """
+    :return: (numpy array) the random number stream (RandomStreams) of each jump
+        in the table returned by get_jump_rates
+    """
+
+    n_states = len(HealthStates)
+    screening_states = [state.value for state in SCREENING_STATES]
+
+    streams = np.full((n_states, 2 * n_states), RandomStreams.DISEASE_PROGRESSION.value)
+    streams[:, HealthStates.OTHER_DEATH.value] = RandomStreams.BACKGROUND_MORTALITY.value
+    # jumps into, out of and through screening states
+    streams[:, screening_states] = RandomStreams.SCREENING.value
+    streams[screening_states, :] = RandomStreams.SCREENING.value
+    streams[:, n_states:] = RandomStreams.SCREENING.value
+
+    return streams
+
+
+class CommonRandomNumbersGillespie:
+    """ next reaction method (Anderson, 2007) in which the jumps of each random number stream
+    (background mortality, disease progression, screening) are driven by a dedicated generator,
+    so that a patient's streams stay aligned when the same patient is simulated under different strategies """
+
+    def __init__(self, model, seed):
+        """
+        :param model: (CompiledModel) compiled model
+        :param seed: (list of ints) seed of the patient (streams are seeded with seed + [stream])
+        """
+        self._model = model
+        self._rngs = [np.random.RandomState(seed=list(seed) + [stream.value]) for stream in RandomStreams]
+
+        # integrated rate of each stream so far, and the integrated rate at which it fires next
+        self._internalTimes = np.zeros(len(self._rngs))
+        self._nextFirings = np.array([rng.exponential() for rng in self._rngs])
+
+    def get_next_state(self, current_state_index, rng=None):
+        """
+        :param current_state_index: index of the current state
+        :param rng: not used (each stream has its own generator)
+        :return: (time until the next jump, index of the next jump)
+            or (None, None) if the current state is absorbing
+        """
+
+        if self._model.ifAbsorbing[current_state_index]:
+            return None, None
+
+        # time until each stream fires at its rate in the current state
+        rates = self._model.streamRates[current_state_index]
+        waits = np.divide(self._nextFirings - self._internalTimes, rates,
+                          out=np.full(len(rates), np.inf), where=rates > 0)
+        k = int(np.argmin(waits))
+        dt = waits[k]
+
+        # advance the streams and draw the next firing of the stream that fired
+        self._internalTimes += rates * dt
+        self._nextFirings[k] += self._rngs[k].exponential()
+
+        # jump among those driven by the stream that fired
+        jump = np.searchsorted(self._model.streamCDFs[current_state_index, k],
+                               self._rngs[k].random_sample(), side='right')
+
+        return dt, min(jump, self._model.lastStreamJumps[current_state_index, k])
+
+
+# parameters and compiled model of the cohort simulated by a worker process
+# (sent once when the worker starts instead of with every chunk of patients)
+_workerParams = None
+_workerModel = None
+
+
+def _init_worker(parameters, model):
+    """ stores the parameters and the compiled model of a cohort in a worker process
+    :param parameters: parameters
+    :param model: compiled model of the parameters
+    """
+    global _workerParams, _workerModel
+    _workerParams = parameters
+    _workerModel = model
+
+
+def _simulate_patient_range(cohort_id, pop_size, first, last, sim_length, crn_seed,
+                            record_trajectories=False, profile=False):
+    """ simulates patients first, ..., last-1 of a cohort (run by worker processes)
+    :param cohort_id: cohort ID
+    :param pop_size: population size of the cohort
+    :param first: index of the first patient to simulate
+    :param last: index after the last patient to simulate
+    :param sim_length: simulation length
+    :param crn_seed: seed of common random numbers (None to not use common random numbers)
+    :param record_trajectories: set to True to also record the state trajectories of patients
+    :param profile: set to True to profile the simulation
+    :return: (tuple) survival time (nan if alive at the end of the simulation), number of cancers,
+        discounted cost and discounted utility of each patient (numpy arrays),
+        the trajectories of patients (CohortTrajectories or None), the number of events simulated,
+        and the profiler (SimulationProfiler or None)
+    """
+
+    parameters, model = _workerParams, _workerModel
+    outcomes = CohortOutcomes(pop_size=last - first)
+    trajectories = CohortTrajectories(parameters=parameters, n_patients=pop_size) \
+        if record_trajectories else None
+    profiler = SimulationProfiler() if profile else None
+    n_events = 0
+    for i in range(first, last):
+        # patient ids are the same as when the cohort is simulated in a single process
+        patient = Patient(id=cohort_id * pop_size + i,
+                          parameters=parameters,
+                          model=model,
+                          crn_seed=get_patient_crn_seed(crn_seed=crn_seed, i=i),
+                          profiler=profiler)
+        patient.simulate(sim_length)
+        n_events += patient.nEvents
+        with time_stage(profiler, 'CohortOutcomes.extract_outcome'):
+            outcomes.extract_outcome(simulated_patient=patient)
+        if trajectories is not None:
+            trajectories.add_patient(i=i, cost_utility_monitor=patient.stateMonitor.costUtilityMonitor)
+
+    return (outcomes.patientSurvivalTimes,
+            outcomes.nTotalCancer,
+            outcomes.costs,
+            outcomes.utilities,
+            trajectories,
+            n_events,
+            profiler)
+
+
+def get_patient_crn_seed(crn_seed, i):
+    """
+    :param crn_seed: (int or list of ints) seed of common random numbers of a cohort (or None)
+    :param i: index of the patient in the cohort
+    :return: seed of the patient's random number streams (the same for the i-th patient
+        of all cohorts with this seed, regardless of their ids)
+    """
+    if crn_seed is None:
+        return None
+    return [int(v) for v in np.atleast_1d(crn_seed)] + [int(i)]
+
 
 class Cohort:
-    def __init__(self, id, pop_size, parameters):
+    def __init__(self, id, pop_size, parameters, engine=Engine.PATIENT, eliminate_screening=False,
+                 streaming=False, keep_patient_outcomes=False, crn_seed=None, cache=None,
+                 record_trajectories=False, profiler=None):
         """ create a cohort of patients
         :param id: cohort ID
         :param pop_size: population size of this cohort
         :param parameters: parameters
+        :param engine: (Engine) engine to simulate this cohort with
+        :param eliminate_screening: set to True to fold the short-lived screening states into
+            branching probabilities on the exits of WELL and PRE_CANCER and charge the cost of
+            each screening as a lump sum (one event per screening instead of two)
+        :param streaming: set to True to summarize outcomes while patients are simulated
+            with memory that does not grow with the population size
+        :param keep_patient_outcomes: set to True to also keep the outcomes of each patient
+            when streaming (always kept otherwise)
+        :param crn_seed: (int or list of ints) seed of common random numbers; the i-th patient of
+            cohorts with the same seed gets the same background mortality, disease progression and
+            screening random number streams under any strategy (only for Engine.PATIENT)
+        :param cache: (OutcomeCache) cache to load the outcomes from if this cohort was simulated
+            before and to store them in otherwise (not used when streaming)
+        :param record_trajectories: set to True to record the state trajectories of patients
+            in trajectories (CohortTrajectories) to re-evaluate costs and utilities without re-simulating
+        :param profiler: (SimulationProfiler) profiler to count events and time the stages of the simulation
+            (None to not profile)
         """
         self.id = id
         self.popSize = pop_size
         self.params = parameters
-        self.cohortOutcomes = CohortOutcomes()  # outcomes of the this simulated cohort
+        self.engine = engine
+        self.eliminateScreening = eliminate_screening
+        self.crnSeed = crn_seed
+        self.streaming = streaming
+        self.cache = cache
+        self.profiler = profiler
+        # state trajectories of patients (if requested)
+        self.trajectories = CohortTrajectories(parameters=parameters, n_patients=pop_size) \
+            if record_trajectories else None
+        # transition tables shared by all patients of this cohort
+        self.model = CompiledModel(parameters=parameters, eliminate_screening=eliminate_screening)
+        # number of events (jumps) simulated (0 if the outcomes are loaded from the cache)
+        self.nEvents = 0
+        # outcomes of the this simulated cohort
+        if streaming:
+            self.cohortOutcomes = StreamingCohortOutcomes(keep_patient_outcomes=keep_patient_outcomes)
+        else:
+            self.cohortOutcomes = CohortOutcomes(pop_size=pop_size)
 
-    def simulate(self, sim_length):
+    def simulate(self, sim_length, workers=1):
         """ simulate the cohort of patients over the specified number of time-steps
         :param sim_length: simulation length
+        :param workers: number of processes to simulate patients in parallel
+            (only for Engine.PATIENT; results do not depend on the number of workers)
+        """
+        with time_stage(self.profiler, 'Cohort.simulate'):
+            self._simulate(sim_length=sim_length, workers=workers)
+
+    def _simulate(self, sim_length, workers):
+
+        cache_key = None
+        # (trajectories are not cached)
+        if self.cache is not None and not self.streaming and self.trajectories is None:
+            cache_key = self._get_cache_key(sim_length=sim_length)
+            with time_stage(self.profiler, 'OutcomeCache.load'):
+                cached_outcomes = self.cache.load(key=cache_key)
+            if cached_outcomes is not None:
+                self.cohortOutcomes.extract_outcomes(**cached_outcomes)
+                self.cohortOutcomes.calculate_cohort_outcomes(initial_pop_size=self.popSize, profiler=self.profiler)
+                return
+
+        if self.engine == Engine.VECTORIZED:
+            if workers > 1:
+                raise ValueError('The vectorized engine simulates a cohort in a single process.')
+            if self.crnSeed is not None:
+                raise ValueError('Common random numbers are only supported by the patient engine.')
+            self._simulate_vectorized(sim_length=sim_length)
+        elif workers > 1:
+            self._simulate_patients_in_parallel(sim_length=sim_length, workers=workers)
+        else:
+            self._simulate_patients(sim_length=sim_length)
+        if self.profiler is not None:
+            self.profiler.nPatients += self.popSize
+
+        # calculate cohort outcomes
+        self.cohortOutcomes.calculate_cohort_outcomes(initial_pop_size=self.popSize, profiler=self.profiler)
+
+        if cache_key is not None:
+            # the survival curve is rebuilt exactly from the survival times of patients
+            with time_stage(self.profiler, 'OutcomeCache.save'):
+                self.cache.save(key=cache_key,
+                                survival_times=self.cohortOutcomes.patientSurvivalTimes,
+                                n_cancer=self.cohortOutcomes.nTotalCancer,
+                                costs=self.cohortOutcomes.costs,
+                                utilities=self.cohortOutcomes.utilities)
+
+    def _get_cache_key(self, sim_length):
+        """
+        :param sim_length: simulation length
+        :return: key of the outcomes of this cohort in the cache
+        """
+        return self.cache.get_key(ENGINE_VERSION, self.engine.name, VECTORIZED_BLOCK_SIZE,
+                                  self.id, self.popSize, float(sim_length),
+                                  self.eliminateScreening, self.crnSeed,
+                                  self.params.treatment.name, self.params.initialHealthState.name,
+                                  self.params.discountRate, self.params.cancerTreatmentCost,
+                                  self.params.precancerTreatmentCost,
+                                  self.params.annualStateCosts, self.params.annualStateUtilities,
+                                  self.params.transRateMatrix)
+
+    def _simulate_patients(self, sim_length):
+        """ simulates patients one at a time, each with its own Gillespie process
+        :param sim_length: simulation length
         """
 
         # populate and simulate the cohort
         for i in range(self.popSize):
             # create a new patient (use id * pop_size + n as patient id)
             patient = Patient(id=self.id * self.popSize + i,
-                              parameters=self.params)
+                              parameters=self.params,
+                              model=self.model,
+                              crn_seed=get_patient_crn_seed(crn_seed=self.crnSeed, i=i),
+                              profiler=self.profiler)
             # simulate
             patient.simulate(sim_length)
+            self.nEvents += patient.nEvents
 
             # store outputs of this simulation
-            self.cohortOutcomes.extract_outcome(simulated_patient=patient)
+            with time_stage(self.profiler, 'CohortOutcomes.extract_outcome'):
+                self.cohortOutcomes.extract_outcome(simulated_patient=patient)
+            if self.trajectories is not None:
+                self.trajectories.add_patient(i=i, cost_utility_monitor=patient.stateMonitor.costUtilityMonitor)
 
-        # calculate cohort outcomes
-        self.cohortOutcomes.calculate_cohort_outcomes(initial_pop_size=self.popSize)
+    def _simulate_patients_in_parallel(self, sim_length, workers):
+        """ splits patients into chunks that are simulated over a pool of processes
+        :param sim_length: simulation length
+        :param workers: number of processes
+        """
+
+        # a few chunks per worker to balance the load
+        bounds = np.linspace(0, self.popSize, min(self.popSize, 4 * workers) + 1).astype(int)
+        n_chunks = len(bounds) - 1
+
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.params, self.model)) as executor:
+            # results are returned in the order of chunks
+            all_outcomes = executor.map(_simulate_patient_range,
+                                        [self.id] * n_chunks,
+                                        [self.popSize] * n_chunks,
+                                        bounds[:-1],
+                                        bounds[1:],
+                                        [sim_length] * n_chunks,
+                                        [self.crnSeed] * n_chunks,
+                                        [self.trajectories is not None] * n_chunks,
+                                        [self.profiler is not None] * n_chunks)
+
+            for survival_times, n_cancer, costs, utilities, trajectories, n_events, profiler in all_outcomes:
+                self.nEvents += n_events
+                if profiler is not None:
+                    self.profiler.merge(profiler)
+                # merge outputs of this chunk
+                self.cohortOutcomes.extract_outcomes(survival_times=survival_times,
+                                                     n_cancer=n_cancer,
+                                                     costs=costs,
+                                                     utilities=utilities)
+                if trajectories is not None:
+                    self.trajectories.extend(trajectories)
+
+    def _simulate_vectorized(self, sim_length):
+        """ simulates patients together in blocks of VECTORIZED_BLOCK_SIZE patients
+        :param sim_length: simulation length
+        """
+
+        # random number generator for this cohort
+        rng = np.random.RandomState(seed=self.id)
+
+        for first in range(0, self.popSize, VECTORIZED_BLOCK_SIZE):
+            with time_stage(self.profiler, 'Vectorized simulation'):
+                survival_times, n_cancer, costs, utilities = self._simulate_vectorized_block(
+                    n_patients=min(VECTORIZED_BLOCK_SIZE, self.popSize - first),
+                    sim_length=sim_length,
+                    rng=rng,
+                    first=first)
+
+            # store outputs of this block
+            with time_stage(self.profiler, 'CohortOutcomes.extract_outcomes'):
+                self.cohortOutcomes.extract_outcomes(survival_times=survival_times,
+                                                     n_cancer=n_cancer,
+                                                     costs=costs,
+                                                     utilities=utilities)
+
+    def _simulate_vectorized_block(self, n_patients, sim_length, rng, first=0):
+        """ simulates a block of patients together; the state, time, and discounted cost and utility
+        of patients are kept in arrays and every patient who is still alive and within
+        the simulation length is advanced by one jump per step
+        :param n_patients: number of patients to simulate
+        :param sim_length: simulation length
+        :param rng: random number generator
+        :param first: index of the first patient of this block in the cohort
+        :return: (tuple of numpy arrays) survival time (nan if alive at the end of the simulation),
+            number of cancers, discounted cost and discounted utility of each patient
+        """
+
+        model = self.model
+        n_states = model.nStates
+        death_states = [HealthStates.CANCER_DEATH.value, HealthStates.OTHER_DEATH.value]
+
+        # current state and time, and outcomes of each patient
+        states = np.full(n_patients, self.params.initialHealthState.value)
+        times = np.zeros(n_patients)
+        discounts = np.ones(n_patients)     # discount factor at the current time
+        survival_times = np.full(n_patients, np.nan)
+        n_cancer = np.zeros(n_patients, dtype=int)
+        costs = np.zeros(n_patients)
+        utilities = np.zeros(n_patients)
+
+        # patients who are not in an absorbing state
+        active = np.flatnonzero(~model.ifAbsorbing[states])
+
+        while active.size > 0:
+
+            current_states = states[active]
+            t0 = times[active]
+            discounts0 = discounts[active]
+
+            # time and state of the next event
+            t1 = t0 + rng.exponential(scale=model.meanSojournTimes[current_states])
+            # (row-wise searchsorted of the uniform random numbers in the cdfs of the current states)
+            jumps = (rng.random_sample(active.size)[:, np.newaxis]
+                     >= model.jumpCDFs[current_states]).sum(axis=1)
+            jumps = np.minimum(jumps, model.lastJumps[current_states])
+            new_states = jumps % n_states
+
+            # patients whose next event occurs beyond simulation length stay in
+            # their current state until the end of the simulation
+            if_ended = t1 > sim_length
+            if_moved = ~if_ended
+            self.nEvents += int(np.count_nonzero(if_moved))
+            if self.profiler is not None:
+                self.profiler.count_transitions(current_states[if_moved], new_states[if_moved])
+            t1[if_ended] = sim_length
+            new_states[if_ended] = current_states[if_ended]
+
+            # discounted cost and utility of the time spent in the current state
+            # (one exponential per patient and step, shared by cost, utility and screenings)
+            with time_stage(self.profiler, 'Discounting'):
+                discounts1 = np.exp(-self.params.discountRate * t1)
+                pv_factors = get_pv_factors(discount_rate=self.params.discountRate, t0=t0, t1=t1,
+                                            discounts0=discounts0, discounts1=discounts1)
+                costs[active] += model.costRates[current_states] * pv_factors
+                utilities[active] += model.utilityRates[current_states] * pv_factors
+            if self.trajectories is not None:
+                self.trajectories.add_periods(patients=first + active, t0=t0, t1=t1, states=current_states)
+
+            # cost and utility of screenings that took place at the time of the jump
+            if model.eliminateScreening:
+                lump_discounts = np.where(if_moved & (jumps >= n_states), discounts1, 0)
+                costs[active] += model.lumpCosts[current_states] * lump_discounts
+                utilities[active] += model.lumpUtilities[current_states] * lump_discounts
+                if self.trajectories is not None:
+                    if_screened = if_moved & (jumps >= n_states)
+                    self.trajectories.add_lumps(patients=first + active[if_screened], times=t1[if_screened],
+                                                source_states=current_states[if_screened])
+
+            # record deaths and new cancers
+            if_died = if_moved & np.isin(new_states, death_states)
+            survival_times[active[if_died]] = t1[if_died]
+            n_cancer[active] += if_moved & (new_states == HealthStates.CANCER.value)
+
+            # update state and time
+            states[active] = new_states
+            times[active] = t1
+            discounts[active] = discounts1
+
+            # keep patients who moved to a non-absorbing state
+            active = active[if_moved & ~model.ifAbsorbing[new_states]]
+
+        return survival_times, n_cancer, costs, utilities
+
+
+class CohortTrajectories:
+    """ periods that the patients of a cohort spent in each state and the screenings charged to them
+    as lump sums; state trajectories do not depend on costs, utilities or the discount rate,
+    so these can be re-evaluated against the recorded trajectories without re-simulating """
+
+    def __init__(self, parameters, n_patients):
+        """
+        :param parameters: parameters the trajectories were simulated with
+        :param n_patients: number of patients
+        """
+
+        self.nStates = len(HealthStates)
+        self.nPatients = n_patients
+        self.transRateMatrix = np.array(parameters.transRateMatrix, dtype=float)
+
+        # periods (patient, start time, end time, state) recorded in chunks
+        self._periods = []
+        # screenings charged as lump sums (patient, time, state the screening started from)
+        self._lumps = []
+
+        # time spent in a screening state for a screening started from each state
+        # (the stay that a lump sum stands for when screening states are eliminated)
+        rate_matrix = self.transRateMatrix.copy()
+        np.fill_diagonal(rate_matrix, 0)
+        exit_rates = rate_matrix.sum(axis=1)
+        self.lumpOccupancy = np.zeros((self.nStates, self.nStates))
+        for state in SCREENING_STATES:
+            s = state.value
+            self.lumpOccupancy[rate_matrix[:, s] > 0, s] = 1 / exit_rates[s]
+
+    def add_periods(self, patients, t0, t1, states):
+        """ records periods spent in states
+        :param patients: (array) index of the patient of each period
+        :param t0: (array) start time of each period
+        :param t1: (array) end time of each period
+        :param states: (array) state during each period
+        """
+        self._periods.append((np.asarray(patients), np.asarray(t0, dtype=float),
+                              np.asarray(t1, dtype=float), np.asarray(states)))
+
+    def add_lumps(self, patients, times, source_states):
+        """ records screenings charged as lump sums
+        :param patients: (array) index of the patient of each screening
+        :param times: (array) time of each screening
+        :param source_states: (array) state each screening started from
+        """
+        self._lumps.append((np.asarray(patients), np.asarray(times, dtype=float), np.asarray(source_states)))
+
+    def add_patient(self, i, cost_utility_monitor):
+        """ records the periods and screenings of a patient simulated by Engine.PATIENT
+        :param i: index of the patient
+        :param cost_utility_monitor: (PatientCostUtilityMonitor) monitor of the simulated patient
+        """
+        times, states, boundaries = cost_utility_monitor.get_trajectory()
+        self.add_periods(patients=np.full(len(states), i), t0=times[:-1], t1=times[1:], states=states)
+
+        if len(boundaries) > 0:
+            # the state during the period that ended with the screening
+            self.add_lumps(patients=np.full(len(boundaries), i), times=times[boundaries],
+                           source_states=states[boundaries - 1])
+
+    def extend(self, other):
+        """ adds the periods and screenings recorded by another trajectories of the same cohort
+        :param other: (CohortTrajectories) trajectories of other patients of this cohort
+        """
+        self._periods.extend(other._periods)
+        self._lumps.extend(other._lumps)
+
+    def get_discounted_occupancy(self, discount_rate):
+        """
+        :param discount_rate: discount rate
+        :return: (n_patients x n_states array) discounted time each patient spent in each state
+            (the discounted cost of a patient is this row times the annual state costs)
+        """
+
+        patients, t0, t1, states = [np.concatenate(column) for column in zip(*self._periods)]
+        pv_factors = get_pv_factors(discount_rate=discount_rate, t0=t0, t1=t1,
+                                    discounts0=np.exp(-discount_rate * t0), discounts1=np.exp(-discount_rate * t1))
+        occupancy = np.bincount(patients * self.nStates + states, weights=pv_factors,
+                                minlength=self.nPatients * self.nStates).reshape(self.nPatients, self.nStates)
+
+        if len(self._lumps) > 0:
+            patients, times, source_states = [np.concatenate(column) for column in zip(*self._lumps)]
+            lump_discounts = np.bincount(patients * self.nStates + source_states,
+                                         weights=np.exp(-discount_rate * times),
+                                         minlength=self.nPatients * self.nStates)
+            occupancy += lump_discounts.reshape(self.nPatients, self.nStates) @ self.lumpOccupancy
+
+        return occupancy
+
+    def evaluate(self, cost_rates, utility_rates, discount_rate):
+        """
+        :param cost_rates: (n_states array or n_states x k matrix) annual cost of each state
+            (including the cost of treatments)
+        :param utility_rates: (n_states array or n_states x k matrix) annual utility of each state
+        :param discount_rate: discount rate
+        :return: (tuple of arrays) discounted cost and discounted utility of each patient
+            (n_patients arrays or n_patients x k matrices)
+        """
+        occupancy = self.get_discounted_occupancy(discount_rate=discount_rate)
+        return occupancy @ np.asarray(cost_rates, dtype=float), occupancy @ np.asarray(utility_rates, dtype=float)
+
+    def evaluate_parameters(self, parameters):
+        """
+        :param parameters: parameters with the transition rates the trajectories were simulated with
+        :return: (tuple of arrays) discounted cost and discounted utility of each patient
+        """
+        self._check_rate_matrices(np.asarray(parameters.transRateMatrix)[np.newaxis])
+        cost_rates, utility_rates = get_state_cost_utility_rates(parameters=parameters)
+
+        return self.evaluate(cost_rates=cost_rates, utility_rates=utility_rates,
+                             discount_rate=parameters.discountRate)
+
+    def evaluate_parameter_batch(self, parameter_batch, discount_rate):
+        """ re-evaluates the mean cost and utility of the cohort under many sets of costs and utilities
+        (e.g. a cost-only probabilistic sensitivity analysis) in one matrix product
+        :param parameter_batch: (ParameterBatch) parameter sets with the transition rates the trajectories
+            were simulated with
+        :param discount_rate: discount rate
+        :return: (tuple of arrays) mean discounted cost and mean discounted utility under each parameter set
+        """
+        self._check_rate_matrices(parameter_batch.transRateMatrices)
+
+        cost_rates = np.array(parameter_batch.annualStateCosts, dtype=float)
+        params = parameter_batch.get_parameters(0)
+        cost_rates[:, HealthStates.CANCER_TREATMENT.value] += params.cancerTreatmentCost
+        cost_rates[:, HealthStates.PRE_CANCER_TREATMENT.value] += params.precancerTreatmentCost
+
+        mean_occupancy = self.get_discounted_occupancy(discount_rate=discount_rate).mean(axis=0)
+
+        return cost_rates @ mean_occupancy, parameter_batch.annualStateUtilities @ mean_occupancy
+
+    def _check_rate_matrices(self, rate_matrices):
+        if not np.all(rate_matrices == self.transRateMatrix):
+            raise ValueError('Trajectories can only be re-evaluated with the transition rates '
+                             'they were simulated with.')
+
+
+class SurvivalCurve:
+    """ number of living patients over time, stored as the sorted times of deaths """
+
+    def __init__(self, initial_size, death_times, death_counts=None):
+        """
+        :param initial_size: initial number of patients
+        :param death_times: times of deaths
+        :param death_counts: number of deaths at each time (1 if not provided)
+        """
+        death_times = np.asarray(death_times, dtype=float)
+        if death_counts is None:
+            death_counts = np.ones(len(death_times), dtype=int)
+
+        order = np.argsort(death_times, kind='stable')
+        self.initialSize = initial_size
+        self.deathTimes = death_times[order]
+        # cumulative number of deaths up to and including each death time (0 before the first death)
+        self.cumDeaths = np.concatenate(([0], np.cumsum(np.asarray(death_counts)[order])))
+
+    def get_n_living(self, times):
+        """
+        :param times: (numpy array) time points
+        :return: (numpy array) number of living patients at each time point
+        """
+        return self.initialSize - self.cumDeaths[np.searchsorted(self.deathTimes, times, side='right')]
+
+    def get_sample_path(self, name='# of living patients'):
+        """
+        :param name: name of the sample path
+        :return: the survival curve as a sample path (to plot with SimPy.Plots.SamplePaths)
+        """
+        return Path.PrevalencePathBatchUpdate(
+            name=name,
+            initial_size=self.initialSize,
+            times_of_changes=self.deathTimes,
+            increments=-np.diff(self.cumDeaths)
+        )
 
 
 class CohortOutcomes:
-    def __init__(self):
+    def __init__(self, pop_size=0):
+        """
+        :param pop_size: number of patients to preallocate the outcome buffers for
+            (buffers grow if more patients are extracted)
+        """
         self.statNumCancer = None
-        self.survivalTimes = []
-        self.nTotalCancer = []
-        self.nLivingPatients = None
-        self.costs = []
-        self.utilities = []
+        self.survivalCurve = None
+        self._nLivingPatients = None
         self.statSurvivalTime = None
         self.statCost = None
         self.statUtility = None
 
+        # outcomes of each patient (survival time is nan for patients alive at the end of the simulation)
+        self.nPatients = 0
+        self._survivalTimes = np.full(pop_size, np.nan)
+        # survival times of patients who died (in the order they were extracted)
+        self.nDeaths = 0
+        self._deathTimes = np.zeros(pop_size)
+        self._nCancer = np.zeros(pop_size, dtype=np.int16)
+        self._costs = np.zeros(pop_size)
+        self._utilities = np.zeros(pop_size)
+
+    @property
+    def patientSurvivalTimes(self):
+        """ survival time of each patient (nan if alive at the end of the simulation) """
+        return self._survivalTimes[:self.nPatients]
+
+    @property
+    def ifAlive(self):
+        """ if each patient is alive at the end of the simulation """
+        return np.isnan(self.patientSurvivalTimes)
+
+    @property
+    def survivalTimes(self):
+        """ survival times of patients who died """
+        return self._deathTimes[:self.nDeaths]
+
+    @property
+    def nTotalCancer(self):
+        return self._nCancer[:self.nPatients]
+
+    @property
+    def nLivingPatients(self):
+        """ survival curve as a sample path (built when first needed) """
+        if self._nLivingPatients is None and self.survivalCurve is not None:
+            self._nLivingPatients = self.survivalCurve.get_sample_path()
+        return self._nLivingPatients
+
+    @property
+    def costs(self):
+        return self._costs[:self.nPatients]
+
+    @property
+    def utilities(self):
+        return self._utilities[:self.nPatients]
+
     def extract_outcome(self, simulated_patient):
         """ extracts outcomes of a simulated patient
         :param simulated_patient: a simulated patient"""
 
+        i = self.nPatients
+        self._reserve(n=1)
+
         # record survival time
         if not (simulated_patient.stateMonitor.survivalTime is None):
-            self.survivalTimes.append(simulated_patient.stateMonitor.survivalTime)
-        self.nTotalCancer.append(simulated_patient.stateMonitor.nCancer)
-        self.costs.append(simulated_patient.stateMonitor.costUtilityMonitor.totalDiscountedCost)
-        self.utilities.append(simulated_patient.stateMonitor.costUtilityMonitor.totalDiscountedUtility)
+            self._survivalTimes[i] = simulated_patient.stateMonitor.survivalTime
+            self._deathTimes[self.nDeaths] = simulated_patient.stateMonitor.survivalTime
+            self.nDeaths += 1
+        self._nCancer[i] = simulated_patient.stateMonitor.nCancer
+        self._costs[i] = simulated_patient.stateMonitor.costUtilityMonitor.totalDiscountedCost
+        self._utilities[i] = simulated_patient.stateMonitor.costUtilityMonitor.totalDiscountedUtility
+        self.nPatients += 1
+
+    def extract_outcomes(self, survival_times, n_cancer, costs, utilities):
+        """ extracts outcomes of a group of simulated patients
+        :param survival_times: survival time of each patient (nan if alive at the end of the simulation)
+        :param n_cancer: number of cancers of each patient
+        :param costs: total discounted cost of each patient
+        :param utilities: total discounted utility of each patient
+        """
 
-    def calculate_cohort_outcomes(self, initial_pop_size):
+        i = self.nPatients
+        n = len(costs)
+        self._reserve(n=n)
+
+        self._survivalTimes[i:i + n] = survival_times
+        death_times = self._survivalTimes[i:i + n]
+        death_times = death_times[~np.isnan(death_times)]
+        self._deathTimes[self.nDeaths:self.nDeaths + len(death_times)] = death_times
+        self.nDeaths += len(death_times)
+        self._nCancer[i:i + n] = n_cancer
+        self._costs[i:i + n] = costs
+        self._utilities[i:i + n] = utilities
+        self.nPatients += n
+
+    def calculate_cohort_outcomes(self, initial_pop_size, profiler=None):
         """ calculates the cohort outcomes
         :param initial_pop_size: initial population size
+        :param profiler: (SimulationProfiler) profiler to time the calculation (None to not profile)
         """
 
+        survival_times = self.survivalTimes
+
         # summary statistics
-        self.statNumCancer = Stat.SummaryStat(name='Number of strokes', data=self.nTotalCancer)
-        self.statSurvivalTime = Stat.SummaryStat(name='Survival Time', data=self.survivalTimes)
-        self.statCost = Stat.SummaryStat(name='Discounted Cost', data=self.costs)
-        self.statUtility = Stat.SummaryStat(name='Discounted Utility', data=self.utilities)
+        with time_stage(profiler, 'SummaryStat construction'):
+            self.statNumCancer = Stat.SummaryStat(name='Number of strokes', data=self.nTotalCancer)
+            self.statSurvivalTime = Stat.SummaryStat(name='Survival Time', data=survival_times)
+            self.statCost = Stat.SummaryStat(name='Discounted Cost', data=self.costs)
+            self.statUtility = Stat.SummaryStat(name='Discounted Utility', data=self.utilities)
 
         # survival curve
-        self.nLivingPatients = Path.PrevalencePathBatchUpdate(
-            name='# of living patients',
-            initial_size=initial_pop_size,
-            times_of_changes=self.survivalTimes,
-            increments=[-1] * len(self.survivalTimes)
-        )
+        with time_stage(profiler, 'Survival curve'):
+            self.survivalCurve = SurvivalCurve(initial_size=initial_pop_size, death_times=survival_times)
+        self._nLivingPatients = None
+
+    def _reserve(self, n):
+        # grows the buffers (by at least doubling them) if n more patients do not fit
+        size = len(self._costs)
+        if self.nPatients + n <= size:
+            return
+
+        new_size = max(self.nPatients + n, 2 * size)
+        self._survivalTimes = np.concatenate((self._survivalTimes, np.full(new_size - size, np.nan)))
+        self._deathTimes = np.concatenate((self._deathTimes, np.zeros(new_size - size)))
+        self._nCancer = np.concatenate((self._nCancer, np.zeros(new_size - size, dtype=np.int16)))
+        self._costs = np.concatenate((self._costs, np.zeros(new_size - size)))
+        self._utilities = np.concatenate((self._utilities, np.zeros(new_size - size)))
+
+
+class StreamingCohortOutcomes:
+    """ outcomes of a cohort summarized while patients are simulated; memory does not grow
+    with the population size unless the outcomes of each patient are requested """
+
+    # number of patients whose outcomes are buffered before being added to the statistics
+    BUFFER_SIZE = 4096
+
+    def __init__(self, keep_patient_outcomes=False, survival_bin_width=1/52):
+        """
+        :param keep_patient_outcomes: set to True to also keep the outcomes of each patient
+        :param survival_bin_width: width of the bins of survival times for the survival curve
+        """
+        self.keepPatientOutcomes = keep_patient_outcomes
+        self.survivalBinWidth = survival_bin_width
+
+        self.statNumCancer = StreamingStat(name='Number of cancers')
+        self.statSurvivalTime = StreamingStat(name='Survival Time')
+        self.statCost = StreamingStat(name='Discounted Cost')
+        self.statUtility = StreamingStat(name='Discounted Utility')
+        self.survivalCurve = None
+        self._nLivingPatients = None
+
+        # number of deaths in each bin of survival times
+        self.nDeathsPerBin = {}
+
+        # outcomes of each patient (only if requested)
+        if keep_patient_outcomes:
+            self.survivalTimes = []
+            self.nTotalCancer = []
+            self.costs = []
+            self.utilities = []
+        else:
+            self.survivalTimes = None
+            self.nTotalCancer = None
+            self.costs = None
+            self.utilities = None
+
+        # outcomes of patients not yet added to the statistics
+        self._buffer = ([], [], [], [])
+
+    @property
+    def nLivingPatients(self):
+        """ survival curve as a sample path (built when first needed) """
+        if self._nLivingPatients is None and self.survivalCurve is not None:
+            self._nLivingPatients = self.survivalCurve.get_sample_path()
+        return self._nLivingPatients
+
+    def extract_outcome(self, simulated_patient):
+        """ extracts outcomes of a simulated patient
+        :param simulated_patient: a simulated patient"""
+
+        survival_times, n_cancer, costs, utilities = self._buffer
+        if not (simulated_patient.stateMonitor.survivalTime is None):
+            survival_times.append(simulated_patient.stateMonitor.survivalTime)
+        n_cancer.append(simulated_patient.stateMonitor.nCancer)
+        costs.append(simulated_patient.stateMonitor.costUtilityMonitor.totalDiscountedCost)
+        utilities.append(simulated_patient.stateMonitor.costUtilityMonitor.totalDiscountedUtility)
+
+        if len(n_cancer) >= self.BUFFER_SIZE:
+            self._flush()
+
+    def extract_outcomes(self, survival_times, n_cancer, costs, utilities):
+        """ extracts outcomes of a group of simulated patients
+        :param survival_times: survival time of each patient (nan if alive at the end of the simulation)
+        :param n_cancer: number of cancers of each patient
+        :param costs: total discounted cost of each patient
+        :param utilities: total discounted utility of each patient
+        """
+
+        survival_times = np.asarray(survival_times, dtype=float)
+
+        self._flush()
+        self._add(survival_times=survival_times[~np.isnan(survival_times)],
+                  n_cancer=np.asarray(n_cancer),
+                  costs=np.asarray(costs, dtype=float),
+                  utilities=np.asarray(utilities, dtype=float))
+
+    def merge(self, other):
+        """ adds the outcomes summarized by another streaming cohort outcomes
+        :param other: (StreamingCohortOutcomes) outcomes of another group of patients
+        """
+
+        self._flush()
+        other._flush()
+
+        self.statNumCancer.merge(other.statNumCancer)
+        self.statSurvivalTime.merge(other.statSurvivalTime)
+        self.statCost.merge(other.statCost)
+        self.statUtility.merge(other.statUtility)
+
+        if self.survivalBinWidth != other.survivalBinWidth:
+            raise ValueError('Only outcomes with the same survival bin width can be merged.')
+        for key, count in other.nDeathsPerBin.items():
+            self.nDeathsPerBin[key] = self.nDeathsPerBin.get(key, 0) + count
+
+        if self.keepPatientOutcomes:
+            if not other.keepPatientOutcomes:
+                raise ValueError('The outcomes to merge do not include the outcomes of each patient.')
+            self.survivalTimes.extend(other.survivalTimes)
+            self.nTotalCancer.extend(other.nTotalCancer)
+            self.costs.extend(other.costs)
+            self.utilities.extend(other.utilities)
+
+    def calculate_cohort_outcomes(self, initial_pop_size, profiler=None):
+        """ calculates the cohort outcomes
+        :param initial_pop_size: initial population size
+        :param profiler: (SimulationProfiler) profiler to time the calculation (None to not profile)
+        """
+
+        with time_stage(profiler, 'SummaryStat construction'):
+            self._flush()
+
+        # survival curve (deaths in each bin are placed at the middle of the bin)
+        with time_stage(profiler, 'Survival curve'):
+            bins = np.array(sorted(self.nDeathsPerBin), dtype=int)
+            self.survivalCurve = SurvivalCurve(initial_size=initial_pop_size,
+                                               death_times=(bins + 0.5) * self.survivalBinWidth,
+                                               death_counts=[self.nDeathsPerBin[b] for b in bins.tolist()])
+        self._nLivingPatients = None
+
+    def _flush(self):
+        # adds the buffered outcomes to the statistics
+        survival_times, n_cancer, costs, utilities = self._buffer
+        if len(n_cancer) > 0 or len(survival_times) > 0:
+            self._add(survival_times=np.array(survival_times, dtype=float),
+                      n_cancer=np.array(n_cancer),
+                      costs=np.array(costs, dtype=float),
+                      utilities=np.array(utilities, dtype=float))
+            self._buffer = ([], [], [], [])
+
+    def _add(self, survival_times, n_cancer, costs, utilities):
+        # adds outcomes of a group of patients to the statistics
+        self.statSurvivalTime.add(survival_times)
+        self.statNumCancer.add(n_cancer)
+        self.statCost.add(costs)
+        self.statUtility.add(utilities)
+
+        if survival_times.size > 0:
+            bins, counts = np.unique(np.floor(survival_times / self.survivalBinWidth).astype(int),
+                                     return_counts=True)
+            for b, count in zip(bins.tolist(), counts.tolist()):
+                self.nDeathsPerBin[b] = self.nDeathsPerBin.get(b, 0) + count
+
+        if self.keepPatientOutcomes:
+            self.survivalTimes.extend(survival_times.tolist())
+            self.nTotalCancer.extend(n_cancer.tolist())
+            self.costs.extend(costs.tolist())
+            self.utilities.extend(utilities.tolist())
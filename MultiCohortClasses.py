@@ -1,63 +1,381 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import SimPy.Statistics as Stat
-from MarkovModelClasses import Cohort
-from ProbParameterClasses import ParameterGenerator
+from MarkovModelClasses import Cohort, Engine
+from ProbParameterClasses import ParameterGenerator, Sampling
+from ProfilerClasses import SimulationProfiler, time_stage
+
+# parameter sets and time grid of survival curves of the multi-cohort simulated by a worker process
+# (sent once when the worker starts instead of with every cohort)
+_workerParamSets = None
+_workerTimeGrid = None
+
+
+def _init_worker(param_sets, time_grid):
+    """ stores the parameter sets and the time grid of survival curves in a worker process
+    :param param_sets: (list) of parameter sets
+    :param time_grid: time points to evaluate the survival curves of cohorts at
+    """
+    global _workerParamSets, _workerTimeGrid
+    _workerParamSets = param_sets
+    _workerTimeGrid = time_grid
+
+
+def _simulate_cohort(i, cohort_id, pop_size, sim_length, engine, eliminate_screening, streaming, crn_seed,
+                     cache, profile=False):
+    """ simulates a cohort in a worker process
+    :param i: index of the parameter set of this cohort
+    :param cohort_id: cohort ID
+    :param pop_size: population size of the cohort
+    :param sim_length: simulation length
+    :param engine: (Engine) engine to simulate the cohort with
+    :param eliminate_screening: set to True to fold the screening states into branching probabilities
+    :param streaming: set to True to summarize outcomes without keeping the outcomes of each patient
+    :param crn_seed: seed of common random numbers of the cohort (None to not use common random numbers)
+    :param cache: (OutcomeCache) cache of cohort outcomes (None to not use a cache)
+    :param profile: set to True to profile the simulation
+    :return: summary of the outcomes of the simulated cohort (only the summary is sent back
+        to the parent process), the number of events simulated and the profiler (SimulationProfiler or None)
+    """
+    cohort = Cohort(id=cohort_id,
+                    pop_size=pop_size,
+                    parameters=_workerParamSets[i],
+                    engine=engine,
+                    eliminate_screening=eliminate_screening,
+                    streaming=streaming,
+                    crn_seed=crn_seed,
+                    cache=cache,
+                    profiler=SimulationProfiler() if profile else None)
+    cohort.simulate(sim_length=sim_length)
+
+    with time_stage(cohort.profiler, 'MultiCohortOutcomes.get_cohort_summary'):
+        summary = MultiCohortOutcomes.get_cohort_summary(cohort_outcomes=cohort.cohortOutcomes,
+                                                         time_grid=_workerTimeGrid)
+
+    return summary, cohort.nEvents, cohort.profiler
+
 
 class MultiCohort:
     """ simulates multiple cohorts with different parameters """
 
-    def __init__(self, ids, pop_size, treatment):
+    def __init__(self, ids, pop_size, treatment, engine=Engine.PATIENT, eliminate_screening=False,
+                 streaming=False, survival_time_step=1/12, crn_seed=None, first_cohort_index=0,
+                 sampling=Sampling.RANDOM, sampling_seed=0, sample_rates=False, cache=None,
+                 checkpoint_path=None, profiler=None, progress_callback=None):
         """
         :param ids: (list) of ids for cohorts to simulate
         :param pop_size: (int) population size of cohorts to simulate
         :param therapy: selected therapy
+        :param engine: (Engine) engine to simulate each cohort with
+        :param eliminate_screening: set to True to fold the screening states into branching probabilities
+        :param streaming: set to True to summarize the outcomes of each cohort without keeping
+            the outcomes of each patient
+        :param survival_time_step: distance between the time points survival curves are evaluated at
+        :param crn_seed: seed of common random numbers; the k-th cohort of multi-cohorts with the same
+            seed uses common random numbers with seed [crn_seed, k] (None to not use common random numbers)
+        :param first_cohort_index: index of the first cohort among all cohorts of a larger run
+            (offsets the seeds of parameter sets and common random numbers so that a run can be
+            split into several multi-cohorts)
+        :param sampling: (Sampling) method to sample the parameter sets of cohorts
+        :param sampling_seed: seed of the Latin hypercube or Sobol design of parameter sets
+        :param sample_rates: set to True to also sample the inputs of transition rates
+        :param cache: (OutcomeCache) cache to load the outcomes of cohorts simulated before from
+            and to store the outcomes of new cohorts in
+        :param checkpoint_path: path of an append-only file the outcomes of each cohort are recorded in
+            as soon as the cohort is simulated (None to not record outcomes)
+        :param profiler: (SimulationProfiler) profiler to count events and time the stages of the simulation
+            (None to not profile)
+        :param progress_callback: function called with (n_done, n_total, elapsed_time, eta) each time
+            a cohort is simulated (e.g. ProfilerClasses.print_progress; None to not report progress)
         """
         self.ids = ids
         self.popSize = pop_size
         self.treatment = treatment
+        self.engine = engine
+        self.eliminateScreening = eliminate_screening
+        self.streaming = streaming
+        self.survivalTimeStep = survival_time_step
+        self.crnSeed = crn_seed
+        self.firstCohortIndex = first_cohort_index
+        self.sampling = sampling
+        self.samplingSeed = sampling_seed
+        self.sampleRates = sample_rates
+        self.cache = cache
+        self.checkpointPath = checkpoint_path
+        self.profiler = profiler
+        self.progressCallback = progress_callback
         self.paramSets = []  # list of parameter sets each of which corresponds to a cohort
+        self.nEvents = 0     # number of events (jumps) simulated
         self.multiCohortOutcomes = MultiCohortOutcomes()
 
     def _populate_parameter_sets(self):
 
         # create a parameter set generator
-        param_generator = ParameterGenerator(treatment=self.treatment)
+        param_generator = ParameterGenerator(treatment=self.treatment, sample_rates=self.sampleRates)
 
-        # create as many sets of parameters as the number of cohorts
-        for i in range(len(self.ids)):
-            # create a new random number generator for each parameter set
-            rng = np.random.RandomState(seed=i)
-            # get and store a new set of parameter
-            self.paramSets.append(param_generator.get_new_parameters(rng=rng))
+        if self.sampling == Sampling.RANDOM:
+            # create as many sets of parameters as the number of cohorts
+            for i in range(len(self.ids)):
+                # create a new random number generator for each parameter set
+                rng = np.random.RandomState(seed=self.firstCohortIndex + i)
+                # get and store a new set of parameter
+                self.paramSets.append(param_generator.get_new_parameters(rng=rng))
+        else:
+            # map the points of a design through the inverse cumulative distribution functions
+            design = param_generator.get_design(n=len(self.ids),
+                                                sampling=self.sampling,
+                                                seed=self.samplingSeed,
+                                                first_index=self.firstCohortIndex)
+            self.paramSets = param_generator.get_batch_from_design(design=design).get_all_parameters()
 
-    def simulate(self, sim_length):
+    def simulate(self, sim_length, workers=1, resume=False):
         """ simulates all cohorts
         :param sim_length: simulation length
+        :param workers: number of processes to simulate cohorts in parallel
+            (results do not depend on the number of workers)
+        :param resume: set to True to only simulate the cohorts not recorded in the checkpoint file
+            by an interrupted run (results are identical to those of an uninterrupted run)
         """
 
         # create parameter sets
-        self._populate_parameter_sets()
+        with time_stage(self.profiler, 'Parameter sampling'):
+            self._populate_parameter_sets()
+
+        # time points shared by the survival curves of all cohorts
+        self.multiCohortOutcomes.timeGrid = np.arange(0, sim_length + self.survivalTimeStep / 2,
+                                                      self.survivalTimeStep)
+
+        # summaries of the outcomes of cohorts recorded by an interrupted run
+        checkpoint = None
+        summaries = {}
+        if self.checkpointPath is not None:
+            checkpoint = MultiCohortCheckpoint(path=self.checkpointPath,
+                                               header=self._get_checkpoint_header(sim_length=sim_length))
+            summaries = checkpoint.open(resume=resume)
+
+        indices = [i for i in range(len(self.ids)) if i not in summaries]
+        start_time = time.perf_counter()
+        if workers > 1:
+            all_summaries = self._simulate_in_parallel(sim_length=sim_length, workers=workers, indices=indices)
+        else:
+            all_summaries = self._simulate_in_series(sim_length=sim_length, indices=indices)
+
+        if checkpoint is None:
+            for n_simulated, (i, summary) in enumerate(all_summaries, start=1):
+                # extract the outcomes of this simulated cohort
+                self.multiCohortOutcomes.extract_cohort_summary(**summary)
+                self._report_progress(n_simulated=n_simulated, n_to_simulate=len(indices), start_time=start_time)
+        else:
+            try:
+                for n_simulated, (i, summary) in enumerate(all_summaries, start=1):
+                    # record the outcomes of this simulated cohort
+                    summaries[i] = summary
+                    checkpoint.write(index=i, cohort_id=self.ids[i], summary=summary)
+                    self._report_progress(n_simulated=n_simulated, n_to_simulate=len(indices),
+                                          start_time=start_time)
+            finally:
+                checkpoint.close()
+
+            # extract the outcomes of all cohorts in order
+            for i in range(len(self.ids)):
+                self.multiCohortOutcomes.extract_cohort_summary(**summaries[i])
+
+        # calculate the summary statistics of outcomes from all cohorts
+        with time_stage(self.profiler, 'MultiCohortOutcomes.calculate_summary_stats'):
+            self.multiCohortOutcomes.calculate_summary_stats()
+
+    def _report_progress(self, n_simulated, n_to_simulate, start_time):
+        """ calls the progress callback (if any)
+        :param n_simulated: number of cohorts simulated so far by this run
+        :param n_to_simulate: number of cohorts to simulate by this run
+        :param start_time: time the simulation of cohorts started (time.perf_counter)
+        """
+        if self.progressCallback is None:
+            return
+        elapsed_time = time.perf_counter() - start_time
+        self.progressCallback(n_done=len(self.ids) - n_to_simulate + n_simulated,
+                              n_total=len(self.ids),
+                              elapsed_time=elapsed_time,
+                              eta=elapsed_time / n_simulated * (n_to_simulate - n_simulated))
 
-        for i in range(len(self.ids)):
+    def _get_cohort_crn_seed(self, i):
+        """
+        :param i: index of the cohort
+        :return: seed of common random numbers of the i-th cohort (None if not used)
+        """
+        if self.crnSeed is None:
+            return None
+        return [self.crnSeed, self.firstCohortIndex + i]
+
+    def _get_checkpoint_header(self, sim_length):
+        """
+        :param sim_length: simulation length
+        :return: (dictionary) settings that the outcomes recorded in a checkpoint file depend on
+        """
+        return {'ids': [int(cohort_id) for cohort_id in self.ids],
+                'popSize': self.popSize,
+                'treatment': self.treatment.name,
+                'simLength': sim_length,
+                'engine': self.engine.name,
+                'eliminateScreening': self.eliminateScreening,
+                'streaming': self.streaming,
+                'survivalTimeStep': self.survivalTimeStep,
+                'crnSeed': self.crnSeed,
+                'firstCohortIndex': self.firstCohortIndex,
+                'sampling': self.sampling.name,
+                'samplingSeed': self.samplingSeed,
+                'sampleRates': self.sampleRates}
+
+    def _simulate_in_series(self, sim_length, indices):
+        """ simulates cohorts one after another
+        :param sim_length: simulation length
+        :param indices: indices of the cohorts to simulate
+        :return: (generator) of (index, summary of outcomes) of simulated cohorts
+        """
+
+        for i in indices:
             # create a cohort
             cohort = Cohort(id=self.ids[i],
                             pop_size=self.popSize,
-                            parameters=self.paramSets[i])
+                            parameters=self.paramSets[i],
+                            engine=self.engine,
+                            eliminate_screening=self.eliminateScreening,
+                            streaming=self.streaming,
+                            crn_seed=self._get_cohort_crn_seed(i),
+                            cache=self.cache,
+                            profiler=self.profiler)
 
             # simulate the cohort
             cohort.simulate(sim_length=sim_length)
+            self.nEvents += cohort.nEvents
 
-            # extract the outcomes of this simulated cohort
-            self.multiCohortOutcomes.extract_outcomes(simulated_cohort=cohort)
+            with time_stage(self.profiler, 'MultiCohortOutcomes.get_cohort_summary'):
+                summary = MultiCohortOutcomes.get_cohort_summary(cohort_outcomes=cohort.cohortOutcomes,
+                                                                 time_grid=self.multiCohortOutcomes.timeGrid)
 
-        # calculate the summary statistics of outcomes from all cohorts
-        self.multiCohortOutcomes.calculate_summary_stats()
+            yield i, summary
+
+    def _simulate_in_parallel(self, sim_length, workers, indices):
+        """ simulates cohorts over a pool of processes
+        :param sim_length: simulation length
+        :param workers: number of processes
+        :param indices: indices of the cohorts to simulate
+        :return: (generator) of (index, summary of outcomes) of simulated cohorts
+        """
+
+        n = len(indices)
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.paramSets, self.multiCohortOutcomes.timeGrid)) as executor:
+            # results are returned in the order of cohorts
+            all_results = executor.map(_simulate_cohort,
+                                       indices,
+                                       [self.ids[i] for i in indices],
+                                       [self.popSize] * n,
+                                       [sim_length] * n,
+                                       [self.engine] * n,
+                                       [self.eliminateScreening] * n,
+                                       [self.streaming] * n,
+                                       [self._get_cohort_crn_seed(i) for i in indices],
+                                       [self.cache] * n,
+                                       [self.profiler is not None] * n,
+                                       chunksize=max(1, n // (4 * workers)))
+
+            for i, (summary, n_events, profiler) in zip(indices, all_results):
+                self.nEvents += n_events
+                if profiler is not None:
+                    self.profiler.merge(profiler)
+                yield i, summary
+
+
+class MultiCohortCheckpoint:
+    """ append-only file of the outcomes of simulated cohorts (one JSON line per cohort after
+    a header line of the settings of the run); floats are written with repr so that the recorded
+    outcomes are read back exactly """
+
+    def __init__(self, path, header):
+        """
+        :param path: path of the file
+        :param header: (dictionary) settings of the run the recorded outcomes depend on
+        """
+        self.path = path
+        self.header = json.loads(json.dumps(header))    # as it is read back from the file
+        self._file = None
+
+    def open(self, resume):
+        """ opens the file to record the outcomes of cohorts in
+        :param resume: set to True to keep the outcomes recorded by an earlier run with the same settings
+            (otherwise the file is started over)
+        :return: (dictionary) of index of cohort: summary of outcomes of the recorded cohorts
+        """
+
+        summaries = {}
+        if resume and os.path.exists(self.path):
+            with open(self.path, 'rb') as file:
+                content = file.read()
+            # only lines completed before the interruption are kept
+            n_complete = content.rfind(b'\n') + 1
+            lines = content[:n_complete].decode().splitlines()
+
+            if len(lines) > 0:
+                if json.loads(lines[0]) != self.header:
+                    raise ValueError('The checkpoint file ' + self.path + ' was recorded with other settings.')
+                for line in lines[1:]:
+                    record = json.loads(line)
+                    summaries[record['index']] = {
+                        'survival_curve': np.array(record['survivalCurve']),
+                        'mean_survival_time': record['meanSurvivalTime'],
+                        'mean_cost': record['meanCost'],
+                        'mean_qaly': record['meanQALY']}
+
+                self._file = open(self.path, 'r+b')
+                self._file.truncate(n_complete)
+                self._file.seek(n_complete)
+
+        if self._file is None:
+            self._file = open(self.path, 'wb')
+            self._write_line(self.header)
+
+        return summaries
+
+    def write(self, index, cohort_id, summary):
+        """ records the outcomes of a simulated cohort
+        :param index: index of the cohort (and of its parameter set)
+        :param cohort_id: id of the cohort
+        :param summary: (dictionary) summary of the outcomes of the cohort
+        """
+        self._write_line({'index': index,
+                          'id': int(cohort_id),
+                          'survivalCurve': np.asarray(summary['survival_curve']).tolist(),
+                          'meanSurvivalTime': float(summary['mean_survival_time']),
+                          'meanCost': float(summary['mean_cost']),
+                          'meanQALY': float(summary['mean_qaly'])})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write_line(self, values):
+        # each line is written and flushed at once so that an interruption leaves at most one partial line
+        self._file.write((json.dumps(values) + '\n').encode())
+        self._file.flush()
 
 
 class MultiCohortOutcomes:
-    def __init__(self):
+    def __init__(self, time_grid=None):
+        """
+        :param time_grid: time points to evaluate the survival curves of cohorts at
+            (None if set later, e.g. by MultiCohort.simulate, before outcomes are extracted)
+        """
 
-        self.survivalCurves = []  # list of survival curves from all simulated cohorts
+        self.timeGrid = time_grid  # time points the survival curves are evaluated at
+        self.survivalCurves = None  # number of living patients in each cohort (row) at each time point (column)
+        self._survivalRows = []   # survival curves of cohorts extracted so far
         self.meanSurvivalTimes = []  # list of average patient survival time from each simulated cohort
         self.meanCosts = []          # list of average patient cost from each simulated cohort
         self.meanQALYs = []          # list of average patient QALY from each simulated cohort
@@ -69,15 +387,61 @@ class MultiCohortOutcomes:
         """ extracts outcomes of a simulated cohort
         :param simulated_cohort: a cohort after being simulated"""
 
-        # append the survival curve of this cohort
-        self.survivalCurves.append(simulated_cohort.cohortOutcomes.nLivingPatients)
+        self.extract_cohort_outcomes(cohort_outcomes=simulated_cohort.cohortOutcomes)
+
+    def extract_cohort_outcomes(self, cohort_outcomes):
+        """ extracts outcomes of a simulated cohort
+        :param cohort_outcomes: outcomes of a cohort after being simulated"""
+
+        if self.timeGrid is None:
+            raise ValueError('The time grid of the survival curves must be set before outcomes are extracted.')
+
+        self.extract_cohort_summary(**self.get_cohort_summary(cohort_outcomes=cohort_outcomes,
+                                                              time_grid=self.timeGrid))
+
+    @staticmethod
+    def get_cohort_summary(cohort_outcomes, time_grid):
+        """
+        :param cohort_outcomes: outcomes of a cohort after being simulated
+        :param time_grid: time points to evaluate the survival curve at
+        :return: (dictionary) the outcomes of the cohort that are kept by multi-cohort outcomes
+        """
+        return {'survival_curve': cohort_outcomes.survivalCurve.get_n_living(time_grid),
+                'mean_survival_time': cohort_outcomes.statSurvivalTime.get_mean(),
+                'mean_cost': cohort_outcomes.statCost.get_mean(),
+                'mean_qaly': cohort_outcomes.statUtility.get_mean()}
+
+    def extract_cohort_summary(self, survival_curve, mean_survival_time, mean_cost, mean_qaly):
+        """ extracts the summary of outcomes of a simulated cohort
+        :param survival_curve: number of living patients at the shared time points
+        :param mean_survival_time: mean survival time
+        :param mean_cost: mean discounted cost
+        :param mean_qaly: mean discounted QALY
+        """
+
+        # append the survival curve of this cohort evaluated at the shared time points
+        self._survivalRows.append(survival_curve)
 
         # store mean survival time from this cohort
-        self.meanSurvivalTimes.append(simulated_cohort.cohortOutcomes.statSurvivalTime.get_mean())
+        self.meanSurvivalTimes.append(mean_survival_time)
         # store mean cost from this cohort
-        self.meanCosts.append(simulated_cohort.cohortOutcomes.statCost.get_mean())
+        self.meanCosts.append(mean_cost)
         # store mean QALY from this cohort
-        self.meanQALYs.append(simulated_cohort.cohortOutcomes.statUtility.get_mean())
+        self.meanQALYs.append(mean_qaly)
+
+    def extend(self, other):
+        """ adds the outcomes of cohorts extracted by another multi-cohort outcomes
+        :param other: (MultiCohortOutcomes) outcomes of other simulated cohorts
+        """
+
+        if self.timeGrid is None:
+            self.timeGrid = other.timeGrid
+        elif other.timeGrid is not None and not np.array_equal(self.timeGrid, other.timeGrid):
+            raise ValueError('Survival curves evaluated at different time points cannot be combined.')
+        self._survivalRows.extend(other._survivalRows)
+        self.meanSurvivalTimes.extend(other.meanSurvivalTimes)
+        self.meanCosts.extend(other.meanCosts)
+        self.meanQALYs.extend(other.meanQALYs)
 
     def calculate_summary_stats(self):
         """
@@ -93,3 +457,20 @@ class MultiCohortOutcomes:
         # summary statistics of mean QALY
         self.statMeanQALY = Stat.SummaryStat(name='Average QALY',
                                              data=self.meanQALYs)
+
+        # survival curves of all cohorts as one array
+        self.survivalCurves = np.vstack(self._survivalRows)
+
+    def get_mean_survival_curve(self):
+        """
+        :return: average number of living patients over cohorts at each time point
+        """
+        return self.survivalCurves.mean(axis=0)
+
+    def get_survival_curve_interval(self, alpha):
+        """
+        :param alpha: significance level
+        :return: (2 x time points array) lower and upper percentiles of the number of living patients
+            over cohorts at each time point
+        """
+        return np.percentile(self.survivalCurves, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
@@ -1,8 +1,10 @@
+import numpy as np
+
 import InputData as D
-import SimPy.EconEval as Econ
-import SimPy.Plots.Histogram as Hist
-import SimPy.Plots.SamplePaths as Path
 import SimPy.Statistics as Stat
+from CostEffectivenessClasses import CostEffectivenessAnalysis
+from FigureRendererClasses import get_pyplot, show_figure
+from ValueOfInformationClasses import ValueOfInformation, get_parameter_samples
 
 def print_outcomes(multi_cohort_outcomes, therapy_name):
     survival_mean_PI_text = multi_cohort_outcomes.statMeanSurvivalTime \
@@ -68,37 +70,30 @@ def print_comparative_outcomes(multi_cohort_outcomes_1, multi_cohort_outcomes_2)
           .format(1 - D.ALPHA, prec=0),
           estimate_PI)
 
-def report_CEA_CBA(multi_cohort_outcomes_HPV, multi_cohort_outcomes_CRYT):
+def report_CEA_CBA(multi_cohort_outcomes_list, strategy_names, colors, wtp_range=(0, 50000), n_wtps=1001):
     """ performs cost-effectiveness and cost-benefit analyses
-    :param multi_cohort_outcomes_mono: outcomes of a multi-cohort simulated under mono therapy
-    :param multi_cohort_outcomes_combo: outcomes of a multi-cohort simulated under combination therapy
+    :param multi_cohort_outcomes_list: (list) of outcomes of multi-cohorts simulated under each strategy
+        (the i-th cohorts of all multi-cohorts should be simulated with the i-th sample of parameters)
+    :param strategy_names: (list) of strategy names (the first one is the reference of incremental
+        net monetary benefits)
+    :param colors: (list) of colors of strategies in figures
+    :param wtp_range: range of willingness-to-pay values
+    :param n_wtps: number of willingness-to-pay values
     """
 
-    # define two strategies
-    HPV_strategy = Econ.Strategy(
-        name='HPV Screening',
-        cost_obs=multi_cohort_outcomes_HPV.meanCosts,
-        effect_obs=multi_cohort_outcomes_HPV.meanQALYs,
-        color='green'
-    )
-    CRYT_strategy = Econ.Strategy(
-        name='Crytology Screening',
-        cost_obs=multi_cohort_outcomes_CRYT.meanCosts,
-        effect_obs=multi_cohort_outcomes_CRYT.meanQALYs,
-        color='blue'
-    )
-
-    # do CEA
-    CEA = Econ.CEA(
-        strategies=[HPV_strategy, CRYT_strategy],
+    CEA = CostEffectivenessAnalysis(
+        strategy_names=strategy_names,
+        cost_obs=[outcomes.meanCosts for outcomes in multi_cohort_outcomes_list],
+        effect_obs=[outcomes.meanQALYs for outcomes in multi_cohort_outcomes_list],
+        colors=colors,
         if_paired=True
     )
 
     # show the cost-effectiveness plane
     CEA.plot_CE_plane(
         title='Cost-Effectiveness Analysis',
-        x_label='Additional Discounted QALY',
-        y_label='Additional Discounted Cost',
+        x_label='Expected Discounted QALY',
+        y_label='Expected Discounted Cost',
         fig_size=(6, 5),
         add_clouds=True,
         transparency=0.2)
@@ -112,18 +107,84 @@ def report_CEA_CBA(multi_cohort_outcomes_HPV, multi_cohort_outcomes_CRYT):
         icer_digits=2,
         file_name='CETable.csv')
 
-    # CBA
-    NBA = Econ.CBA(
-        strategies=[HPV_strategy, CRYT_strategy],
-        wtp_range=(0, 50000),
-        if_paired=True
-    )
-    # show the net monetary benefit figure
-    NBA.plot_incremental_nmbs(
+    # show the net monetary benefit and acceptability figures
+    wtps = np.linspace(wtp_range[0], wtp_range[1], n_wtps)
+    CEA.plot_incremental_nmbs(
+        wtps=wtps,
         title='Cost-Benefit Analysis',
         x_label='Willingness-To-Pay for One Additional QALY ($)',
         y_label='Incremental Net Monetary Benefit ($)',
         interval_type='p',
-        show_legend=True,
-        figure_size=(6, 5),
-    )
+        alpha=D.ALPHA,
+        fig_size=(6, 5))
+    CEA.plot_acceptability_curves(
+        wtps=wtps,
+        x_label='Willingness-To-Pay for One Additional QALY ($)')
+
+
+def report_VOI(multi_cohort_HPV, multi_cohort_CRYT, wtp_range=(0, 50000), n_wtps=201):
+    """ reports the expected value of perfect information and of partial perfect information
+    about the annual state costs, annual state utilities and transition rates
+    :param multi_cohort_HPV: multi-cohort simulated under HPV screening
+    :param multi_cohort_CRYT: multi-cohort simulated under cytology screening
+        (the i-th cohorts of both multi-cohorts should be simulated with the i-th sample of parameters)
+    :param wtp_range: range of willingness-to-pay values
+    :param n_wtps: number of willingness-to-pay values
+    """
+
+    voi = ValueOfInformation(
+        cost_obs=[multi_cohort_HPV.multiCohortOutcomes.meanCosts, multi_cohort_CRYT.multiCohortOutcomes.meanCosts],
+        effect_obs=[multi_cohort_HPV.multiCohortOutcomes.meanQALYs, multi_cohort_CRYT.multiCohortOutcomes.meanQALYs],
+        strategy_names=['HPV Screening', 'Crytology Screening'])
+
+    # sampled parameters of both strategies grouped by attribute
+    samples = get_parameter_samples(param_sets=multi_cohort_HPV.paramSets, prefix='HPV ')
+    samples.update(get_parameter_samples(param_sets=multi_cohort_CRYT.paramSets, prefix='CRYT '))
+    groups = {}
+    for group_name, attribute in (('Annual state costs', 'annualStateCosts'),
+                                  ('Annual state utilities', 'annualStateUtilities'),
+                                  ('Transition rates', 'transRateMatrix')):
+        group = [values for name, values in samples.items() if attribute + '[' in name]
+        if len(group) > 0:
+            groups[group_name] = group
+
+    wtps = np.linspace(wtp_range[0], wtp_range[1], n_wtps)
+    evpi = voi.get_evpi(wtps=wtps)
+    evppis = voi.get_evppi_of_groups(wtps=wtps, groups=groups)
+
+    print('Maximum EVPI per patient: ${:,.2f}'.format(evpi.max()))
+    for name, evppi in evppis.items():
+        print('Maximum EVPPI per patient of {}: ${:,.2f}'.format(name.lower(), evppi.max()))
+
+    plt = get_pyplot()
+    fig, ax = plt.subplots(figsize=(6, 5))
+    ax.plot(wtps, evpi, color='black', label='EVPI')
+    for name, evppi in evppis.items():
+        ax.plot(wtps, evppi, label='EVPPI of ' + name.lower())
+    ax.set_title('Value of Information')
+    ax.set_xlabel('Willingness-To-Pay for One Additional QALY ($)')
+    ax.set_ylabel('Expected Value per Patient ($)')
+    ax.legend()
+    show_figure(figure=fig, name='Value of Information')
+
+
+def plot_survival_curves(multi_cohort_outcomes_list, therapy_names, colors, title='Survival curve',
+                         x_label='Simulation time step (year)', y_label='Number of alive patients'):
+    """ plots the mean survival curve and its uncertainty band for each multi-cohort
+    :param multi_cohort_outcomes_list: (list) of outcomes of simulated multi-cohorts
+    :param therapy_names: (list) of therapy names
+    :param colors: (list) of colors
+    """
+
+    plt = get_pyplot()
+    fig, ax = plt.subplots(figsize=(6, 5))
+    for outcomes, name, color in zip(multi_cohort_outcomes_list, therapy_names, colors):
+        lower, upper = outcomes.get_survival_curve_interval(alpha=D.ALPHA)
+        ax.plot(outcomes.timeGrid, outcomes.get_mean_survival_curve(), color=color, label=name)
+        ax.fill_between(outcomes.timeGrid, lower, upper, color=color, alpha=0.2)
+
+    ax.set_title(title)
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    ax.legend()
+    show_figure(figure=fig, name=title)
@@ -0,0 +1,147 @@
+import hashlib
+import importlib.util
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+# modules whose code the simulated outcomes depend on
+MODEL_MODULES = ('InputData', 'ParameterClasses', 'MarkovModelClasses')
+
+
+def get_model_version(modules=MODEL_MODULES):
+    """
+    :param modules: names of the modules whose code the cached outcomes depend on
+    :return: (string) hash of the source code of the modules (changes whenever the model code changes)
+    """
+    digest = hashlib.sha256()
+    for name in modules:
+        with open(importlib.util.find_spec(name).origin, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+class OutcomeCache:
+    """ content-addressed cache of simulation outcomes on the local disk; each entry is a .npz file
+    named by the hash of everything the outcomes depend on (including the version of the model code),
+    and the least recently used entries are evicted when the cache grows beyond its maximum size """
+
+    def __init__(self, directory='.outcome_cache', max_size=1e9, version=None):
+        """
+        :param directory: directory to store the cached outcomes in (created if it does not exist)
+        :param max_size: maximum total size of the cached outcomes (in bytes)
+        :param version: (string) version of the model that salts the keys of entries
+            (the hash of the source code of the model modules if None, so that outcomes cached
+            before the model code changed are not reused)
+        """
+        self.directory = directory
+        self.maxSize = max_size
+        self.version = get_model_version() if version is None else version
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def get_key(*parts):
+        """
+        :param parts: numbers, strings, None, lists or numpy arrays the cached outcomes depend on
+        :return: (string) the hash of the parts
+        """
+
+        digest = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, np.ndarray):
+                array = np.ascontiguousarray(part, dtype=float)
+                digest.update(repr(array.shape).encode())
+                digest.update(array.tobytes())
+            else:
+                # repr keeps the exact value of floats
+                digest.update(repr(part).encode())
+            digest.update(b'|')
+
+        return digest.hexdigest()
+
+    def load(self, key):
+        """
+        :param key: key of the cached outcomes
+        :return: (dictionary) of the cached arrays (None if the key is not in the cache)
+        """
+
+        path = self._get_path(key)
+        try:
+            with np.load(path) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+            # mark the entry as recently used
+            os.utime(path)
+        except (FileNotFoundError, zipfile.BadZipFile, ValueError, OSError):
+            # a missing, incomplete or evicted entry is a miss
+            return None
+
+        return arrays
+
+    def save(self, key, **arrays):
+        """ stores arrays under the key and evicts the least recently used entries if needed
+        :param key: key of the outcomes
+        :param arrays: arrays to store
+        """
+
+        # write to a temporary file first so that readers (possibly in other processes)
+        # never see a partially written entry
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                np.savez(file, **arrays)
+            os.replace(temp_path, self._get_path(key))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        self._evict()
+
+    def clear(self):
+        """ removes all cached outcomes """
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                self._remove(os.path.join(self.directory, name))
+
+    def get_size(self):
+        """
+        :return: total size of the cached outcomes (in bytes)
+        """
+        return sum(size for path, size, last_used in self._get_entries())
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, self.get_key(self.version, key) + '.npz')
+
+    def _get_entries(self):
+        # (path, size, time of last use) of each entry
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        # removes the least recently used entries until the cache fits in its maximum size
+        entries = self._get_entries()
+        total_size = sum(size for path, size, last_used in entries)
+        if total_size <= self.maxSize:
+            return
+
+        for path, size, last_used in sorted(entries, key=lambda entry: entry[2]):
+            self._remove(path)
+            total_size -= size
+            if total_size <= self.maxSize:
+                break
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # already evicted by another process
+            pass
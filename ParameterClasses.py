@@ -3,38 +3,194 @@ import numpy as np
 import InputData as Data
 
 
+# names of the inputs in InputData that depend on the treatment
+SCREEN_COST_INPUTS = {Data.Treatment.HPV_SCREEN: 'HPV_SCREEN_COST',
+                      Data.Treatment.CRYT_SCREEN: 'CRYT_SCREEN_COST',
+                      Data.Treatment.DUAL_SCREEN: 'DUAL_SCREEN_COST'}
+SCREEN_FREQUENCY_INPUTS = {Data.Treatment.HPV_SCREEN: 'HPV_SCREEN_FREQUENCY',
+                           Data.Treatment.CRYT_SCREEN: 'CRYT_SCREEN_FREQUENCY',
+                           Data.Treatment.DUAL_SCREEN: 'DUAL_SCRREN_FREQUENCE'}
+SCREEN_RR_INPUTS = {Data.Treatment.HPV_SCREEN: 'HPV_SCREEN_RR',
+                    Data.Treatment.CRYT_SCREEN: 'CRYT_SCREEN_RR',
+                    Data.Treatment.DUAL_SCREEN: 'DUAL_SCREEN_RR'}
+# names of the inputs in InputData that transition rates are calculated from
+# and the corresponding arguments of Data.get_trans_rate_matrices
+RATE_INPUTS = {'PROB_WELL_PRECANCER': 'prob_well_precancer',
+               'PROB_WELL_CANCER': 'prob_well_cancer',
+               'PROB_PRECANCER_CANCER': 'prob_precancer_cancer',
+               'PROB_CANCEL_DEATH': 'prob_cancer_death',
+               'ANNUAL_PROB_ALL_CAUSE_MORT': 'annual_prob_all_cause_mort',
+               'ANNUAL_PROB_CERVICALCANCER_MORT': 'annual_prob_cervicalcancer_mort',
+               'SCREEN_DURATION': 'screen_duration',
+               'PRECANCERTREATMENT_DURATION': 'precancer_treatment_duration',
+               'CANCERTREATMENT_DURATION': 'cancer_treatment_duration'}
+# names of all inputs in InputData that parameter sets are built from (and that can be overridden)
+PARAMETER_INPUTS = ('DISCOUNT', 'ANNUAL_STATE_COST_SCREENING', 'ANNUAL_STATE_UTILITY',
+                    'CANCER_TREATMENT_COST', 'PRECANCER_TREATMENT_COST') \
+    + tuple(SCREEN_COST_INPUTS.values()) + tuple(SCREEN_FREQUENCY_INPUTS.values()) \
+    + tuple(SCREEN_RR_INPUTS.values()) + tuple(RATE_INPUTS)
+
+
+def get_input(name, overrides=None):
+    """
+    :param name: name of an input in InputData
+    :param overrides: (dictionary) of input name: value to use instead of the value in InputData
+    :return: value of the input (InputData is never modified)
+    """
+    if overrides is not None and name in overrides:
+        return overrides[name]
+    return getattr(Data, name)
+
+
+def check_overrides(overrides):
+    """ raises an error if an overridden input is not one that parameter sets are built from
+    :param overrides: (dictionary) of input name: value
+    """
+    for name in overrides:
+        if name not in PARAMETER_INPUTS:
+            raise ValueError('Parameter sets do not depend on the input ' + str(name) + '.')
+
+
+def get_screening_cost(treatment, overrides=None):
+    """
+    :param treatment: selected treatment
+    :param overrides: (dictionary) of input name: value to use instead of the value in InputData
+    :return: cost of a screening under the treatment
+    """
+    if treatment not in SCREEN_COST_INPUTS:
+        raise ValueError('Invalid treatment.')
+    return get_input(SCREEN_COST_INPUTS[treatment], overrides)
+
+
+def get_annual_state_costs(treatment, overrides=None):
+    """
+    :param treatment: selected treatment
+    :param overrides: (dictionary) of input name: value to use instead of the value in InputData
+    :return: (numpy array) annual cost of each health state under the treatment
+        (a new array; the costs in InputData are never modified)
+    """
+    costs = np.array(get_input('ANNUAL_STATE_COST_SCREENING', overrides), dtype=float)
+    costs[Data.HealthStates.WELL_SCREENING.value] = get_screening_cost(treatment, overrides)
+    costs[Data.HealthStates.PRE_CANCER_SCREENING.value] = get_screening_cost(treatment, overrides)
+
+    return costs
+
+
+def get_trans_rate_matrix(treatment, overrides=None):
+    """
+    :param treatment: selected treatment
+    :param overrides: (dictionary) of input name: value to use instead of the value in InputData
+    :return: (numpy array) transition rate matrix under the treatment
+    """
+    return Data.get_trans_rate_matrices(
+        screen_frequency=get_input(SCREEN_FREQUENCY_INPUTS[treatment], overrides),
+        screen_rr=get_input(SCREEN_RR_INPUTS[treatment], overrides),
+        **{argument: get_input(name, overrides) for name, argument in RATE_INPUTS.items()})[0]
+
+
+def _get_read_only_array(values):
+    # read-only float array of values (shared without copying if values is already one)
+    if isinstance(values, np.ndarray) and values.dtype == float and not values.flags.writeable:
+        return values
+    array = np.array(values, dtype=float)
+    array.setflags(write=False)
+    return array
+
+
 class Parameters:
-    def __init__(self, treatment):
+    """ a set of parameters; its arrays are read-only and its attributes cannot be reassigned """
+
+    def __init__(self, treatment, annual_state_costs=None, annual_state_utilities=None, trans_rate_matrix=None,
+                 overrides=None):
+        """
+        :param treatment: selected treatment
+        :param annual_state_costs: (array) annual cost of each health state
+            (if None, the costs in InputData with the screening cost of the treatment)
+        :param annual_state_utilities: (array) annual utility of each health state
+            (if None, the utilities in InputData)
+        :param trans_rate_matrix: (matrix) transition rate matrix
+            (if None, the transition rate matrix of the treatment in InputData)
+        :param overrides: (dictionary) of input name: value to use instead of the values in InputData
+            (e.g. {'HPV_SCREEN_RR': 0.9}; InputData is never modified and the arrays passed above take
+            precedence over the inputs they are built from)
+        """
+
+        if overrides is not None:
+            check_overrides(overrides)
 
         # selected therapy
         self.treatment = treatment
 
         # initial health state
         self.initialHealthState = Data.HealthStates.WELL
-        # annual state costs and utilities
 
-        self.annualStateCosts = Data.ANNUAL_STATE_COST_SCREENING
+        # annual state costs and utilities
+        if annual_state_costs is None:
+            annual_state_costs = get_annual_state_costs(treatment, overrides)
+        self.annualStateCosts = _get_read_only_array(annual_state_costs)
+        if annual_state_utilities is None:
+            annual_state_utilities = get_input('ANNUAL_STATE_UTILITY', overrides)
+        self.annualStateUtilities = _get_read_only_array(annual_state_utilities)
 
         # discount rate
-        self.discountRate = Data.DISCOUNT
+        self.discountRate = get_input('DISCOUNT', overrides)
+
+        #  transition rate matrix
+        if trans_rate_matrix is None:
+            trans_rate_matrix = get_trans_rate_matrix(treatment, overrides)
+        self.transRateMatrix = _get_read_only_array(trans_rate_matrix)
+        if np.any(self.transRateMatrix < 0):
+            raise ValueError('The inputs lead to negative transition rates.')
+
+        self.cancerTreatmentCost = get_input('CANCER_TREATMENT_COST', overrides)
+        self.precancerTreatmentCost = get_input('PRECANCER_TREATMENT_COST', overrides)
 
-        self.transRateMatrix = Data.get_trans_rate_matrix(with_treatment=treatment)
+        self._ifFrozen = True
 
-        #  transition rate matrices
-        if self.treatment == Data.Treatment.HPV_SCREEN:
-            self.annualStateCosts[Data.HealthStates.WELL_SCREENING.value] = Data.HPV_SCREEN_COST
-            self.annualStateCosts[Data.HealthStates.PRE_CANCER_SCREENING.value] = Data.HPV_SCREEN_COST
+    def __setattr__(self, name, value):
+        if getattr(self, '_ifFrozen', False):
+            raise AttributeError('Parameters cannot be modified after they are created.')
+        object.__setattr__(self, name, value)
 
-        if self.treatment == Data.Treatment.CRYT_SCREEN:
-            self.annualStateCosts[Data.HealthStates.WELL_SCREENING.value] = Data.CRYT_SCREEN_COST
-            self.annualStateCosts[Data.HealthStates.PRE_CANCER_SCREENING.value] = Data.CRYT_SCREEN_COST
+    def __setstate__(self, state):
+        # unpickled arrays (e.g. in worker processes) are writeable
+        for value in state.values():
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+        self.__dict__.update(state)
 
-        if self.treatment == Data.Treatment.DUAL_SCREEN:
-            self.annualStateCosts[Data.HealthStates.WELL_SCREENING.value] = Data.DUAL_SCREEN_COST
-            self.annualStateCosts[Data.HealthStates.PRE_CANCER_SCREENING.value] = Data.DUAL_SCREEN_COST
 
-        self.annualStateUtilities = Data.ANNUAL_STATE_UTILITY
+class ParameterBatch:
+    """ parameter sets stored as stacked read-only arrays (the i-th row of each array belongs to
+    the i-th parameter set) """
+
+    def __init__(self, treatment, annual_state_costs, annual_state_utilities, trans_rate_matrices):
+        """
+        :param treatment: selected treatment
+        :param annual_state_costs: (n x 9 array) annual cost of each health state
+        :param annual_state_utilities: (n x 9 array) annual utility of each health state
+        :param trans_rate_matrices: (n x 9 x 9 array) transition rate matrices
+        """
+        self.treatment = treatment
+        self.annualStateCosts = _get_read_only_array(annual_state_costs)
+        self.annualStateUtilities = _get_read_only_array(annual_state_utilities)
+        self.transRateMatrices = _get_read_only_array(trans_rate_matrices)
+
+    def __len__(self):
+        return self.annualStateCosts.shape[0]
 
-        self.cancerTreatmentCost = Data.CANCER_TREATMENT_COST
-        self.precancerTreatmentCost = Data.PRECANCER_TREATMENT_COST
+    def get_parameters(self, i):
+        """
+        :param i: index of a parameter set
+        :return: (Parameters) the i-th parameter set (sharing the rows of this batch)
+        """
+        return Parameters(treatment=self.treatment,
+                          annual_state_costs=self.annualStateCosts[i],
+                          annual_state_utilities=self.annualStateUtilities[i],
+                          trans_rate_matrix=self.transRateMatrices[i])
 
+    def get_all_parameters(self):
+        """
+        :return: (list) of all parameter sets of this batch
+        """
+        return [self.get_parameters(i) for i in range(len(self))]
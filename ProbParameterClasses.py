@@ -1,92 +1,166 @@
+import warnings
+
+from scipy import stats
+from scipy.stats import qmc
 import SimPy.RandomVariateGenerators as RVGs
 from ParameterClasses import *
 
-class Parameters:
-    def __init__(self, treatment):
-
-        self.annualStateCosts = []
-
-        # selected therapy
-        self.treatment = treatment
-
-        # initial health state
-        self.initialHealthState = Data.HealthStates.WELL
-        # annual state costs and utilities
-
-        self.annualStateCosts = Data.ANNUAL_STATE_COST_SCREENING
-
-        # discount rate
-        self.discountRate = Data.DISCOUNT
-
 
-        #  transition rate matrices
-        if self.treatment == Data.Treatment.HPV_SCREEN:
-            self.annualStateCosts[Data.HealthStates.WELL_SCREENING.value] = Data.HPV_SCREEN_COST
-            self.annualStateCosts[Data.HealthStates.PRE_CANCER_SCREENING.value] = Data.HPV_SCREEN_COST
+class Sampling(Enum):
+    """ methods to sample parameter sets """
+    RANDOM = 0              # independent pseudo-random draws for each parameter set
+    LATIN_HYPERCUBE = 1     # Latin hypercube design
+    SOBOL = 2               # scrambled Sobol sequence (quasi-Monte Carlo)
 
-        if self.treatment == Data.Treatment.CRYT_SCREEN:
-            self.annualStateCosts[Data.HealthStates.WELL_SCREENING.value] = Data.CRYT_SCREEN_COST
-            self.annualStateCosts[Data.HealthStates.PRE_CANCER_SCREENING.value] = Data.CRYT_SCREEN_COST
-
-        if self.treatment == Data.Treatment.DUAL_SCREEN:
-            self.annualStateCosts[Data.HealthStates.WELL_SCREENING.value] = Data.DUAL_SCREEN_COST
-            self.annualStateCosts[Data.HealthStates.PRE_CANCER_SCREENING.value] = Data.DUAL_SCREEN_COST
-
-        self.annualStateUtilities = Data.ANNUAL_STATE_UTILITY
-
-        self.cancerTreatmentCost = Data.CANCER_TREATMENT_COST
-        self.precancerTreatmentCost = Data.PRECANCER_TREATMENT_COST
-
-        self.transRateMatrix = Data.get_trans_rate_matrix(with_treatment=treatment)
-        self.annualStateUtilities = Data.ANNUAL_STATE_UTILITY
-
-        self.cancerTreatmentCost = Data.CANCER_TREATMENT_COST
-        self.precancerTreatmentCost = Data.PRECANCER_TREATMENT_COST
 
 class ParameterGenerator:
-    def __init__(self, treatment):
+    def __init__(self, treatment, sample_rates=False):
+        """
+        :param treatment: selected treatment
+        :param sample_rates: set to True to also sample the probabilities and the screening sensitivity
+            that the transition rates are calculated from
+        """
 
         self.treatment = treatment
         self.annualStateCostRVG = []
+        # fitted Gamma distribution of each annual state cost (None if the cost is constant)
+        self.annualStateCostFits = []
+
+        # mean annual state costs (with the screening cost of the treatment)
+        self.meanAnnualStateCosts = get_annual_state_costs(treatment)
 
-        for cost in Data.ANNUAL_STATE_COST_SCREENING:
+        for cost in self.meanAnnualStateCosts:
             if cost == 0:
                 self.annualStateCostRVG.append(RVGs.Constant(value=0))
+                self.annualStateCostFits.append(None)
             else:
                 fit_output = RVGs.Gamma.fit_mm(mean=cost,st_dev=cost / 5)
                 self.annualStateCostRVG.append(
                     RVGs.Gamma(a=fit_output["a"],
                            loc=0,
                            scale=fit_output["scale"]))
-
-        if self.treatment == Data.Treatment.HPV_SCREEN:
-            treatment_cost = Data.HPV_SCREEN_COST
-        elif self.treatment == Data.Treatment.CRYT_SCREEN:
-            treatment_cost = Data.CRYT_SCREEN_COST
-        elif self.treatment == Data.Treatment.DUAL_SCREEN:
-            treatment_cost = Data.DUAL_SCREEN_COST
-
-        fit_output = RVGs.Gamma.fit_mm(mean=treatment_cost,st_dev=treatment_cost/5)
-
-        self.annualStateCostRVG[Data.HealthStates.WELL_SCREENING.value] = RVGs.Gamma(a=fit_output["a"],
-                                                                                     loc=0,
-                                                                                     scale=fit_output["scale"])
-        self.annualStateCostRVG[Data.HealthStates.PRE_CANCER_SCREENING.value] = RVGs.Gamma(a=fit_output["a"],
-                                                                                     loc=0,                                                                       scale=fit_output["scale"])
-
-        self.annualStateCostRVG[Data.HealthStates.CANCER_SCREENING.value] = RVGs.Gamma(a=fit_output["a"],
-                                                                                     loc=0,
-                                                                                     scale=fit_output["scale"])
-    def get_new_parameters(self, rng):
-            """
-            :param rng: random number generator
-            :return: a new parameter set
-            """
-
-            # create a parameter set
-            param = Parameters(treatment=self.treatment)
-
-            for dist in self.annualStateCostRVG:
-                param.annualStateCosts.append(dist.sample(rng))
-
-            return param
+                self.annualStateCostFits.append(fit_output)
+
+        # states whose costs are sampled (the dimensions of a sampling design)
+        self.sampledStates = [i for i, fit in enumerate(self.annualStateCostFits) if fit is not None]
+        # shapes and scales of the Gamma distributions of the sampled costs
+        self._costShapes = np.array([self.annualStateCostFits[i]["a"] for i in self.sampledStates])
+        self._costScales = np.array([self.annualStateCostFits[i]["scale"] for i in self.sampledStates])
+
+        # fitted Beta distributions of the inputs of transition rates that are sampled
+        # (keyword arguments of Data.get_trans_rate_matrices)
+        self.rateInputRVGs = {}
+        self.rateInputFits = {}
+        if sample_rates:
+            for name, mean in (('prob_well_precancer', Data.PROB_WELL_PRECANCER),
+                               ('prob_well_cancer', Data.PROB_WELL_CANCER),
+                               ('prob_precancer_cancer', Data.PROB_PRECANCER_CANCER),
+                               ('prob_cancer_death', Data.PROB_CANCEL_DEATH),
+                               ('screen_rr', Data.get_screen_rr(treatment))):
+                fit_output = RVGs.Beta.fit_mm(mean=mean, st_dev=mean / 10)
+                self.rateInputRVGs[name] = RVGs.Beta(a=fit_output["a"],
+                                                     b=fit_output["b"],
+                                                     loc=fit_output["loc"],
+                                                     scale=fit_output["scale"])
+                self.rateInputFits[name] = fit_output
+
+        # number of dimensions of a sampling design (sampled costs followed by sampled rate inputs)
+        self.nDimensions = len(self.sampledStates) + len(self.rateInputFits)
+
+    def get_design(self, n, sampling, seed, first_index=0):
+        """
+        :param n: number of parameter sets
+        :param sampling: (Sampling) Sampling.LATIN_HYPERCUBE or Sampling.SOBOL
+        :param seed: seed of the design
+        :param first_index: index of the first parameter set among all parameter sets of a larger run
+            (a Sobol design continues the same sequence and a Latin hypercube design gets its own seed)
+        :return: (n x d array) points of the design in the unit hypercube (one row per parameter set
+            and one column per sampled state cost or rate input)
+        """
+
+        d = self.nDimensions
+        if sampling == Sampling.SOBOL:
+            engine = qmc.Sobol(d=d, scramble=True, seed=np.random.default_rng(seed))
+            if first_index > 0:
+                engine.fast_forward(first_index)
+            with warnings.catch_warnings():
+                # the sequence is used in segments whose lengths are not always powers of 2
+                warnings.simplefilter('ignore', UserWarning)
+                return engine.random(n)
+        elif sampling == Sampling.LATIN_HYPERCUBE:
+            engine = qmc.LatinHypercube(d=d, seed=np.random.default_rng([seed, first_index]))
+            return engine.random(n)
+        else:
+            raise ValueError('Invalid sampling method for a design.')
+
+    def get_new_parameters(self, rng=None, design_point=None):
+        """
+        :param rng: random number generator (to sample costs independently)
+        :param design_point: (array) point of a sampling design in the unit hypercube
+            (to map through the inverse cumulative distribution functions of costs)
+        :return: a new parameter set
+        """
+
+        if design_point is not None:
+            return self.get_batch_from_design(design=[design_point]).get_parameters(0)
+
+        if self.rateInputRVGs:
+            rate_matrix = Data.get_trans_rate_matrices(
+                screen_frequency=Data.get_screen_frequency(self.treatment),
+                **{name: dist.sample(rng) for name, dist in self.rateInputRVGs.items()})[0]
+        else:
+            rate_matrix = None
+
+        return Parameters(treatment=self.treatment,
+                          annual_state_costs=[dist.sample(rng) for dist in self.annualStateCostRVG],
+                          trans_rate_matrix=rate_matrix)
+
+    def sample_batch(self, n, rng):
+        """ samples n parameter sets in one vectorized draw
+        :param n: number of parameter sets
+        :param rng: random number generator
+        :return: (ParameterBatch) the sampled parameter sets
+        """
+
+        costs = np.tile(self.meanAnnualStateCosts, (n, 1))
+        costs[:, self.sampledStates] = rng.gamma(shape=self._costShapes, scale=self._costScales,
+                                                 size=(n, len(self.sampledStates)))
+        rate_inputs = {name: rng.beta(fit["a"], fit["b"], size=n) * fit["scale"] + fit["loc"]
+                       for name, fit in self.rateInputFits.items()}
+
+        return self._get_batch(annual_state_costs=costs, rate_inputs=rate_inputs)
+
+    def get_batch_from_design(self, design):
+        """
+        :param design: (n x d array) points of a sampling design in the unit hypercube
+        :return: (ParameterBatch) the parameter sets found by mapping the points through
+            the inverse cumulative distribution functions of costs and rate inputs
+        """
+
+        design = np.atleast_2d(design)
+        n_costs = len(self.sampledStates)
+        costs = np.tile(self.meanAnnualStateCosts, (design.shape[0], 1))
+        costs[:, self.sampledStates] = stats.gamma.ppf(design[:, :n_costs], self._costShapes,
+                                                       scale=self._costScales)
+        rate_inputs = {name: stats.beta.ppf(design[:, n_costs + k], fit["a"], fit["b"],
+                                            loc=fit["loc"], scale=fit["scale"])
+                       for k, (name, fit) in enumerate(self.rateInputFits.items())}
+
+        return self._get_batch(annual_state_costs=costs, rate_inputs=rate_inputs)
+
+    def _get_batch(self, annual_state_costs, rate_inputs):
+        # utilities are not sampled, so all parameter sets share one read-only copy
+        # (as do transition rate matrices when rates are not sampled)
+        n = annual_state_costs.shape[0]
+        utilities = np.array(Data.ANNUAL_STATE_UTILITY, dtype=float)
+        if rate_inputs:
+            rate_matrices = Data.get_trans_rate_matrices(
+                screen_frequency=Data.get_screen_frequency(self.treatment), **rate_inputs)
+        else:
+            rate_matrix = np.array(Data.get_trans_rate_matrix(with_treatment=self.treatment), dtype=float)
+            rate_matrices = np.broadcast_to(rate_matrix, (n, ) + rate_matrix.shape)
+
+        return ParameterBatch(treatment=self.treatment,
+                              annual_state_costs=annual_state_costs,
+                              annual_state_utilities=np.broadcast_to(utilities, (n, ) + utilities.shape),
+                              trans_rate_matrices=rate_matrices)
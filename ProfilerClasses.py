@@ -0,0 +1,113 @@
+import time
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+from InputData import HealthStates
+
+
+class SimulationProfiler:
+    """ opt-in instrumentation of simulations: counts the events of each state transition and
+    times the stages of the simulation (stages can be nested, e.g. Gillespie sampling within
+    Cohort.simulate); the simulation classes only instrument themselves when given a profiler """
+
+    def __init__(self):
+        # number of events from each state (row) to each state (column)
+        self.transitionCounts = np.zeros((len(HealthStates), len(HealthStates)), dtype=np.int64)
+        self.stageTimes = {}    # stage: total time (seconds)
+        self.stageCalls = {}    # stage: number of times the stage was timed
+        self.nPatients = 0      # number of patients simulated
+
+    @property
+    def nEvents(self):
+        return int(self.transitionCounts.sum())
+
+    def count_transition(self, from_state_index, to_state_index):
+        """ counts one event """
+        self.transitionCounts[from_state_index, to_state_index] += 1
+
+    def count_transitions(self, from_state_indices, to_state_indices):
+        """ counts the events of arrays of source and destination states """
+        np.add.at(self.transitionCounts, (from_state_indices, to_state_indices), 1)
+
+    def add_time(self, stage, seconds):
+        """ adds the time of one execution of a stage """
+        self.stageTimes[stage] = self.stageTimes.get(stage, 0) + seconds
+        self.stageCalls[stage] = self.stageCalls.get(stage, 0) + 1
+
+    @contextmanager
+    def time_stage(self, stage):
+        """ times the code in a with block as a stage """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def get_timed(self, function, stage):
+        """
+        :return: function that calls the given function and times each call as a stage
+        """
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add_time(stage, time.perf_counter() - start)
+        return timed
+
+    def merge(self, other):
+        """ adds the counts and times of another profiler (e.g. of a worker process) to this one """
+        self.transitionCounts += other.transitionCounts
+        for stage, seconds in other.stageTimes.items():
+            self.stageTimes[stage] = self.stageTimes.get(stage, 0) + seconds
+            self.stageCalls[stage] = self.stageCalls.get(stage, 0) + other.stageCalls[stage]
+        self.nPatients += other.nPatients
+
+    def get_throughput(self, stage='Cohort.simulate'):
+        """
+        :param stage: stage whose time the throughput is calculated over
+        :return: (events per second, patients per second) over the time of the stage
+        """
+        seconds = self.stageTimes.get(stage, 0)
+        if seconds == 0:
+            return None, None
+        return self.nEvents / seconds, self.nPatients / seconds
+
+    def print_report(self):
+        """ prints the number of events of each state transition, the throughput and the times of stages """
+
+        print('Events: {:,} ({:,} patients)'.format(self.nEvents, self.nPatients))
+        events_per_sec, patients_per_sec = self.get_throughput()
+        if events_per_sec is not None:
+            print('Throughput: {:,.0f} events/s, {:,.0f} patients/s'.format(events_per_sec, patients_per_sec))
+
+        print('Events by transition:')
+        for i, j in zip(*np.nonzero(self.transitionCounts)):
+            print('  {} -> {}: {:,} ({:.1%})'.format(HealthStates(i).name, HealthStates(j).name,
+                                                    self.transitionCounts[i, j],
+                                                    self.transitionCounts[i, j] / self.nEvents))
+
+        print('Time by stage (stages can be nested):')
+        for stage, seconds in sorted(self.stageTimes.items(), key=lambda item: item[1], reverse=True):
+            print('  {}: {:.4f} s in {:,} calls'.format(stage, seconds, self.stageCalls[stage]))
+
+
+def time_stage(profiler, stage):
+    """
+    :param profiler: (SimulationProfiler) profiler or None
+    :param stage: name of the stage
+    :return: context manager that times a with block as a stage (does nothing if the profiler is None)
+    """
+    return nullcontext() if profiler is None else profiler.time_stage(stage)
+
+
+def print_progress(n_done, n_total, elapsed_time, eta):
+    """ progress callback of MultiCohort.simulate that prints the number of simulated cohorts
+    :param n_done: number of cohorts simulated (or recorded by an interrupted run)
+    :param n_total: number of cohorts
+    :param elapsed_time: time since the simulation started (seconds)
+    :param eta: estimated time to simulate the remaining cohorts (seconds)
+    """
+    print('\r{:,}/{:,} cohorts, {:.0f} s elapsed, {:.0f} s remaining'.format(n_done, n_total, elapsed_time, eta),
+          end='\n' if n_done == n_total else '', flush=True)
@@ -0,0 +1,210 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import matplotlib
+matplotlib.use('Agg')   # reports are rendered without showing figures
+import matplotlib.pyplot as plt
+import numpy as np
+
+import InputData as D
+import MarkovModelClasses as Cls
+import MultiCohortClasses as MultiCls
+import MultiCohortSupport
+import ParameterClasses as P
+import Support
+from BenchmarkClasses import Benchmark, BenchmarkSuite, compare_results, lazy_fixture, read_results
+from ProbParameterClasses import ParameterGenerator
+
+SIM_LENGTH = D.SIMULATION_LENGTH
+
+
+def get_benchmarks(quick=False):
+    """
+    :param quick: set to True for smaller problems (e.g. to check the harness)
+    :return: (list) of benchmarks of the simulation hot paths and the reports
+    """
+
+    pop_sizes = [100, 1000] if quick else [100, 1000, 10000]
+    n_cohorts = [5, 10] if quick else [10, 50, 100]
+    multi_cohort_pop_size = 100
+    n_repeats = 1 if quick else 3
+    params = P.Parameters(treatment=D.Treatment.HPV_SCREEN)
+    benchmarks = []
+
+    # one patient at a time
+    def simulate_patients(n=1000):
+        model = Cls.CompiledModel(parameters=params)
+        n_events = 0
+        for i in range(n):
+            patient = Cls.Patient(id=i, parameters=params, model=model)
+            patient.simulate(SIM_LENGTH)
+            n_events += patient.nEvents
+        return {'nEvents': n_events, 'nPatients': n}
+    benchmarks.append(Benchmark(name='Patient.simulate', run=simulate_patients, n_repeats=n_repeats))
+
+    # cohorts of several sizes under each engine
+    for engine in Cls.Engine:
+        for pop_size in pop_sizes:
+            def simulate_cohort(engine=engine, pop_size=pop_size):
+                cohort = Cls.Cohort(id=1, pop_size=pop_size, parameters=params, engine=engine)
+                cohort.simulate(sim_length=SIM_LENGTH)
+                return {'nEvents': cohort.nEvents, 'nPatients': pop_size}
+            benchmarks.append(Benchmark(name='Cohort.simulate[{}, {}]'.format(engine.name, pop_size),
+                                        run=simulate_cohort, group='Cohort.simulate[{}]'.format(engine.name),
+                                        size=pop_size, n_repeats=n_repeats))
+
+    # multi-cohorts of several numbers of cohorts
+    for n in n_cohorts:
+        def simulate_multi_cohort(n=n):
+            multi_cohort = MultiCls.MultiCohort(ids=range(n), pop_size=multi_cohort_pop_size,
+                                                treatment=D.Treatment.HPV_SCREEN)
+            multi_cohort.simulate(sim_length=SIM_LENGTH)
+            return {'nEvents': multi_cohort.nEvents, 'nPatients': n * multi_cohort_pop_size}
+        benchmarks.append(Benchmark(name='MultiCohort.simulate[{}]'.format(n), run=simulate_multi_cohort,
+                                    group='MultiCohort.simulate', size=n, n_repeats=n_repeats))
+
+    # parameter sampling
+    def get_new_parameters(n=1000):
+        generator = ParameterGenerator(treatment=D.Treatment.HPV_SCREEN)
+        for i in range(n):
+            generator.get_new_parameters(rng=np.random.RandomState(seed=i))
+    benchmarks.append(Benchmark(name='ParameterGenerator.get_new_parameters', run=get_new_parameters,
+                                n_repeats=n_repeats))
+
+    # summary statistics of the outcomes of a large cohort
+    # (inputs of benchmarks are simulated when a benchmark that needs them is first run)
+    def simulate_large_cohort():
+        cohort = Cls.Cohort(id=1, pop_size=pop_sizes[-1], parameters=params, engine=Cls.Engine.VECTORIZED)
+        cohort.simulate(sim_length=SIM_LENGTH)
+        return cohort.cohortOutcomes
+    get_large_cohort_outcomes = lazy_fixture(simulate_large_cohort)
+
+    def get_cohort_outcomes():
+        outcomes = get_large_cohort_outcomes()
+        new_outcomes = Cls.CohortOutcomes(pop_size=len(outcomes.costs))
+        new_outcomes.extract_outcomes(survival_times=outcomes.patientSurvivalTimes, n_cancer=outcomes.nTotalCancer,
+                                      costs=outcomes.costs, utilities=outcomes.utilities)
+        return new_outcomes
+
+    def calculate_cohort_outcomes(outcomes):
+        outcomes.calculate_cohort_outcomes(initial_pop_size=len(outcomes.costs))
+        return {'nPatients': len(outcomes.costs)}
+    benchmarks.append(Benchmark(name='CohortOutcomes.calculate_cohort_outcomes', run=calculate_cohort_outcomes,
+                                setup=get_cohort_outcomes, n_repeats=n_repeats))
+
+    # reports of cohorts and of multi-cohorts
+    def simulate_cohorts():
+        cohorts = []
+        for treatment in D.Treatment:
+            cohort = Cls.Cohort(id=1, pop_size=pop_sizes[-2], parameters=P.Parameters(treatment=treatment),
+                                crn_seed=1)
+            cohort.simulate(sim_length=SIM_LENGTH)
+            cohorts.append(cohort)
+        return cohorts
+
+    def simulate_multi_cohorts():
+        multi_cohorts = []
+        for treatment in (D.Treatment.HPV_SCREEN, D.Treatment.CRYT_SCREEN):
+            multi_cohort = MultiCls.MultiCohort(ids=range(n_cohorts[-1]), pop_size=multi_cohort_pop_size,
+                                                treatment=treatment)
+            multi_cohort.simulate(sim_length=SIM_LENGTH)
+            multi_cohorts.append(multi_cohort)
+        return multi_cohorts
+    get_cohorts = lazy_fixture(simulate_cohorts)
+    get_multi_cohorts = lazy_fixture(simulate_multi_cohorts)
+
+    def report_cohorts(cohorts):
+        Support.report_CEA_CBA(sim_outcomes_list=[cohort.cohortOutcomes for cohort in cohorts],
+                               treatments=list(D.Treatment), colors=['green', 'blue', 'red'], if_paired=True)
+        plt.close('all')
+    benchmarks.append(Benchmark(name='Support.report_CEA_CBA', run=_in_temp_directory(report_cohorts),
+                                setup=get_cohorts, n_repeats=n_repeats))
+
+    def report_multi_cohorts(multi_cohorts):
+        MultiCohortSupport.report_CEA_CBA(
+            multi_cohort_outcomes_list=[multi_cohort.multiCohortOutcomes for multi_cohort in multi_cohorts],
+            strategy_names=['HPV Screening', 'Crytology Screening'], colors=['green', 'blue'])
+        plt.close('all')
+    benchmarks.append(Benchmark(name='MultiCohortSupport.report_CEA_CBA', run=_in_temp_directory(report_multi_cohorts),
+                                setup=get_multi_cohorts, n_repeats=n_repeats))
+
+    def report_voi(multi_cohorts):
+        MultiCohortSupport.report_VOI(multi_cohort_HPV=multi_cohorts[0], multi_cohort_CRYT=multi_cohorts[1])
+        plt.close('all')
+    benchmarks.append(Benchmark(name='MultiCohortSupport.report_VOI', run=report_voi, setup=get_multi_cohorts,
+                                n_repeats=n_repeats))
+
+    return benchmarks
+
+
+def _in_temp_directory(function):
+    """
+    :return: function that calls the given function in a temporary working directory
+        (so that the tables written by reports do not overwrite those of the project)
+    """
+    def run(*args):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                return function(*args)
+            finally:
+                os.chdir(cwd)
+    return run
+
+
+def plot_scaling_curves(results, file_name):
+    """ plots the wall time of each group of benchmarks against the size of the problem
+    :param results: (list) of results of benchmarks
+    :param file_name: name of the figure file
+    """
+
+    fig, ax = plt.subplots(figsize=(6, 5))
+    groups = sorted({result['group'] for result in results if result['group'] is not None})
+    for group in groups:
+        points = sorted((result['size'], result['wallTime']) for result in results if result['group'] == group)
+        ax.plot(*zip(*points), marker='o', label=group)
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_title('Scaling Curves')
+    ax.set_xlabel('Size (patients or cohorts)')
+    ax.set_ylabel('Wall time (s)')
+    ax.legend()
+    fig.savefig(file_name)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the simulation hot paths.')
+    parser.add_argument('--quick', action='store_true', help='run smaller problems')
+    parser.add_argument('--only', nargs='+', help='names or groups of the benchmarks to run')
+    parser.add_argument('--output', default='benchmark_results.json', help='results file to write')
+    parser.add_argument('--plot', help='figure file to plot the scaling curves in')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two results files instead of running the benchmarks')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative increase of wall time or peak memory flagged as a regression')
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        rows = compare_results(old_results=read_results(args.compare[0]),
+                               new_results=read_results(args.compare[1]),
+                               threshold=args.threshold)
+        for name, old_time, new_time, old_memory, new_memory, if_regression in rows:
+            print('{:<45} {:>10.4f} s -> {:>10.4f} s ({:+.0%}) {:>8.1f} MB -> {:>8.1f} MB{}'.format(
+                name, old_time, new_time, new_time / old_time - 1, old_memory / 1e6, new_memory / 1e6,
+                '  REGRESSION' if if_regression else ''))
+        # a non-zero exit code lets scripts detect regressions
+        sys.exit(1 if any(row[-1] for row in rows) else 0)
+
+    suite = BenchmarkSuite(benchmarks=get_benchmarks(quick=args.quick))
+    suite.run(names=args.only)
+    suite.write_results(file_name=args.output)
+    if args.plot is not None:
+        plot_scaling_curves(results=suite.results, file_name=args.plot)
+
+
+if __name__ == '__main__':
+    main()
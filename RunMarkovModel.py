@@ -1,9 +1,8 @@
 import InputData as D
 import MarkovModelClasses as Cls
 import ParameterClasses as P
-import SimPy.Plots.Histogram as Hist
-import SimPy.Plots.SamplePaths as Path
 import Support as Support
+from OutcomeCacheClasses import OutcomeCache
 
 # selected therapy
 treatment = D.Treatment.HPV_SCREEN
@@ -11,11 +10,16 @@ treatment = D.Treatment.HPV_SCREEN
 # create a cohort
 myCohort = Cls.Cohort(id=1,
                       pop_size=D.POP_SIZE,
-                      parameters=P.Parameters(treatment=treatment))
+                      parameters=P.Parameters(treatment=treatment),
+                      cache=OutcomeCache() if D.USE_OUTCOME_CACHE else None)
 
 # simulate the cohort over the specified time steps
 myCohort.simulate(sim_length=D.SIMULATION_LENGTH)
 
+# plotting modules are only imported when figures are drawn
+import SimPy.Plots.Histogram as Hist
+import SimPy.Plots.SamplePaths as Path
+
 # plot the sample path (survival curve)
 Path.plot_sample_path(
     sample_path=myCohort.cohortOutcomes.nLivingPatients,
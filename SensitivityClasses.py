@@ -0,0 +1,182 @@
+import csv
+from concurrent.futures import ProcessPoolExecutor
+
+import InputData as D
+from AnalyticCohortClasses import AnalyticCohort
+from MarkovModelClasses import Cohort, Engine
+from OutcomeCacheClasses import OutcomeCache
+from ParameterClasses import Parameters, check_overrides, get_input
+
+# columns of tornado tables
+TORNADO_TABLE_HEADER = ['Input', 'Low value', 'High value',
+                        'Incremental cost (low)', 'Incremental cost (high)',
+                        'Incremental QALY (low)', 'Incremental QALY (high)',
+                        'Incremental NMB (low)', 'Incremental NMB (high)']
+
+
+def _evaluate_scenario(parameters, cohort_id, pop_size, sim_length, engine, crn_seed, cache, if_analytic):
+    """ evaluates a parameter set (run by worker processes)
+    :param parameters: parameters of the scenario
+    :param cohort_id: cohort ID
+    :param pop_size: population size of the cohort
+    :param sim_length: simulation length
+    :param engine: (Engine) engine to simulate the cohort with
+    :param crn_seed: seed of common random numbers (None to not use common random numbers)
+    :param cache: (OutcomeCache) cache of cohort outcomes (None to not use a cache)
+    :param if_analytic: set to True to calculate the expected outcomes exactly instead of simulating
+    :return: (mean discounted cost, mean discounted QALY)
+    """
+
+    if if_analytic:
+        outcomes = AnalyticCohort(parameters=parameters).evaluate(sim_length=sim_length, n_time_points=2)
+        return outcomes.expectedCost, outcomes.expectedUtility
+
+    cohort = Cohort(id=cohort_id,
+                    pop_size=pop_size,
+                    parameters=parameters,
+                    engine=engine,
+                    crn_seed=crn_seed,
+                    cache=cache)
+    cohort.simulate(sim_length=sim_length)
+
+    return cohort.cohortOutcomes.statCost.get_mean(), cohort.cohortOutcomes.statUtility.get_mean()
+
+
+class OneWaySensitivity:
+    """ one-way sensitivity analysis: each input in InputData is set to the low and the high end of
+    its range while all other inputs keep their values (InputData is never modified) """
+
+    # name of the base-case scenario
+    BASE = 'Base case'
+
+    def __init__(self, treatments, ref_treatment, ranges, wtp, pop_size=D.POP_SIZE,
+                 sim_length=D.SIMULATION_LENGTH, engine=Engine.PATIENT, crn_seed=1, cache=None,
+                 if_analytic=False):
+        """
+        :param treatments: (list) of treatments to compare with the reference treatment
+        :param ref_treatment: reference treatment
+        :param ranges: (dictionary) of input name in InputData: (low value, high value)
+        :param wtp: willingness-to-pay per QALY (for the incremental net monetary benefit)
+        :param pop_size: population size of cohorts
+        :param sim_length: simulation length
+        :param engine: (Engine) engine to simulate cohorts with
+        :param crn_seed: seed of common random numbers, so that every scenario and treatment is simulated
+            with the same patients (None to not use common random numbers); only Engine.PATIENT supports
+            common random numbers, so the seed is not used with Engine.VECTORIZED
+        :param cache: (OutcomeCache) cache of cohort outcomes shared by runs (None to not use a cache)
+        :param if_analytic: set to True to calculate the expected outcomes exactly instead of simulating
+        """
+        check_overrides(ranges)
+
+        self.treatments = list(treatments)
+        self.refTreatment = ref_treatment
+        self.ranges = ranges
+        self.wtp = wtp
+        self.popSize = pop_size
+        self.simLength = sim_length
+        self.engine = engine
+        self.crnSeed = crn_seed if engine == Engine.PATIENT else None
+        self.cache = cache
+        self.ifAnalytic = if_analytic
+
+        # (treatment, scenario): (mean discounted cost, mean discounted QALY)
+        self.outcomes = {}
+        # number of parameter sets evaluated (scenarios with the same parameter set are evaluated once)
+        self.nEvaluated = 0
+
+    def get_scenarios(self):
+        """
+        :return: (dictionary) of scenario: overrides of InputData, where a scenario is BASE or
+            (input name, 'low') or (input name, 'high')
+        """
+        scenarios = {self.BASE: {}}
+        for name, (low, high) in self.ranges.items():
+            scenarios[(name, 'low')] = {name: low}
+            scenarios[(name, 'high')] = {name: high}
+
+        return scenarios
+
+    def run(self, workers=1):
+        """ evaluates all scenarios under all treatments
+        :param workers: number of processes to evaluate scenarios in parallel
+        """
+
+        # parameter sets to evaluate; scenarios that lead to the same parameter set (e.g. the base case
+        # and the scenarios of inputs that do not affect a treatment) share the result of the base case
+        param_sets = {}
+        keys = {}
+        for treatment in [self.refTreatment] + self.treatments:
+            for scenario, overrides in self.get_scenarios().items():
+                params = Parameters(treatment=treatment, overrides=overrides)
+                key = OutcomeCache.get_key(treatment.name, params.discountRate, params.cancerTreatmentCost,
+                                           params.precancerTreatmentCost, params.annualStateCosts,
+                                           params.annualStateUtilities, params.transRateMatrix)
+                keys[(treatment, scenario)] = key
+                param_sets.setdefault(key, params)
+
+        n = len(param_sets)
+        args = (list(param_sets.values()), [1] * n, [self.popSize] * n, [self.simLength] * n,
+                [self.engine] * n, [self.crnSeed] * n, [self.cache] * n, [self.ifAnalytic] * n)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_evaluate_scenario, *args))
+        else:
+            results = list(map(_evaluate_scenario, *args))
+
+        results = dict(zip(param_sets, results))
+        self.outcomes = {treatment_scenario: results[key] for treatment_scenario, key in keys.items()}
+        self.nEvaluated = n
+
+    def get_incremental_outcomes(self, treatment, scenario=BASE):
+        """
+        :param treatment: treatment
+        :param scenario: scenario
+        :return: (incremental cost, incremental QALY, incremental NMB) of the treatment with respect to
+            the reference treatment under the scenario
+        """
+        cost, qaly = self.outcomes[(treatment, scenario)]
+        ref_cost, ref_qaly = self.outcomes[(self.refTreatment, scenario)]
+
+        return cost - ref_cost, qaly - ref_qaly, self.wtp * (qaly - ref_qaly) - (cost - ref_cost)
+
+    def get_tornado_table(self, treatment):
+        """
+        :param treatment: treatment
+        :return: (list) of rows (see TORNADO_TABLE_HEADER) for each input, sorted by the swing
+            of the incremental NMB between the low and the high values (largest first)
+        """
+
+        rows = []
+        for name, (low, high) in self.ranges.items():
+            low_outcomes = self.get_incremental_outcomes(treatment=treatment, scenario=(name, 'low'))
+            high_outcomes = self.get_incremental_outcomes(treatment=treatment, scenario=(name, 'high'))
+            rows.append([name, low, high,
+                         low_outcomes[0], high_outcomes[0],
+                         low_outcomes[1], high_outcomes[1],
+                         low_outcomes[2], high_outcomes[2]])
+
+        return sorted(rows, key=lambda row: abs(row[8] - row[7]), reverse=True)
+
+    def write_tornado_table(self, treatment, file_name):
+        """ writes the tornado table of a treatment (after a row for the base case) to a csv file
+        :param treatment: treatment
+        :param file_name: name of the csv file
+        """
+
+        base = self.get_incremental_outcomes(treatment=treatment)
+        with open(file_name, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(TORNADO_TABLE_HEADER)
+            writer.writerow([self.BASE, '', '', base[0], base[0], base[1], base[1], base[2], base[2]])
+            for row in self.get_tornado_table(treatment=treatment):
+                writer.writerow(row)
+
+
+def get_default_ranges(inputs, relative_change=0.2):
+    """
+    :param inputs: (list) of names of numeric inputs in InputData
+    :param relative_change: relative change of each input from its value in InputData
+    :return: (dictionary) of input name: (low value, high value)
+    """
+    return {name: (get_input(name) * (1 - relative_change), get_input(name) * (1 + relative_change))
+            for name in inputs}
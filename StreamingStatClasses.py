@@ -0,0 +1,218 @@
+import numpy as np
+from scipy import stats
+
+
+class QuantileSketch:
+    """ mergeable sketch of a distribution with logarithmically-spaced buckets;
+    quantiles are estimated within the specified relative accuracy (DDSketch, Masson et al., 2019) """
+
+    def __init__(self, relative_accuracy=0.005):
+        """
+        :param relative_accuracy: relative accuracy of the estimated quantiles
+        """
+        self.relativeAccuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._logGamma = np.log(self._gamma)
+
+        self.n = 0
+        self._positiveCounts = {}   # bucket index of x > 0: count
+        self._negativeCounts = {}   # bucket index of -x for x < 0: count
+        self._zeroCount = 0
+
+    def add(self, values):
+        """ adds observations to the sketch
+        :param values: (numpy array) observations
+        """
+
+        values = np.asarray(values, dtype=float).ravel()
+        self.n += values.size
+        self._zeroCount += int(np.count_nonzero(values == 0))
+        self._add_to_buckets(self._positiveCounts, values[values > 0])
+        self._add_to_buckets(self._negativeCounts, -values[values < 0])
+
+    def merge(self, other):
+        """ adds the observations of another sketch with the same relative accuracy
+        :param other: (QuantileSketch) another sketch
+        """
+
+        if other.relativeAccuracy != self.relativeAccuracy:
+            raise ValueError('Only sketches with the same relative accuracy can be merged.')
+
+        self.n += other.n
+        self._zeroCount += other._zeroCount
+        for counts, other_counts in ((self._positiveCounts, other._positiveCounts),
+                                     (self._negativeCounts, other._negativeCounts)):
+            for key, count in other_counts.items():
+                counts[key] = counts.get(key, 0) + count
+
+    def get_quantile(self, q):
+        """
+        :param q: quantile (between 0 and 1)
+        :return: estimate of the quantile q
+        """
+
+        if self.n == 0:
+            return np.nan
+
+        rank = q * (self.n - 1)
+        cumulative = 0
+
+        # negative values from the largest magnitude to the smallest
+        for key in sorted(self._negativeCounts, reverse=True):
+            cumulative += self._negativeCounts[key]
+            if cumulative > rank:
+                return -self._get_value(key)
+
+        cumulative += self._zeroCount
+        if cumulative > rank:
+            return 0.0
+
+        for key in sorted(self._positiveCounts):
+            cumulative += self._positiveCounts[key]
+            if cumulative > rank:
+                return self._get_value(key)
+
+        return self._get_value(max(self._positiveCounts))
+
+    def _add_to_buckets(self, counts, values):
+        if values.size == 0:
+            return
+        keys, key_counts = np.unique(np.ceil(np.log(values) / self._logGamma).astype(int),
+                                     return_counts=True)
+        for key, count in zip(keys.tolist(), key_counts.tolist()):
+            counts[key] = counts.get(key, 0) + count
+
+    def _get_value(self, key):
+        # the value of a bucket with the lowest relative error for all observations in it
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+
+class StreamingStat:
+    """ summary statistics of observations that are added in batches and not stored:
+    running mean and variance (Welford), minimum, maximum, and a quantile sketch """
+
+    def __init__(self, name, relative_accuracy=0.005):
+        """
+        :param name: name of this statistics
+        :param relative_accuracy: relative accuracy of the estimated percentiles
+        """
+        self.name = name
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = 0.0      # sum of squared differences from the mean
+        self._min = np.inf
+        self._max = -np.inf
+        self.sketch = QuantileSketch(relative_accuracy=relative_accuracy)
+
+    def add(self, values):
+        """ adds observations
+        :param values: (numpy array or float) observations
+        """
+
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return
+
+        mean = values.mean()
+        self._combine(n=values.size, mean=mean, m2=np.sum((values - mean) ** 2),
+                      minimum=values.min(), maximum=values.max())
+        self.sketch.add(values)
+
+    def merge(self, other):
+        """ adds the observations summarized by another streaming statistics
+        :param other: (StreamingStat) another streaming statistics
+        """
+
+        if other.n == 0:
+            return
+        self._combine(n=other.n, mean=other._mean, m2=other._m2, minimum=other._min, maximum=other._max)
+        self.sketch.merge(other.sketch)
+
+    def get_mean(self):
+        return self._mean if self.n > 0 else np.nan
+
+    def get_stdev(self):
+        return np.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+    def get_min(self):
+        return self._min
+
+    def get_max(self):
+        return self._max
+
+    def get_percentile(self, q):
+        """
+        :param q: percentile (between 0 and 100)
+        :return: estimate of the q-th percentile
+        """
+        return self.sketch.get_quantile(q / 100)
+
+    def get_t_half_length(self, alpha):
+        """
+        :param alpha: significance level
+        :return: half-length of the t-based confidence interval of the mean
+        """
+        if self.n < 2:
+            return np.nan
+        return stats.t.ppf(1 - alpha / 2, self.n - 1) * self.get_stdev() / np.sqrt(self.n)
+
+    def get_t_CI(self, alpha):
+        """
+        :param alpha: significance level
+        :return: t-based confidence interval of the mean
+        """
+        half_length = self.get_t_half_length(alpha)
+        return [self.get_mean() - half_length, self.get_mean() + half_length]
+
+    def get_PI(self, alpha):
+        """
+        :param alpha: significance level
+        :return: percentile interval (estimated from the quantile sketch)
+        """
+        return [self.get_percentile(100 * alpha / 2), self.get_percentile(100 * (1 - alpha / 2))]
+
+    def get_interval(self, interval_type='c', alpha=0.05):
+        """
+        :param interval_type: 'c' for confidence interval and 'p' for percentile interval
+        :param alpha: significance level
+        :return: the interval
+        """
+        if interval_type == 'c':
+            return self.get_t_CI(alpha)
+        elif interval_type == 'p':
+            return self.get_PI(alpha)
+        else:
+            raise ValueError('Invalid interval type.')
+
+    def get_formatted_mean_and_interval(self, interval_type='c', alpha=0.05, deci=0, form=None, multiplier=1):
+        """
+        :param interval_type: 'c' for confidence interval and 'p' for percentile interval
+        :param alpha: significance level
+        :param deci: number of digits to round the numbers to
+        :param form: ',' to use thousands separators or '%' to show percentages
+        :param multiplier: to multiply the estimate and the interval by
+        :return: text in the form of 'mean (lower, upper)'
+        """
+
+        if form == ',':
+            pattern = '{:,.{prec}f}'
+        elif form == '%':
+            pattern = '{:.{prec}%}'
+        else:
+            pattern = '{:.{prec}f}'
+
+        mean = self.get_mean() * multiplier
+        interval = [v * multiplier for v in self.get_interval(interval_type=interval_type, alpha=alpha)]
+
+        return pattern.format(mean, prec=deci) \
+            + ' (' + pattern.format(interval[0], prec=deci) + ', ' + pattern.format(interval[1], prec=deci) + ')'
+
+    def _combine(self, n, mean, m2, minimum, maximum):
+        # combines the running moments with those of another group of observations (Chan et al., 1979)
+        total = self.n + n
+        delta = mean - self._mean
+        self._mean += delta * n / total
+        self._m2 += m2 + delta ** 2 * self.n * n / total
+        self.n = total
+        self._min = min(self._min, minimum)
+        self._max = max(self._max, maximum)
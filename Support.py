@@ -1,8 +1,9 @@
+import numpy as np
+
 import InputData as D
-import SimPy.EconEval as Econ
-import SimPy.Plots.Histogram as Hist
-import SimPy.Plots.SamplePaths as Path
 import SimPy.Statistics as Stat
+from CostEffectivenessClasses import CostEffectivenessAnalysis
+from FigureRendererClasses import save_current_figure
 
 def print_outcomes(sim_outcomes, treatment_name):
     """ prints the outcomes of a simulated cohort
@@ -45,6 +46,10 @@ def plot_survival_curves_and_histograms(sim_outcomes_1, treatment1, sim_outcomes
     :param sim_outcomes_: outcomes of a cohort simulated under cryt therapy
     """
 
+    # plotting modules are only imported when figures are drawn
+    import SimPy.Plots.Histogram as Hist
+    import SimPy.Plots.SamplePaths as Path
+
     # get survival curves of both treatments
     survival_curves = [
         sim_outcomes_1.nLivingPatients,
@@ -71,6 +76,7 @@ def plot_survival_curves_and_histograms(sim_outcomes_1, treatment1, sim_outcomes
         legends=[treatment1, treatment2],
         color_codes=[color1, color2]
     )
+    save_current_figure(name='Survival curve {} vs {}'.format(treatment1.name, treatment2.name))
     # histograms of survival times
     set_of_survival_times = [
         sim_outcomes_1.survivalTimes,
@@ -88,6 +94,7 @@ def plot_survival_curves_and_histograms(sim_outcomes_1, treatment1, sim_outcomes
         color_codes=['green', 'blue'],
         transparency=0.6
     )
+    save_current_figure(name='Histogram of patient survival time {} vs {}'.format(treatment1.name, treatment2.name))
 
 
 # histograms of cancer times
@@ -107,16 +114,20 @@ def plot_survival_curves_and_histograms(sim_outcomes_1, treatment1, sim_outcomes
         color_codes=['green', 'blue'],
         transparency=0.6
     )
+    save_current_figure(name='Histogram of patient cancer number {} vs {}'.format(treatment1.name, treatment2.name))
 
 def print_comparative_outcomes(sim_outcomes_1,
                                treatment1,
                                sim_outcomes_2,
-                               treatment2):
+                               treatment2,
+                               if_paired=False):
 
     """ prints average increase in survival time, discounted cost, and discounted utility
     under combination therapy compared to mono therapy
     :param sim_outcomes_mono: outcomes of a cohort simulated under mono therapy
     :param sim_outcomes_combo: outcomes of a cohort simulated under combination therapy
+    :param if_paired: set to True if both cohorts were simulated with the same common random numbers
+        (the differences in cost and utility are then calculated patient by patient)
     """
     print("Compare ",
           treatment1,
@@ -137,8 +148,13 @@ def print_comparative_outcomes(sim_outcomes_1,
           .format(1 - D.ALPHA, prec=0),
           estimate_CI)
 
+    if if_paired:
+        difference_stat = Stat.DifferenceStatPaired
+    else:
+        difference_stat = Stat.DifferenceStatIndp
+
     # increase in mean discounted cost under combination therapy with respect to mono therapy
-    increase_discounted_cost = Stat.DifferenceStatIndp(
+    increase_discounted_cost = difference_stat(
         name='Increase in mean discounted cost',
         x=sim_outcomes_1.costs,
         y_ref=sim_outcomes_2.costs)
@@ -154,7 +170,7 @@ def print_comparative_outcomes(sim_outcomes_1,
 
     # increase in mean discounted utility under combination therapy with respect to mono therapy
 
-    increase_discounted_utility = Stat.DifferenceStatIndp(
+    increase_discounted_utility = difference_stat(
         name='Increase in mean discounted utility',
         x=sim_outcomes_1.utilities,
         y_ref=sim_outcomes_2.utilities)
@@ -168,41 +184,32 @@ def print_comparative_outcomes(sim_outcomes_1,
           .format(1 - D.ALPHA, prec=0),
           estimate_CI)
 
-def report_CEA_CBA(sim_outcomes_hpv, sim_outcomes_cryt):
+def report_CEA_CBA(sim_outcomes_list, treatments, colors, if_paired=False, wtp_range=(0, 5000), n_wtps=1001):
     """ performs cost-effectiveness and cost-benefit analyses
-    :param sim_outcomes_mono: outcomes of a cohort simulated under mono therapy
-    :param sim_outcomes_combo: outcomes of a cohort simulated under combination therapy
+    :param sim_outcomes_list: (list) of outcomes of cohorts simulated under each treatment
+    :param treatments: (list) of treatments (the first one is the reference of incremental net monetary benefits)
+    :param colors: (list) of colors of treatments in figures
+    :param if_paired: set to True if all cohorts were simulated with the same common random numbers
+    :param wtp_range: range of willingness-to-pay values
+    :param n_wtps: number of willingness-to-pay values
     """
 
-    # define two strategies
-    hpv_therapy_strategy = Econ.Strategy(
-        name='With HPV Screening ',
-        cost_obs=sim_outcomes_hpv.costs,
-        effect_obs=sim_outcomes_hpv.utilities,
-        color='green'
-    )
-    cryt_therapy_strategy = Econ.Strategy(
-        name='With CRYT Screening',
-        cost_obs=sim_outcomes_cryt.costs,
-        effect_obs=sim_outcomes_cryt.utilities,
-        color='blue'
-    )
-    # do CEA
-    CEA = Econ.CEA(
-        strategies=[hpv_therapy_strategy, cryt_therapy_strategy],
-        if_paired=False
+    CEA = CostEffectivenessAnalysis(
+        strategy_names=['With ' + treatment.name for treatment in treatments],
+        cost_obs=[sim_outcomes.costs for sim_outcomes in sim_outcomes_list],
+        effect_obs=[sim_outcomes.utilities for sim_outcomes in sim_outcomes_list],
+        colors=colors,
+        if_paired=if_paired
     )
 
     # plot cost-effectiveness figure
     CEA.plot_CE_plane(
         title='Cost-Effectiveness Analysis',
-        x_label='Additional QALYs',
-        y_label='Additional Cost',
-        x_range=(0,10),
-        y_range=(10, 2000)
+        x_label='Expected QALYs',
+        y_label='Expected Cost',
+        add_clouds=False
     )
 
-
     # report the CE table
     CEA.build_CE_table(
         interval_type='c',
@@ -212,20 +219,14 @@ def report_CEA_CBA(sim_outcomes_hpv, sim_outcomes_cryt):
         icer_digits=2,
         file_name='CETable.csv')
 
-    # CBA
-    NBA = Econ.CBA(
-        strategies=[hpv_therapy_strategy, cryt_therapy_strategy],
-        wtp_range=[0, 5000],
-        if_paired=False
-    )
-    # show the net monetary benefit figure
-    NBA.plot_incremental_nmbs(
+    # show the net monetary benefit and acceptability figures
+    wtps = np.linspace(wtp_range[0], wtp_range[1], n_wtps)
+    CEA.plot_incremental_nmbs(
+        wtps=wtps,
         title='Cost-Benefit Analysis',
         x_label='Willingness-to-pay per QALY ($)',
         y_label='Incremental Net Monetary Benefit ($)',
         interval_type='c',
-        show_legend=True,
-        figure_size=(6, 5)
+        alpha=D.ALPHA
     )
-
-
+    CEA.plot_acceptability_curves(wtps=wtps, n_bootstraps=1000)
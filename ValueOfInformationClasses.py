@@ -0,0 +1,151 @@
+import warnings
+
+import numpy as np
+
+from InputData import HealthStates
+
+# minimum number of samples per regressor of the EVPPI regressions
+MIN_SAMPLES_PER_REGRESSOR = 10
+
+
+def get_parameter_samples(param_sets, prefix=''):
+    """
+    :param param_sets: (list) of parameter sets of a probabilistic sensitivity analysis
+    :param prefix: text to start the names of parameters with (e.g. the name of the strategy)
+    :return: (dictionary) of parameter name: sampled values (array) for the costs, utilities and
+        transition rates that vary over the parameter sets
+    """
+
+    samples = {}
+    for attribute in ('annualStateCosts', 'annualStateUtilities'):
+        values = np.array([getattr(params, attribute) for params in param_sets])
+        for state in HealthStates:
+            if np.ptp(values[:, state.value]) > 0:
+                samples[prefix + attribute + '[' + state.name + ']'] = values[:, state.value]
+
+    rates = np.array([params.transRateMatrix for params in param_sets])
+    for i in HealthStates:
+        for j in HealthStates:
+            if np.ptp(rates[:, i.value, j.value]) > 0:
+                samples[prefix + 'transRateMatrix[' + i.name + ', ' + j.name + ']'] = rates[:, i.value, j.value]
+
+    return samples
+
+
+class ValueOfInformation:
+    """ expected value of perfect information (EVPI) and of partial perfect information (EVPPI)
+    from the outcomes of a probabilistic sensitivity analysis """
+
+    def __init__(self, cost_obs, effect_obs, strategy_names=None):
+        """
+        :param cost_obs: (list) of the mean costs of cohorts under each strategy
+            (the i-th cohorts of all strategies are simulated with the i-th sample of parameters)
+        :param effect_obs: (list) of the mean effects (e.g. QALY) of cohorts under each strategy
+        :param strategy_names: (list) of strategy names
+        """
+        self.costs = np.column_stack([np.asarray(obs, dtype=float) for obs in cost_obs])
+        self.effects = np.column_stack([np.asarray(obs, dtype=float) for obs in effect_obs])
+        self.nSamples, self.nStrategies = self.costs.shape
+        self.strategyNames = strategy_names
+
+    def get_nmb(self, wtps):
+        """
+        :param wtps: (array) willingness-to-pay values
+        :return: (n_wtps x n_samples x n_strategies array) net monetary benefit of each strategy
+            for each sample of parameters at each willingness-to-pay value
+        """
+        wtps = np.asarray(wtps, dtype=float)
+        return wtps[:, np.newaxis, np.newaxis] * self.effects - self.costs
+
+    def get_evpi(self, wtps):
+        """
+        :param wtps: (array) willingness-to-pay values
+        :return: (array) expected value of perfect information at each willingness-to-pay value
+        """
+        nmb = self.get_nmb(wtps=np.atleast_1d(wtps))
+        return nmb.max(axis=2).mean(axis=1) - nmb.mean(axis=1).max(axis=1)
+
+    def get_optimal_strategies(self, wtps):
+        """
+        :param wtps: (array) willingness-to-pay values
+        :return: (array) index of the strategy with the highest expected net monetary benefit
+            at each willingness-to-pay value
+        """
+        wtps = np.atleast_1d(np.asarray(wtps, dtype=float))
+        expected_nmb = wtps[:, np.newaxis] * self.effects.mean(axis=0) - self.costs.mean(axis=0)
+        return expected_nmb.argmax(axis=1)
+
+    def get_evppi(self, wtps, parameter_samples, n_knots=4):
+        """ expected value of partial perfect information about a group of parameters estimated by
+        regressing the incremental costs and effects on the parameters (Strong et al., 2014); since
+        the net monetary benefit is linear in the willingness-to-pay, each strategy only needs one
+        regression for cost and one for effect for all willingness-to-pay values
+        :param wtps: (array) willingness-to-pay values
+        :param parameter_samples: (n_samples array or n_samples x k matrix, or list of arrays)
+            sampled values of the group of parameters
+        :param n_knots: number of interior knots of the piecewise-linear splines of each parameter
+        :return: (array) expected value of partial perfect information at each willingness-to-pay value
+        """
+
+        wtps = np.atleast_1d(np.asarray(wtps, dtype=float))
+        basis = self._get_basis(parameter_samples=parameter_samples, n_knots=n_knots)
+
+        # costs and effects with respect to the first strategy, expected given the parameters
+        incremental = np.hstack((self.costs[:, 1:] - self.costs[:, [0]],
+                                 self.effects[:, 1:] - self.effects[:, [0]]))
+        coefficients = np.linalg.lstsq(basis, incremental, rcond=None)[0]
+        fitted = basis @ coefficients
+        fitted_costs = fitted[:, :self.nStrategies - 1]
+        fitted_effects = fitted[:, self.nStrategies - 1:]
+
+        # (n_wtps x n_samples x n_strategies) expected net monetary benefit given the parameters
+        nmb = np.zeros((len(wtps), self.nSamples, self.nStrategies))
+        nmb[:, :, 1:] = wtps[:, np.newaxis, np.newaxis] * fitted_effects - fitted_costs
+
+        return nmb.max(axis=2).mean(axis=1) - nmb.mean(axis=1).max(axis=1)
+
+    def get_evppi_of_groups(self, wtps, groups, n_knots=4):
+        """
+        :param wtps: (array) willingness-to-pay values
+        :param groups: (dictionary) of group name: sampled values of the parameters of the group
+        :param n_knots: number of interior knots of the piecewise-linear splines of each parameter
+        :return: (dictionary) of group name: expected value of partial perfect information
+            at each willingness-to-pay value
+        """
+        return {name: self.get_evppi(wtps=wtps, parameter_samples=samples, n_knots=n_knots)
+                for name, samples in groups.items()}
+
+    def _get_basis(self, parameter_samples, n_knots):
+        """
+        :return: (n_samples x m matrix) regressors: an intercept, piecewise-linear splines of each linearly
+            independent direction of the parameters with knots at its quantiles, and their pairwise products;
+            the products and then the splines are left out if there are too few samples for them
+        """
+
+        if isinstance(parameter_samples, (list, tuple)):
+            x = np.column_stack([np.asarray(samples, dtype=float) for samples in parameter_samples])
+        else:
+            x = np.asarray(parameter_samples, dtype=float).reshape(self.nSamples, -1)
+
+        # standardize parameters and keep their linearly independent directions
+        # (e.g. transition rates calculated from the same sampled probability)
+        stdev = x.std(axis=0)
+        x = (x - x.mean(axis=0)) / np.where(stdev > 0, stdev, 1)
+        u, singular_values, vt = np.linalg.svd(x, full_matrices=False)
+        rank = np.sum(singular_values > 1e-8 * max(singular_values.max(initial=0), 1))
+        x = u[:, :rank] * np.sqrt(self.nSamples)
+
+        max_columns = max(self.nSamples // MIN_SAMPLES_PER_REGRESSOR, 1)
+        if rank > 0 and max_columns == 1:
+            warnings.warn('Too few samples to regress net benefits on the parameters (at least '
+                          + str(2 * MIN_SAMPLES_PER_REGRESSOR) + ' are needed); the EVPPI is reported as 0.')
+        columns = [np.ones((self.nSamples, 1)), x[:, :max_columns - 1]]
+        if 1 + rank * (n_knots + 1) <= max_columns:
+            quantiles = np.linspace(0, 1, n_knots + 2)[1:-1]
+            knots = np.quantile(x, quantiles, axis=0)
+            columns.append(np.maximum(x[:, np.newaxis, :] - knots[np.newaxis, :, :], 0).reshape(self.nSamples, -1))
+            rows, cols = np.triu_indices(rank, k=1)
+            if 1 + rank * (n_knots + 1) + len(rows) <= max_columns:
+                columns.append(x[:, rows] * x[:, cols])
+
+        return np.hstack(columns)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+import scipy.stats as stats
+
+import InputData as D
+import ParameterClasses as P
+from AdaptiveClasses import AdaptiveCohort, Target, _AdaptiveRun
+
+
+def test_unpaired_nmb_interval_includes_cost_qaly_covariance():
+    # patients who cost more have fewer QALYs (negative covariance)
+    rng = np.random.default_rng(0)
+    wtp = 1000
+    run = _AdaptiveRun(wtp=wtp, if_has_ref=True)
+    observations = []
+    for batch in range(3):
+        qalys, ref_qalys = rng.normal(1, 0.3, size=(2, 200))
+        costs = 500 - 800 * qalys + rng.normal(0, 50, 200)
+        ref_costs = 400 - 800 * ref_qalys + rng.normal(0, 50, 200)
+        run._update_stats(costs=costs, qalys=qalys, ref_costs=ref_costs, ref_qalys=ref_qalys)
+        observations.append((wtp * qalys - costs, wtp * ref_qalys - ref_costs))
+    run._update_half_widths(half_widths={Target.INCREMENTAL_NMB: 0}, alpha=0.05, if_paired=False)
+
+    nmb, ref_nmb = (np.concatenate(column) for column in zip(*observations))
+    interval = stats.ttest_ind(nmb, ref_nmb, equal_var=False).confidence_interval()
+    assert run.halfWidths[Target.INCREMENTAL_NMB] == pytest.approx((interval.high - interval.low) / 2)
+    assert run.get_incremental_nmb() == pytest.approx(nmb.mean() - ref_nmb.mean())
+
+
+def test_print_report_of_adaptive_cohort(capsys):
+    cohort = AdaptiveCohort(id=0, parameters=P.Parameters(treatment=D.Treatment.HPV_SCREEN),
+                            batch_size=20, max_pop_size=40)
+    cohort.simulate(sim_length=D.SIMULATION_LENGTH, half_widths={Target.COST: 1e-9})
+    cohort.print_report()
+
+    assert '2 batches of 20 patients (40 patients under each strategy)' in capsys.readouterr().out
@@ -0,0 +1,78 @@
+import warnings
+
+import numpy as np
+import pytest
+import scipy.stats as stats
+
+from BootstrapClasses import IncrementalBootstrap, Interval
+
+N_RESAMPLES = 20000
+
+
+def test_bca_interval_matches_scipy():
+    # the mean of a skewed sample, where BCa and percentile intervals differ
+    x = np.random.default_rng(0).exponential(size=40)
+    bootstrap = IncrementalBootstrap(costs=x, effects=np.ones(40), ref_costs=np.zeros(40), ref_effects=np.zeros(40),
+                                     if_paired=True)
+    bootstrap.resample(n_resamples=N_RESAMPLES, seed=1)
+
+    estimate, lower, upper = bootstrap.get_incremental_cost_interval(interval=Interval.BCA)
+    expected = stats.bootstrap((x,), np.mean, n_resamples=N_RESAMPLES, method='BCa',
+                               random_state=1).confidence_interval
+
+    assert estimate == pytest.approx(x.mean())
+    assert lower == pytest.approx(expected.low, abs=0.02)
+    assert upper == pytest.approx(expected.high, abs=0.02)
+
+
+def test_bca_interval_of_independent_samples_matches_scipy():
+    rng = np.random.default_rng(2)
+    x = rng.exponential(size=30)
+    y = rng.exponential(scale=2, size=50)
+    bootstrap = IncrementalBootstrap(costs=x, effects=np.zeros(30), ref_costs=y, ref_effects=np.zeros(50))
+    bootstrap.resample(n_resamples=N_RESAMPLES, seed=1)
+
+    estimate, lower, upper = bootstrap.get_incremental_cost_interval(interval=Interval.BCA)
+    expected = stats.bootstrap((x, y), lambda a, b: np.mean(a) - np.mean(b), n_resamples=N_RESAMPLES,
+                               method='BCa', random_state=1).confidence_interval
+
+    assert estimate == pytest.approx(x.mean() - y.mean())
+    assert lower == pytest.approx(expected.low, abs=0.05)
+    assert upper == pytest.approx(expected.high, abs=0.05)
+
+
+def test_replicates_do_not_depend_on_workers():
+    rng = np.random.default_rng(3)
+    costs, effects = rng.normal(size=(2, 1000))
+    replicates = []
+    for workers in (1, 4):
+        bootstrap = IncrementalBootstrap(costs=costs, effects=effects, ref_costs=costs[::-1], ref_effects=effects)
+        bootstrap.resample(n_resamples=5000, seed=7, workers=workers)
+        replicates.append((bootstrap.incCostReplicates, bootstrap.incEffectReplicates))
+
+    np.testing.assert_array_equal(replicates[0][0], replicates[1][0])
+    np.testing.assert_array_equal(replicates[0][1], replicates[1][1])
+
+
+def test_bca_interval_of_degenerate_sample():
+    # all replicates are equal to the estimate and the jackknife values are all equal
+    bootstrap = IncrementalBootstrap(costs=np.ones(5), effects=np.ones(5), ref_costs=np.zeros(5),
+                                     ref_effects=np.zeros(5), if_paired=True)
+    bootstrap.resample(n_resamples=200)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        assert bootstrap.get_incremental_cost_interval(interval=Interval.BCA) == (1, 1, 1)
+
+
+def test_bca_interval_with_all_replicates_on_one_side():
+    # the ICER estimate is above all of its replicates, which makes the bias correction infinite
+    # unless the proportion of replicates below the estimate is kept away from 0 and 1
+    bootstrap = IncrementalBootstrap(costs=np.array([1.0, 2.0]), effects=np.array([1.0, 1.0]),
+                                     ref_costs=np.zeros(2), ref_effects=np.zeros(2), if_paired=True)
+    bootstrap.resample(n_resamples=100)
+    bootstrap.incCostReplicates = np.full(100, 1.0)
+
+    estimate, lower, upper = bootstrap.get_icer_interval(interval=Interval.BCA)
+    assert estimate == 1.5
+    assert lower == upper == 1
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import InputData as D
+import MultiCohortClasses as MultiCls
+
+SIM_LENGTH = D.SIMULATION_LENGTH
+N_COHORTS = 6
+
+
+def simulate(checkpoint_path, resume=False, pop_size=50):
+    multi_cohort = MultiCls.MultiCohort(ids=range(N_COHORTS), pop_size=pop_size, treatment=D.Treatment.HPV_SCREEN,
+                                        checkpoint_path=checkpoint_path)
+    multi_cohort.simulate(sim_length=SIM_LENGTH, resume=resume)
+    return multi_cohort
+
+
+def test_resume_after_truncated_line(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    uninterrupted = simulate(checkpoint_path=str(path))
+    content = path.read_bytes()
+
+    # an interrupted run: the header, two complete cohorts and part of the third
+    lines = content.splitlines(keepends=True)
+    assert len(lines) == N_COHORTS + 1
+    interrupted_path = tmp_path / 'interrupted.jsonl'
+    interrupted_path.write_bytes(b''.join(lines[:3]) + lines[3][:len(lines[3]) // 2])
+
+    resumed = simulate(checkpoint_path=str(interrupted_path), resume=True)
+
+    # only the cohorts not recorded are simulated
+    assert 0 < resumed.nEvents < uninterrupted.nEvents
+    for name in ('meanSurvivalTimes', 'meanCosts', 'meanQALYs'):
+        assert getattr(resumed.multiCohortOutcomes, name) == getattr(uninterrupted.multiCohortOutcomes, name)
+    np.testing.assert_array_equal(resumed.multiCohortOutcomes.survivalCurves,
+                                  uninterrupted.multiCohortOutcomes.survivalCurves)
+    # the partial line is replaced by the complete record
+    assert interrupted_path.read_bytes() == content
+
+
+def test_resume_of_complete_run_simulates_nothing(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    uninterrupted = simulate(checkpoint_path=str(path))
+    resumed = simulate(checkpoint_path=str(path), resume=True)
+
+    assert resumed.nEvents == 0
+    assert resumed.multiCohortOutcomes.meanCosts == uninterrupted.multiCohortOutcomes.meanCosts
+
+
+def test_resume_with_other_settings_raises(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    simulate(checkpoint_path=str(path))
+
+    with pytest.raises(ValueError):
+        simulate(checkpoint_path=str(path), resume=True, pop_size=60)
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+import scipy.stats as stats
+
+import CostEffectivenessClasses as CE
+
+
+def get_analysis(mean_costs, mean_effects, if_paired=False):
+    # two observations per strategy around the given means
+    return CE.CostEffectivenessAnalysis(strategy_names=[str(i) for i in range(len(mean_costs))],
+                                        cost_obs=[[c - 1, c + 1] for c in mean_costs],
+                                        effect_obs=[[e - 0.1, e + 0.1] for e in mean_effects],
+                                        if_paired=if_paired)
+
+
+def test_frontier_with_strict_and_extended_dominance():
+    # 0: reference, 1: on the frontier (ICER 100), 2: extendedly dominated by 1 and 3,
+    # 3: on the frontier (ICER 200 with respect to 1), 4: strictly dominated by 1,
+    # 5: as effective as 1 but more costly
+    analysis = get_analysis(mean_costs=[0, 100, 300, 400, 200, 150],
+                            mean_effects=[0, 1, 1.5, 2.5, 0.5, 1])
+
+    assert analysis.frontier == [0, 1, 3]
+    assert analysis.status == ['On frontier', 'On frontier', 'Extendedly dominated', 'On frontier',
+                               'Dominated', 'Dominated']
+    icers = analysis.get_icers()
+    assert icers.keys() == {'1', '3'}
+    assert icers['1'] == pytest.approx(100)
+    assert icers['3'] == pytest.approx(200)
+
+
+def test_chain_of_extended_dominance():
+    # the ICERs of 1 and 2 are both above that of 3 with respect to 0
+    analysis = get_analysis(mean_costs=[0, 100, 190, 240], mean_effects=[0, 0.5, 0.9, 2])
+
+    assert analysis.frontier == [0, 3]
+    assert analysis.status[1:3] == ['Extendedly dominated', 'Extendedly dominated']
+
+
+def test_dominant_strategy():
+    # less costly and more effective than all others
+    analysis = get_analysis(mean_costs=[100, 50, 200], mean_effects=[1, 2, 1.5])
+
+    assert analysis.frontier == [1]
+    assert analysis.get_icers() == {}
+
+
+def get_random_analysis(if_paired):
+    rng = np.random.default_rng(1)
+    return CE.CostEffectivenessAnalysis(strategy_names=['a', 'b', 'c'],
+                                        cost_obs=[rng.normal(100 + 10 * i, 20, 400) for i in range(3)],
+                                        effect_obs=[rng.normal(1 + 0.1 * i, 0.3, 400) for i in range(3)],
+                                        if_paired=if_paired)
+
+
+def test_unpaired_intervals_are_welch_intervals():
+    analysis = get_random_analysis(if_paired=False)
+
+    mean, lower, upper = analysis.get_incremental_interval(analysis.costs, ref=0)
+    interval = stats.ttest_ind(analysis.costs[:, 2], analysis.costs[:, 0], equal_var=False).confidence_interval()
+    assert (lower[2], upper[2]) == pytest.approx((interval.low, interval.high))
+
+    wtp = 1000
+    mean, lower, upper = analysis.get_incremental_nmbs(wtps=[wtp], ref=0)
+    nmb = wtp * analysis.effects - analysis.costs
+    interval = stats.ttest_ind(nmb[:, 1], nmb[:, 0], equal_var=False).confidence_interval()
+    assert (lower[1, 0], upper[1, 0]) == pytest.approx((interval.low, interval.high))
+    assert lower[0, 0] == upper[0, 0] == 0
+
+    with pytest.raises(ValueError):
+        analysis.get_incremental_nmbs(wtps=[wtp], ref=0, interval_type='p')
+
+
+def test_paired_intervals_are_intervals_of_differences():
+    analysis = get_random_analysis(if_paired=True)
+
+    wtp = 1000
+    mean, lower, upper = analysis.get_incremental_nmbs(wtps=[wtp], ref=0)
+    nmb = wtp * analysis.effects - analysis.costs
+    interval = stats.ttest_1samp(nmb[:, 2] - nmb[:, 0], 0).confidence_interval()
+    assert (lower[2, 0], upper[2, 0]) == pytest.approx((interval.low, interval.high))
+
+    mean, lower, upper = analysis.get_incremental_nmbs(wtps=[wtp], ref=0, interval_type='p')
+    assert (lower[2, 0], upper[2, 0]) == pytest.approx(np.percentile(nmb[:, 2] - nmb[:, 0], [2.5, 97.5]))
+
+
+@pytest.mark.parametrize('if_paired', [False, True])
+def test_bootstrap_means_do_not_depend_on_block_size(monkeypatch, if_paired):
+    analysis = get_random_analysis(if_paired=if_paired)
+    costs, effects = analysis.get_bootstrap_means(n_bootstraps=50)
+
+    # blocks of a few resamples at a time
+    monkeypatch.setattr(CE, 'MAX_BLOCK_SIZE', 3 * analysis.nObs * analysis.nStrategies)
+    block_costs, block_effects = analysis.get_bootstrap_means(n_bootstraps=50)
+
+    assert costs.shape == (50, 3)
+    np.testing.assert_allclose(block_costs, costs)
+    np.testing.assert_allclose(block_effects, effects)
+
+
+def test_acceptability_curves_sum_to_one():
+    analysis = get_random_analysis(if_paired=True)
+    probabilities = analysis.get_acceptability_curves(wtps=np.linspace(0, 1000, 11), n_bootstraps=200)
+
+    np.testing.assert_allclose(probabilities.sum(axis=0), 1)
+    # the least costly strategy is the most likely to be optimal when QALYs have no value
+    assert probabilities[:, 0].argmax() == 0
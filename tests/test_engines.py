@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+import InputData as D
+import MarkovModelClasses as Cls
+import ParameterClasses as P
+from AnalyticCohortClasses import AnalyticCohort
+
+POP_SIZE = 4000
+# number of standard errors a simulated mean may differ from the expected value
+N_STD_ERRORS = 4
+
+
+def assert_within_mc_error(values, expected):
+    values = np.asarray(values, dtype=float)
+    std_error = values.std(ddof=1) / np.sqrt(len(values))
+    assert abs(values.mean() - expected) <= N_STD_ERRORS * std_error
+
+
+@pytest.fixture(scope='module')
+def expected():
+    params = P.Parameters(treatment=D.Treatment.HPV_SCREEN)
+    return params, AnalyticCohort(parameters=params).evaluate(sim_length=D.SIMULATION_LENGTH)
+
+
+@pytest.mark.parametrize('engine', list(Cls.Engine))
+@pytest.mark.parametrize('eliminate_screening', [False, True])
+def test_engines_match_analytic_cohort(expected, engine, eliminate_screening):
+    params, analytic = expected
+    cohort = Cls.Cohort(id=1, pop_size=POP_SIZE, parameters=params, engine=engine,
+                        eliminate_screening=eliminate_screening)
+    cohort.simulate(sim_length=D.SIMULATION_LENGTH)
+    outcomes = cohort.cohortOutcomes
+
+    assert_within_mc_error(outcomes.costs, analytic.expectedCost)
+    assert_within_mc_error(outcomes.utilities, analytic.expectedUtility)
+    assert_within_mc_error(outcomes.nTotalCancer, analytic.expectedNumCancer)
+    assert_within_mc_error(~outcomes.ifAlive, analytic.probDeath)
+
+
+def test_survival_curve_matches_analytic_cohort(expected):
+    params, analytic = expected
+    cohort = Cls.Cohort(id=1, pop_size=POP_SIZE, parameters=params, engine=Cls.Engine.VECTORIZED)
+    cohort.simulate(sim_length=D.SIMULATION_LENGTH)
+
+    p = analytic.survivalCurve
+    n_living = cohort.cohortOutcomes.survivalCurve.get_n_living(analytic.times)
+    std_errors = np.sqrt(p * (1 - p) / POP_SIZE)
+    assert np.all(np.abs(n_living / POP_SIZE - p) <= N_STD_ERRORS * std_errors + 1e-12)
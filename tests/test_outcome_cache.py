@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+
+import InputData as D
+import MarkovModelClasses as Cls
+import ParameterClasses as P
+from OutcomeCacheClasses import OutcomeCache
+
+SIM_LENGTH = D.SIMULATION_LENGTH
+
+
+def simulate(cache, parameters, engine=Cls.Engine.VECTORIZED):
+    cohort = Cls.Cohort(id=1, pop_size=500, parameters=parameters, engine=engine, cache=cache)
+    cohort.simulate(sim_length=SIM_LENGTH)
+    return cohort
+
+
+def test_cache_hit_returns_identical_outcomes(tmp_path):
+    cache = OutcomeCache(directory=str(tmp_path))
+    params = P.Parameters(treatment=D.Treatment.HPV_SCREEN)
+
+    simulated = simulate(cache=cache, parameters=params)
+    loaded = simulate(cache=cache, parameters=params)
+
+    # nothing is simulated when the outcomes are loaded
+    assert simulated.nEvents > 0
+    assert loaded.nEvents == 0
+    for name in ('patientSurvivalTimes', 'survivalTimes', 'nTotalCancer', 'costs', 'utilities'):
+        np.testing.assert_array_equal(getattr(loaded.cohortOutcomes, name),
+                                      getattr(simulated.cohortOutcomes, name))
+    assert loaded.cohortOutcomes.statCost.get_mean() == simulated.cohortOutcomes.statCost.get_mean()
+    times = np.linspace(0, SIM_LENGTH, 101)
+    np.testing.assert_array_equal(loaded.cohortOutcomes.survivalCurve.get_n_living(times),
+                                  simulated.cohortOutcomes.survivalCurve.get_n_living(times))
+
+
+def test_cache_misses_when_inputs_change(tmp_path):
+    cache = OutcomeCache(directory=str(tmp_path))
+    simulate(cache=cache, parameters=P.Parameters(treatment=D.Treatment.HPV_SCREEN))
+
+    assert simulate(cache=cache, parameters=P.Parameters(treatment=D.Treatment.HPV_SCREEN,
+                                                          overrides={'DISCOUNT': 0.05})).nEvents > 0
+    assert simulate(cache=cache, parameters=P.Parameters(treatment=D.Treatment.HPV_SCREEN),
+                    engine=Cls.Engine.PATIENT).nEvents > 0
+
+
+def test_cache_misses_when_model_version_changes(tmp_path):
+    params = P.Parameters(treatment=D.Treatment.HPV_SCREEN)
+    simulate(cache=OutcomeCache(directory=str(tmp_path), version='1'), parameters=params)
+
+    assert simulate(cache=OutcomeCache(directory=str(tmp_path), version='1'), parameters=params).nEvents == 0
+    assert simulate(cache=OutcomeCache(directory=str(tmp_path), version='2'), parameters=params).nEvents > 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = OutcomeCache(directory=str(tmp_path))
+    for i in range(3):
+        cache.save(key=str(i), values=np.zeros(1000))
+        # (entries are ordered by their modification times)
+        time.sleep(0.05)
+    cache.maxSize = 3.5 * cache.get_size() / 3
+    # using the first entry makes the second one the least recently used
+    assert cache.load(key='0') is not None
+    time.sleep(0.05)
+    cache.save(key='3', values=np.zeros(1000))
+
+    assert cache.load(key='1') is None
+    assert cache.load(key='0') is not None
+    assert cache.load(key='3') is not None
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import InputData as D
+import MarkovModelClasses as Cls
+import MultiCohortClasses as MultiCls
+import ParameterClasses as P
+
+SIM_LENGTH = D.SIMULATION_LENGTH
+
+
+@pytest.mark.parametrize('crn_seed', [None, 1])
+def test_cohort_outcomes_do_not_depend_on_workers(crn_seed):
+    params = P.Parameters(treatment=D.Treatment.HPV_SCREEN)
+    cohorts = []
+    for workers in (1, 2, 3):
+        cohort = Cls.Cohort(id=2, pop_size=150, parameters=params, crn_seed=crn_seed)
+        cohort.simulate(sim_length=SIM_LENGTH, workers=workers)
+        cohorts.append(cohort)
+
+    for cohort in cohorts[1:]:
+        assert cohort.nEvents == cohorts[0].nEvents
+        for name in ('patientSurvivalTimes', 'nTotalCancer', 'costs', 'utilities'):
+            np.testing.assert_array_equal(getattr(cohort.cohortOutcomes, name),
+                                          getattr(cohorts[0].cohortOutcomes, name))
+
+
+def test_multi_cohort_outcomes_do_not_depend_on_workers():
+    multi_cohorts = []
+    for workers in (1, 2):
+        multi_cohort = MultiCls.MultiCohort(ids=range(6), pop_size=50, treatment=D.Treatment.CRYT_SCREEN)
+        multi_cohort.simulate(sim_length=SIM_LENGTH, workers=workers)
+        multi_cohorts.append(multi_cohort.multiCohortOutcomes)
+
+    serial, parallel = multi_cohorts
+    assert parallel.meanCosts == serial.meanCosts
+    assert parallel.meanQALYs == serial.meanQALYs
+    np.testing.assert_array_equal(parallel.survivalCurves, serial.survivalCurves)
+
+
+def test_multi_cohort_outcomes_check_the_time_grid():
+    cohort = Cls.Cohort(id=1, pop_size=20, parameters=P.Parameters(treatment=D.Treatment.HPV_SCREEN))
+    cohort.simulate(sim_length=SIM_LENGTH)
+
+    with pytest.raises(ValueError):
+        MultiCls.MultiCohortOutcomes().extract_outcomes(simulated_cohort=cohort)
+
+    outcomes = MultiCls.MultiCohortOutcomes(time_grid=np.arange(0, SIM_LENGTH + 0.5))
+    outcomes.extract_outcomes(simulated_cohort=cohort)
+    assert len(outcomes._survivalRows[0]) == len(outcomes.timeGrid)
+
+    with pytest.raises(ValueError):
+        outcomes.extend(MultiCls.MultiCohortOutcomes(time_grid=np.arange(0, SIM_LENGTH + 0.25, 0.5)))
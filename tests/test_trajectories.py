@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import InputData as D
+import MarkovModelClasses as Cls
+import ParameterClasses as P
+
+SIM_LENGTH = D.SIMULATION_LENGTH
+POP_SIZE = 300
+
+
+def simulate(parameters, engine, eliminate_screening, record_trajectories=True):
+    cohort = Cls.Cohort(id=1, pop_size=POP_SIZE, parameters=parameters, engine=engine,
+                        eliminate_screening=eliminate_screening, record_trajectories=record_trajectories)
+    cohort.simulate(sim_length=SIM_LENGTH)
+    return cohort
+
+
+@pytest.mark.parametrize('engine', list(Cls.Engine))
+@pytest.mark.parametrize('eliminate_screening', [False, True])
+def test_trajectories_reproduce_simulated_totals(engine, eliminate_screening):
+    params = P.Parameters(treatment=D.Treatment.HPV_SCREEN)
+    cohort = simulate(parameters=params, engine=engine, eliminate_screening=eliminate_screening)
+
+    costs, utilities = cohort.trajectories.evaluate_parameters(parameters=params)
+    np.testing.assert_allclose(costs, cohort.cohortOutcomes.costs, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(utilities, cohort.cohortOutcomes.utilities, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('engine', list(Cls.Engine))
+def test_trajectories_reproduce_totals_under_other_costs_and_discount_rate(engine):
+    # costs, utilities and the discount rate do not change the simulated trajectories
+    params = P.Parameters(treatment=D.Treatment.HPV_SCREEN)
+    new_params = P.Parameters(treatment=D.Treatment.HPV_SCREEN,
+                              overrides={'DISCOUNT': 0.05, 'CANCER_TREATMENT_COST': 2 * D.CANCER_TREATMENT_COST})
+    cohort = simulate(parameters=params, engine=engine, eliminate_screening=False)
+    new_cohort = simulate(parameters=new_params, engine=engine, eliminate_screening=False,
+                          record_trajectories=False)
+
+    costs, utilities = cohort.trajectories.evaluate_parameters(parameters=new_params)
+    np.testing.assert_allclose(costs, new_cohort.cohortOutcomes.costs, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(utilities, new_cohort.cohortOutcomes.utilities, rtol=1e-9, atol=1e-9)
+
+
+def test_trajectories_of_parallel_chunks_match_serial_simulation():
+    params = P.Parameters(treatment=D.Treatment.CRYT_SCREEN)
+    serial = simulate(parameters=params, engine=Cls.Engine.PATIENT, eliminate_screening=False)
+    parallel = Cls.Cohort(id=1, pop_size=POP_SIZE, parameters=params, record_trajectories=True)
+    parallel.simulate(sim_length=SIM_LENGTH, workers=2)
+
+    np.testing.assert_allclose(parallel.trajectories.get_discounted_occupancy(discount_rate=0.03),
+                               serial.trajectories.get_discounted_occupancy(discount_rate=0.03))
+
+
+def test_trajectories_cannot_be_evaluated_with_other_rates():
+    cohort = simulate(parameters=P.Parameters(treatment=D.Treatment.HPV_SCREEN),
+                      engine=Cls.Engine.VECTORIZED, eliminate_screening=False)
+
+    with pytest.raises(ValueError):
+        cohort.trajectories.evaluate_parameters(parameters=P.Parameters(treatment=D.Treatment.CRYT_SCREEN))